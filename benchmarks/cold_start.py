@@ -0,0 +1,113 @@
+"""Cold-start time of eager imports versus lazy manifest registration.
+
+Generates a package of worker and pipe modules, then times fresh
+interpreters that either import every module up front or declare them
+in a manifest and use a single pipe. Run from the repository root:
+
+    python -m benchmarks.cold_start --modules 300
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+MODULE = """\
+from sweetshop import BaseData, Pipe, pipe_registry, worker_registry
+
+
+class Data{i}(BaseData):
+    def __init__(self, value: int):
+        self.value = value
+
+
+@worker_registry.register_worker(data_type=Data{i})
+def worker_{i}(data: Data{i}, step: int = 1) -> Data{i}:
+    return Data{i}(data.value + step)
+
+
+# Built and compiled at import, like the eager registration used to be
+@pipe_registry.register_pipe(compile=True)
+def pipe_{i}() -> Pipe:
+    return Pipe(data_type=Data{i}).start_with(worker_registry.worker_{i}.cfg(step={i}))
+"""
+
+EAGER = """\
+import time
+start = time.perf_counter()
+import sweetshop
+{imports}
+pipe = sweetshop.pipe_registry.pipe_0
+pipe.execute(pipe.data_type(0))
+print(time.perf_counter() - start)
+"""
+
+LAZY = """\
+import time
+start = time.perf_counter()
+import sweetshop
+sweetshop.worker_registry.load_manifest({workers!r})
+sweetshop.pipe_registry.load_manifest({pipes!r})
+pipe = sweetshop.pipe_registry.pipe_0
+pipe.execute(pipe.data_type(0))
+print(time.perf_counter() - start)
+"""
+
+
+def generate(root: Path, modules: int) -> tuple[dict, dict]:
+    """Write the generated package, returning worker and pipe manifests."""
+    package = root / "generated_workers"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    workers, pipes = {}, {}
+    for i in range(modules):
+        (package / f"mod_{i}.py").write_text(MODULE.format(i=i))
+        workers[f"worker_{i}"] = f"generated_workers.mod_{i}"
+        pipes[f"pipe_{i}"] = f"generated_workers.mod_{i}"
+    return workers, pipes
+
+
+def time_script(script: str, root: Path, repeat: int) -> list[float]:
+    """Run script in fresh interpreters, returning its reported times."""
+    src = Path(__file__).resolve().parents[1] / "src"
+    env_path = f"{root}:{src}"
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            env={"PYTHONPATH": env_path, "PYTHONDONTWRITEBYTECODE": "1"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        times.append(float(output.stdout))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--modules", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        workers, pipes = generate(root, args.modules)
+        imports = "\n".join(f"import {module}" for module in sorted(workers.values()))
+        eager = time_script(EAGER.format(imports=imports), root, args.repeat)
+        lazy = time_script(
+            LAZY.format(workers=workers, pipes=pipes),
+            root,
+            args.repeat,
+        )
+
+    eager_ms, lazy_ms = statistics.median(eager) * 1e3, statistics.median(lazy) * 1e3
+    print(f"{args.modules} worker modules, median of {args.repeat} runs")
+    print(f"eager imports: {eager_ms:8.1f} ms")
+    print(f"lazy manifest: {lazy_ms:8.1f} ms ({eager_ms / lazy_ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Throughput of a CPU-bound pipe run by a local cluster as workers are added.
+
+Run from the repository root:
+
+    python -m benchmarks.distributed --items 256 --work 200000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from sweetshop import BaseData, LocalCluster, Pipe, Worker, pipe_registry
+
+
+class Payload(BaseData):
+    def __init__(self, value: int, work: int):
+        self.value = value
+        self.work = work
+
+
+def burn(data: Payload) -> Payload:
+    """Pure-Python CPU-bound work that holds the GIL."""
+    total = data.value
+    for i in range(data.work):
+        total = (total * 31 + i) % 1_000_003
+    return Payload(total, data.work)
+
+
+@pipe_registry.register_pipe()
+def burn_pipe() -> Pipe:
+    return Pipe(data_type=Payload).start_with(Worker(burn, data_type=Payload).cfg())
+
+
+def measure(run, items: list[Payload]) -> float:
+    """Return items per second for one run over items."""
+    start = time.perf_counter()
+    run(items)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--items", type=int, default=256)
+    parser.add_argument("--work", type=int, default=200_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    items = [Payload(i, args.work) for i in range(args.items)]
+    pipe = pipe_registry.burn_pipe
+    baseline = measure(pipe.execute_many, items)
+    print(f"{'mode':<12}{'workers':>8}{'items/s':>12}{'speedup':>10}")
+    print(f"{'inline':<12}{1:>8}{baseline:>12.1f}{1.0:>10.2f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "broker.db"
+        with LocalCluster(path, workers=0) as cluster:
+            for workers in range(1, args.max_workers + 1):
+                cluster.add_workers(1)
+                cluster.execute_many("burn_pipe", items[:workers])  # warm up
+                throughput = measure(
+                    lambda items: cluster.execute_many("burn_pipe", items), items
+                )
+                speedup = throughput / baseline
+                print(f"{'cluster':<12}{workers:>8}{throughput:>12.1f}{speedup:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
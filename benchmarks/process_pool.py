@@ -0,0 +1,75 @@
+"""Throughput of a CPU-bound pipe with its worker in a process pool.
+
+Run from the repository root:
+
+    python -m benchmarks.process_pool --items 64 --work 200000
+"""
+
+import argparse
+import os
+import time
+
+from sweetshop import (
+    BaseData,
+    Pipe,
+    configure_process_pool,
+    shutdown_process_pool,
+    worker_registry,
+)
+
+
+class Payload(BaseData):
+    def __init__(self, value: int):
+        self.value = value
+
+
+def burn(data: Payload, work: int) -> Payload:
+    """Pure-Python CPU-bound work that holds the GIL."""
+    total = data.value
+    for i in range(work):
+        total = (total * 31 + i) % 1_000_003
+    return Payload(total)
+
+
+worker_registry.register_worker(data_type=Payload, name="burn_inline")(burn)
+worker_registry.register_worker(
+    data_type=Payload, name="burn_process", executor="process"
+)(burn)
+
+
+def build_pipe(worker_name: str, work: int) -> Pipe:
+    worker = worker_registry.get(worker_name)
+    return Pipe(data_type=Payload).start_with(worker.cfg(work=work))
+
+
+def measure(pipe: Pipe, items: list[Payload]) -> float:
+    """Return items per second for one batched run."""
+    start = time.perf_counter()
+    pipe.execute_many(items)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--items", type=int, default=64)
+    parser.add_argument("--work", type=int, default=200_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    items = [Payload(i) for i in range(args.items)]
+    baseline = measure(build_pipe("burn_inline", args.work), items)
+    print(f"{'mode':<12}{'workers':>8}{'items/s':>12}{'speedup':>10}")
+    print(f"{'inline':<12}{1:>8}{baseline:>12.1f}{1.0:>10.2f}")
+
+    pipe = build_pipe("burn_process", args.work)
+    for workers in range(1, args.max_workers + 1):
+        configure_process_pool(workers)
+        pipe.execute_many(items[:workers])  # warm up the pool
+        throughput = measure(pipe, items)
+        speedup = throughput / baseline
+        print(f"{'process':<12}{workers:>8}{throughput:>12.1f}{speedup:>10.2f}")
+    shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    main()
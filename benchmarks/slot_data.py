@@ -0,0 +1,41 @@
+"""Memory footprint of BaseData versus SlotData instances.
+
+Run from the repository root:
+
+    python -m benchmarks.slot_data --items 100000
+
+Throughput on a 10-node pipe is part of the suite:
+
+    python -m benchmarks.suite --case slot_data_pipe_10
+"""
+
+import argparse
+import tracemalloc
+from collections.abc import Callable
+
+from benchmarks.suite import Number, SlotNumber
+
+
+def allocated(factory: Callable[[int], object], items: int) -> float:
+    """Return the bytes allocated per instance while keeping items alive."""
+    tracemalloc.start()
+    kept = [factory(i) for i in range(items)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size / items
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    args = parser.parse_args()
+
+    base = allocated(Number, args.items)
+    slot = allocated(SlotNumber, args.items)
+    print(f"BaseData: {base:8.1f} bytes/instance")
+    print(f"SlotData: {slot:8.1f} bytes/instance ({slot / base:.0%} of BaseData)")
+
+
+if __name__ == "__main__":
+    main()
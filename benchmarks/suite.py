@@ -0,0 +1,324 @@
+"""Benchmark suite measuring the pipe engine's own overhead.
+
+Every case times a tiny operation against a baseline, so the numbers reflect
+framework cost rather than worker cost. Run from the repository root:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json --output new.json
+    python -m benchmarks.suite --case linear_chain_100
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from importlib import metadata
+
+from sweetshop import BaseData, Pipe, SlotData, Worker, WorkerRegistry, optimize
+
+CASES: dict[str, Callable[[], dict[str, Callable[[], object]]]] = {}
+
+
+def case(name: str) -> Callable:
+    """Register a benchmark case returning its named variants to time"""
+
+    def wrapper(func: Callable) -> Callable:
+        CASES[name] = func
+        return func
+
+    return wrapper
+
+
+class Number(BaseData):
+    def __init__(self, value: int):
+        self.value = value
+
+
+def increment(data: Number) -> Number:
+    return Number(data.value + 1)
+
+
+def add(data: Number, value: int) -> Number:
+    return Number(data.value + value)
+
+
+INCREMENT = Worker(increment, data_type=Number)
+ADD = Worker(add, data_type=Number)
+
+
+class SlotNumber(SlotData):
+    value: int
+
+
+def slot_increment(data: SlotNumber) -> SlotNumber:
+    return SlotNumber(data.value + 1)
+
+
+SLOT_INCREMENT = Worker(slot_increment, data_type=SlotNumber)
+
+
+def increment_inplace(data: Number) -> Number:
+    data.value += 1
+    return data
+
+
+INCREMENT_INPLACE = Worker(increment_inplace, data_type=Number, inplace=True)
+
+
+def measure(func: Callable[[], object], rounds: int, inner: int) -> dict:
+    """Time func, returning throughput and per-call latency percentiles"""
+    for _ in range(inner):  # warm up
+        func()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for _ in range(inner):
+            func()
+        samples.append((time.perf_counter_ns() - start) / inner)
+    p50, p90, p99 = (statistics.quantiles(samples, n=100)[i] for i in (49, 89, 98))
+    return {
+        "ops_per_sec": 1e9 / statistics.mean(samples),
+        "p50_ns": p50,
+        "p90_ns": p90,
+        "p99_ns": p99,
+    }
+
+
+def linear_chain(length: int) -> dict[str, Callable[[], object]]:
+    pipe = Pipe(data_type=Number).start_with(INCREMENT.cfg())
+    for _ in range(length - 1):
+        pipe.then(INCREMENT.cfg())
+    pipe.compile()
+    data = Number(0)
+
+    def direct() -> Number:
+        result = data
+        for _ in range(length):
+            result = increment(result)
+        return result
+
+    return {"direct": direct, "pipe": lambda: pipe.execute(data)}
+
+
+@case("linear_chain_10")
+def linear_chain_10() -> dict[str, Callable[[], object]]:
+    return linear_chain(10)
+
+
+@case("linear_chain_100")
+def linear_chain_100() -> dict[str, Callable[[], object]]:
+    return linear_chain(100)
+
+
+@case("inplace_chain_100")
+def inplace_chain() -> dict[str, Callable[[], object]]:
+    """100-node chain allocating per node versus mutating in place"""
+    pipe = Pipe(data_type=Number).start_with(INCREMENT_INPLACE.cfg())
+    for _ in range(99):
+        pipe.then(INCREMENT_INPLACE.cfg())
+    pipe.compile()
+    data = Number(0)
+    return {"copying": linear_chain(100)["pipe"], "inplace": lambda: pipe.execute(data)}
+
+
+@case("trusted_chain_10")
+def trusted_chain() -> dict[str, Callable[[], object]]:
+    """10-node chain with per-call type checks versus a trusted plan"""
+    checked = linear_chain(10)["pipe"]
+    pipe = Pipe(data_type=Number).start_with(INCREMENT.cfg())
+    for _ in range(9):
+        pipe.then(INCREMENT.cfg())
+    pipe.trust().compile()
+    data = Number(0)
+    return {"checked": checked, "trusted": lambda: pipe.execute(data)}
+
+
+@case("wide_fan_out_32")
+def wide_fan_out() -> dict[str, Callable[[], object]]:
+    """32 branches of which only the last one matches"""
+    pipe = Pipe(data_type=Number).start_with(INCREMENT.cfg()).branch()
+    for key in range(32):
+        pipe.on(lambda d, key=key: d.value % 32 == key, ADD.cfg(value=key))
+    pipe.end_branch().then(INCREMENT.cfg()).compile()
+    data = Number(30)
+
+    def direct() -> Number:
+        result = increment(data)
+        for key in range(32):
+            if result.value % 32 == key:
+                result = add(result, key)
+        return increment(result)
+
+    return {"direct": direct, "pipe": lambda: pipe.execute(data)}
+
+
+@case("switch_dispatch_32")
+def switch_dispatch() -> dict[str, Callable[[], object]]:
+    """wide_fan_out_32 as all-match, first-match and keyed switch branches"""
+    first = Pipe(data_type=Number).start_with(INCREMENT.cfg()).branch(exclusive=True)
+    switch = Pipe(data_type=Number).start_with(INCREMENT.cfg())
+    switch.switch(lambda d: d.value % 32)
+    for key in range(32):
+        first.on(lambda d, key=key: d.value % 32 == key, ADD.cfg(value=key))
+        switch.case(key, ADD.cfg(value=key))
+    first.end_branch().then(INCREMENT.cfg()).compile()
+    switch.end_branch().then(INCREMENT.cfg()).compile()
+    data = Number(30)
+    return {
+        "all_match": wide_fan_out()["pipe"],
+        "first_match": lambda: first.execute(data),
+        "switch": lambda: switch.execute(data),
+    }
+
+
+@case("deep_branches_16")
+def deep_branches() -> dict[str, Callable[[], object]]:
+    """16 consecutive two-way branch/join blocks"""
+    pipe = Pipe(data_type=Number).start_with(INCREMENT.cfg())
+    for _ in range(16):
+        (
+            pipe.branch()
+            .on(lambda d: d.value % 2 == 0, ADD.cfg(value=1))
+            .on(lambda d: d.value % 2 == 1, ADD.cfg(value=3))
+            .end_branch()
+            .then(INCREMENT.cfg())
+        )
+    pipe.compile()
+    data = Number(0)
+
+    def direct() -> Number:
+        result = increment(data)
+        for _ in range(16):
+            result = add(result, 1 if result.value % 2 == 0 else 3)
+            result = increment(result)
+        return result
+
+    return {"direct": direct, "pipe": lambda: pipe.execute(data)}
+
+
+@case("optimized_chains")
+def optimized_branch_chains() -> dict[str, Callable[[], object]]:
+    """Two guarded 10-node chains between 10-node chains, before and after optimize"""
+    pipe = Pipe(data_type=Number).start_with(INCREMENT.cfg())
+    for _ in range(9):
+        pipe.then(INCREMENT.cfg())
+    pipe.branch()
+    for parity in range(2):
+        pipe.on(lambda d, parity=parity: d.value % 2 == parity, ADD.cfg(value=1))
+        for _ in range(9):
+            pipe.then(INCREMENT.cfg())
+    pipe.end_branch().then(INCREMENT.cfg())
+    for _ in range(9):
+        pipe.then(INCREMENT.cfg())
+    pipe.compile()
+    optimized = optimize(pipe).pipe
+    optimized.compile()
+    data = Number(0)
+    return {
+        "pipe": lambda: pipe.execute(data),
+        "optimized": lambda: optimized.execute(data),
+    }
+
+
+@case("slot_data_pipe_10")
+def slot_data_pipe() -> dict[str, Callable[[], object]]:
+    """10-node chain allocating BaseData versus SlotData per node"""
+    base_pipe = linear_chain(10)["pipe"]
+    slot_pipe = Pipe(data_type=SlotNumber).start_with(SLOT_INCREMENT.cfg())
+    for _ in range(9):
+        slot_pipe.then(SLOT_INCREMENT.cfg())
+    slot_pipe.compile()
+    data = SlotNumber(0)
+    return {"base_data": base_pipe, "slot_data": lambda: slot_pipe.execute(data)}
+
+
+@case("worker_execute")
+def worker_execute() -> dict[str, Callable[[], object]]:
+    """Worker.execute type check and argument packing"""
+    data = Number(0)
+    return {
+        "direct": lambda: add(data, value=1),
+        "worker_execute": lambda: ADD.execute(data, value=1),
+    }
+
+
+@case("registry_lookup")
+def registry_lookup() -> dict[str, Callable[[], object]]:
+    """WorkerRegistry attribute access versus a plain dict"""
+    registry = WorkerRegistry()
+    registry.register("increment", INCREMENT)
+    plain = {"increment": INCREMENT}
+    return {
+        "dict": lambda: plain["increment"],
+        "get": lambda: registry.get("increment"),
+        "getattr": lambda: registry.increment,
+    }
+
+
+def run(names: list[str], rounds: int, inner: int) -> dict:
+    results = {}
+    for name in names:
+        variants = CASES[name]()
+        results[name] = {
+            variant: measure(func, rounds, inner) for variant, func in variants.items()
+        }
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sweetshop": _version(),
+            "rounds": rounds,
+            "inner": inner,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def _version() -> str:
+    try:
+        return metadata.version("sweetshop")
+    except metadata.PackageNotFoundError:
+        return "source"
+
+
+def report(results: dict, baseline: dict | None = None) -> None:
+    header = f"{'case':<20}{'variant':<16}{'ops/s':>14}{'p50 ns':>10}{'p99 ns':>10}"
+    print(header + (f"{'vs base':>10}" if baseline else ""))
+    for name, variants in results["results"].items():
+        for variant, stats in variants.items():
+            line = (
+                f"{name:<20}{variant:<16}{stats['ops_per_sec']:>14,.0f}"
+                f"{stats['p50_ns']:>10,.0f}{stats['p99_ns']:>10,.0f}"
+            )
+            old = (baseline or {}).get("results", {}).get(name, {}).get(variant)
+            if old:
+                line += f"{stats['ops_per_sec'] / old['ops_per_sec']:>9.2f}x"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--case", action="append", choices=sorted(CASES))
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--inner", type=int, default=200)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    results = run(args.case or list(CASES), args.rounds, args.inner)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,70 @@
 from sweetshop.base_data import BaseData
-from sweetshop.pipe import Node, Pipe, PipeRegistry, pipe_registry
+from sweetshop.cache import LRU, DiskCache
+from sweetshop.distributed import Broker, LocalCluster
+from sweetshop.errors import (
+    DeadlineExceededError,
+    NodeExecutionError,
+    NodeTimeoutError,
+    RemoteExecutionError,
+)
+from sweetshop.node import Case, Node
+from sweetshop.optimize import Optimization, describe, optimize
+from sweetshop.pipe import Pipe, PipeRegistry, pipe_registry
+from sweetshop.plan import ExecutionPlan
+from sweetshop.process import configure_process_pool, shutdown_process_pool
+from sweetshop.scheduler import Scheduler
+from sweetshop.shared_data import SharedBuffer, SharedData
+from sweetshop.slot_data import SlotData
+from sweetshop.spec import (
+    FunctionRegistry,
+    PlanCache,
+    condition_registry,
+    dump_spec,
+    from_spec,
+    load_spec,
+    merge_registry,
+    register_specs,
+    to_spec,
+)
+from sweetshop.tracing import Tracer
 from sweetshop.worker import Worker, WorkerRegistry, worker_registry
 
 __all__: list[str] = [
     "worker_registry",
     "pipe_registry",
+    "condition_registry",
+    "merge_registry",
+    configure_process_pool.__name__,
+    shutdown_process_pool.__name__,
+    to_spec.__name__,
+    from_spec.__name__,
+    dump_spec.__name__,
+    load_spec.__name__,
+    register_specs.__name__,
+    optimize.__name__,
+    describe.__name__,
     Node.__name__,
+    Case.__name__,
     PipeRegistry.__name__,
     BaseData.__name__,
+    Broker.__name__,
+    DeadlineExceededError.__name__,
+    DiskCache.__name__,
+    LocalCluster.__name__,
+    LRU.__name__,
+    NodeExecutionError.__name__,
+    NodeTimeoutError.__name__,
+    Optimization.__name__,
+    RemoteExecutionError.__name__,
+    ExecutionPlan.__name__,
+    FunctionRegistry.__name__,
     Pipe.__name__,
+    PlanCache.__name__,
+    Scheduler.__name__,
+    SharedBuffer.__name__,
+    SharedData.__name__,
+    SlotData.__name__,
+    Tracer.__name__,
     Worker.__name__,
     WorkerRegistry.__name__,
 ]
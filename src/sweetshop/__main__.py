@@ -0,0 +1,3 @@
+from sweetshop.distributed import main
+
+main()
@@ -1,8 +1,28 @@
+import copy
+import hashlib
+import pickle
 from abc import ABC
-from typing import TypeVar
+from typing import Self, TypeVar
 
 
-class BaseData(ABC): ...
+class BaseData(ABC):
+    __slots__ = ()
+
+    def fingerprint(self) -> str:
+        """Content digest used to recognise equal data, e.g. as a cache key.
+
+        The default hashes the pickled object; override it with a cheaper or
+        more stable key for large data.
+        """
+        return hashlib.blake2b(pickle.dumps(self), digest_size=16).hexdigest()
+
+    def fork(self) -> Self:
+        """Independent copy handed to an in-place worker that must not share it.
+
+        The default deep copies, so nested lists and dicts are not shared
+        either; override it with a cheaper copy where the data allows.
+        """
+        return copy.deepcopy(self)
 
 
 TData = TypeVar("TData", bound=BaseData)
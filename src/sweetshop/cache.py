@@ -0,0 +1,306 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from pathlib import Path
+
+from sweetshop.base_data import TData
+from sweetshop.shared_data import dumps_contents
+
+
+class LRU:
+    """Thread-safe least-recently-used cache with an optional time to live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize: int = maxsize
+        self.ttl: float | None = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict[Hashable, tuple[float, TData]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> TData | None:
+        """Get a cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if time.monotonic() - entry[0] > self.ttl:
+                    del self._entries[key]
+                    self.evictions += 1
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: TData) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        """Get the hit, miss and eviction counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"LRU(maxsize={self.maxsize}, ttl={self.ttl})"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    worker TEXT,
+    version TEXT,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_worker ON entries (worker);
+CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY, bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO usage VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE usage SET bytes = bytes + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE usage SET bytes = bytes + new.size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE usage SET bytes = bytes - old.size;
+END;
+"""
+
+# Keep the most recently used entries that fit in the size budget
+_EVICT = """
+DELETE FROM entries WHERE key IN (
+    SELECT key FROM (
+        SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS kept
+        FROM entries
+    ) WHERE kept > ?
+)
+"""
+
+
+def _owner(key: Hashable) -> tuple[str | None, str | None]:
+    """Worker name and version of a node cache key, None for other keys"""
+    prefix = key[0] if isinstance(key, tuple) and key else None
+    if isinstance(prefix, tuple) and len(prefix) == 3:
+        name, version, _ = prefix
+        return str(name), None if version is None else str(version)
+    return None, None
+
+
+class DiskCache:
+    """Persistent, size-bounded result cache shared through a SQLite file.
+
+    Entries are addressed by a digest of their key, which for nodes holds
+    the worker name and version, the config and the data fingerprint, so
+    every process opening the same path shares them. Re-running a pipe
+    skips the nodes whose results are stored, which also resumes a failed
+    run from its last finished node. Once the stored values exceed
+    max_bytes, the least recently used entries are evicted. The first
+    result stored for a new worker version drops those of other versions.
+    """
+
+    def __init__(self, path: str | os.PathLike, max_bytes: int = 1 << 30):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.path: Path = Path(path)
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        # Worker versions whose stale entries were already dropped
+        self._versions: set[tuple[str | None, str | None]] = set()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db().executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        """Connection of the current thread, reopened after a fork"""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.db = sqlite3.connect(self.path, timeout=30)
+            local.db.execute("PRAGMA journal_mode=WAL")
+            local.db.execute("PRAGMA synchronous=NORMAL")
+            local.pid = os.getpid()
+        return local.db
+
+    @staticmethod
+    def _digest(key: Hashable) -> str:
+        return hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def get(self, key: Hashable) -> TData | None:
+        """Get a cached value, or None on a miss."""
+        digest = self._digest(key)
+        with self._db() as db:
+            row = db.execute(
+                "SELECT value FROM entries WHERE key = ?", (digest,)
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE entries SET accessed = ? WHERE key = ?",
+                    (time.time(), digest),
+                )
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key: Hashable, value: TData) -> None:
+        """Store a value, evicting the least recently used entries when full."""
+        worker, version = owner = _owner(key)
+        # Shared buffer handles would go stale once their segments are freed
+        blob = dumps_contents(value)
+        with self._db() as db:
+            if worker is not None and owner not in self._versions:
+                db.execute(
+                    "DELETE FROM entries WHERE worker = ? AND version IS NOT ?",
+                    owner,
+                )
+                self._versions.add(owner)
+            db.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) "
+                "DO UPDATE SET size = excluded.size, accessed = excluded.accessed, "
+                "value = excluded.value",
+                (self._digest(key), worker, version, len(blob), time.time(), blob),
+            )
+            evicted = 0
+            if self.nbytes(db) > self.max_bytes:
+                evicted = db.execute(_EVICT, (self.max_bytes,)).rowcount
+        with self._lock:
+            self.evictions += evicted
+
+    def invalidate(self, worker: str) -> int:
+        """Remove every entry of a worker, returning how many were removed."""
+        with self._db() as db:
+            return db.execute(
+                "DELETE FROM entries WHERE worker = ?", (worker,)
+            ).rowcount
+
+    def nbytes(self, db: sqlite3.Connection | None = None) -> int:
+        """Get the total size of the stored values."""
+        return (db or self._db()).execute("SELECT bytes FROM usage").fetchone()[0]
+
+    def stats(self) -> dict[str, int]:
+        """Get this process's hit, miss and eviction counters and the size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self),
+                "bytes": self.nbytes(),
+            }
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._db() as db:
+            db.execute("DELETE FROM entries")
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __repr__(self):
+        return f"DiskCache(path='{self.path}', max_bytes={self.max_bytes})"
+
+
+def config_key(config: dict) -> str:
+    """Freeze a node config into a stable, hashable cache key part"""
+    return repr(sorted(config.items()))
+
+
+def _isolated(result: TData, isolate: bool) -> TData:
+    return result.fork() if isolate else result
+
+
+def cached_call(
+    cache: LRU | DiskCache,
+    prefix: Hashable,
+    func: Callable,
+    data: TData,
+    isolate: bool = False,
+) -> TData:
+    """Memoize a single-item call on the data fingerprint.
+
+    With isolate, cached values are copied on their way in and out, so
+    in-place workers cannot mutate them.
+    """
+    key = (prefix, data.fingerprint())
+    result = cache.get(key)
+    if result is None:
+        result = func(data)
+        cache.put(key, _isolated(result, isolate))
+        return result
+    return _isolated(result, isolate)
+
+
+def cached_batch_call(
+    cache: LRU | DiskCache,
+    prefix: Hashable,
+    func: Callable,
+    items: list[TData],
+    isolate: bool = False,
+) -> list[TData]:
+    """Memoize a batch call, sending only the cache misses to func"""
+    keys = [(prefix, item.fingerprint()) for item in items]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if isolate:
+        results = [None if r is None else r.fork() for r in results]
+    if missing:
+        computed = func([items[i] for i in missing])
+        for i, result in zip(missing, computed):
+            results[i] = result
+            cache.put(keys[i], _isolated(result, isolate))
+    return results
+
+
+async def acached_call(
+    cache: LRU | DiskCache,
+    prefix: Hashable,
+    func: Callable,
+    data: TData,
+    isolate: bool = False,
+) -> TData:
+    """Memoize an async single-item call on the data fingerprint"""
+    key = (prefix, data.fingerprint())
+    result = cache.get(key)
+    if result is None:
+        result = await func(data)
+        cache.put(key, _isolated(result, isolate))
+        return result
+    return _isolated(result, isolate)
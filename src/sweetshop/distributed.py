@@ -0,0 +1,366 @@
+import argparse
+import multiprocessing
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from collections.abc import Callable, Iterable, Sequence
+from pathlib import Path
+
+from sweetshop.base_data import TData
+from sweetshop.errors import RemoteExecutionError
+from sweetshop.pipe import Pipe, pipe_registry
+from sweetshop.registry import import_target
+from sweetshop.shared_data import handover
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pipe TEXT NOT NULL,
+    data BLOB,
+    state TEXT NOT NULL DEFAULT 'queued',
+    owner TEXT,
+    expires REAL,
+    result BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+CREATE TABLE IF NOT EXISTS workers (owner TEXT PRIMARY KEY, done INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS control (id INTEGER PRIMARY KEY, closed INTEGER NOT NULL);
+INSERT OR IGNORE INTO control VALUES (0, 0);
+"""
+
+# Lease the oldest queued jobs, and jobs whose worker let the lease expire
+_CLAIM = """
+UPDATE jobs SET state = 'running', owner = ?, expires = ?
+WHERE id IN (
+    SELECT id FROM jobs
+    WHERE state = 'queued' OR (state = 'running' AND expires < ?)
+    ORDER BY id LIMIT ?
+)
+RETURNING id, pipe, data
+"""
+
+# Bound on the job ids of one query, below SQLite's variable limit
+_CHUNK = 500
+
+
+class Broker:
+    """Queue of pipe runs shared by the processes opening one SQLite file.
+
+    Callers submit runs by pipe_registry name and data, workers claim them
+    in batches and store the result or the failure's traceback, which the
+    caller collects once. A claimed job is leased for lease seconds, and
+    every outcome a worker stores renews the leases of its other claimed
+    jobs: a job whose worker died is handed to another worker once its
+    lease expires, so the lease must exceed the longest run of a pipe.
+    Closing the broker is stored in the file until it is opened again.
+    SQLite locking only holds within one host, so every process must run
+    on the host of the file. Lease expiry times are read from clock, which
+    every process of the file must share.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        lease: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        if lease <= 0:
+            raise ValueError("lease must be positive")
+        self.path: Path = Path(path)
+        self.lease: float = lease
+        self.clock: Callable[[], float] = clock
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db().executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        """Connection of the current thread, reopened after a fork"""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.db = sqlite3.connect(self.path, timeout=30)
+            local.db.execute("PRAGMA journal_mode=WAL")
+            local.db.execute("PRAGMA synchronous=NORMAL")
+            local.pid = os.getpid()
+        return local.db
+
+    def submit(self, pipe: str, data: TData) -> int:
+        """Queue a run of a registered pipe, returning its job id."""
+        return self.submit_many(pipe, [data])[0]
+
+    def submit_many(self, pipe: str, items: Iterable[TData]) -> list[int]:
+        """Queue one run of a registered pipe per item, returning the job ids."""
+        rows = [(pipe, pickle.dumps(data, pickle.HIGHEST_PROTOCOL)) for data in items]
+        with self._db() as db:
+            return [
+                db.execute(
+                    "INSERT INTO jobs (pipe, data) VALUES (?, ?) RETURNING id", row
+                ).fetchone()[0]
+                for row in rows
+            ]
+
+    def claim(self, owner: str, limit: int = 1) -> list[tuple[int, str, TData]]:
+        """Lease up to limit jobs to owner, as (job id, pipe name, data)."""
+        now = self.clock()
+        with self._db() as db:
+            rows = db.execute(_CLAIM, (owner, now + self.lease, now, limit)).fetchall()
+        return [(job, pipe, pickle.loads(data)) for job, pipe, data in sorted(rows)]
+
+    def complete(
+        self, owner: str, outcomes: Sequence[tuple[int, TData | None, str | None]]
+    ) -> None:
+        """Store (job id, result, error traceback) outcomes of owner's jobs.
+
+        Only the first outcome of a job is kept, when an expired lease made
+        two workers run it. The leases of owner's other jobs are renewed.
+        """
+        rows = [
+            (
+                "failed" if error is not None else "done",
+                None
+                if error is not None
+                else pickle.dumps(result, pickle.HIGHEST_PROTOCOL),
+                error,
+                job,
+            )
+            for job, result, error in outcomes
+        ]
+        with self._db() as db:
+            db.executemany(
+                "UPDATE jobs SET state = ?, data = NULL, result = ?, error = ? "
+                "WHERE id = ? AND state = 'running'",
+                rows,
+            )
+            db.execute(
+                "UPDATE jobs SET expires = ? WHERE owner = ? AND state = 'running'",
+                (self.clock() + self.lease, owner),
+            )
+            db.execute(
+                "INSERT INTO workers VALUES (?, ?) ON CONFLICT (owner) "
+                "DO UPDATE SET done = done + excluded.done",
+                (owner, len(rows)),
+            )
+
+    def _query(self, sql: str, jobs: list[int]) -> list[tuple]:
+        """Run a query over job ids in chunks, returning every row"""
+        rows = []
+        with self._db() as db:
+            for start in range(0, len(jobs), _CHUNK):
+                chunk = jobs[start : start + _CHUNK]
+                marks = ", ".join("?" * len(chunk))
+                rows += db.execute(sql.format(marks), chunk).fetchall()
+        return rows
+
+    def results(
+        self,
+        jobs: Sequence[int],
+        timeout: float | None = None,
+        poll_interval: float = 0.005,
+    ) -> list[TData]:
+        """Wait for the given jobs and return their results in order.
+
+        Once every job finished, they are removed from the broker and the
+        first failed one raises RemoteExecutionError. Raises TimeoutError,
+        keeping the jobs, when they are not all finished after timeout
+        seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        unique = list(dict.fromkeys(jobs))
+        waiting, delay = unique, poll_interval
+        while True:
+            done = {
+                job
+                for (job,) in self._query(
+                    "SELECT id FROM jobs WHERE id IN ({}) "
+                    "AND state IN ('done', 'failed')",
+                    waiting,
+                )
+            }
+            waiting = [job for job in waiting if job not in done]
+            if not waiting:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"timed out after {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+        rows = self._query(
+            "DELETE FROM jobs WHERE id IN ({}) RETURNING id, pipe, state, result, error",
+            unique,
+        )
+        finished = {job: row for job, *row in rows}
+        results = []
+        for job in jobs:
+            pipe, state, result, error = finished[job]
+            if state == "failed":
+                raise RemoteExecutionError(pipe, job, error)
+            results.append(pickle.loads(result))
+        return results
+
+    def result(self, job: int, timeout: float | None = None) -> TData:
+        """Wait for one job and return its result."""
+        return self.results([job], timeout)[0]
+
+    def close(self) -> None:
+        """Ask workers to exit once the queue is empty."""
+        with self._db() as db:
+            db.execute("UPDATE control SET closed = 1")
+
+    def open(self) -> None:
+        """Let workers wait for jobs again after close()."""
+        with self._db() as db:
+            db.execute("UPDATE control SET closed = 0")
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._db().execute("SELECT closed FROM control").fetchone()[0])
+
+    def stats(self) -> dict:
+        """Get the job counts per state and the jobs done by each worker."""
+        db = self._db()
+        counts = dict.fromkeys(("queued", "running", "done", "failed"), 0)
+        counts.update(db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return {
+            **counts,
+            "workers": dict(db.execute("SELECT owner, done FROM workers")),
+        }
+
+    def clear(self) -> None:
+        """Remove every job and worker count and reopen a closed broker."""
+        with self._db() as db:
+            db.execute("DELETE FROM jobs")
+            db.execute("DELETE FROM workers")
+        self.open()
+
+    def __len__(self) -> int:
+        return (
+            self._db()
+            .execute("SELECT COUNT(*) FROM jobs WHERE state IN ('queued', 'running')")
+            .fetchone()[0]
+        )
+
+    def __repr__(self):
+        return f"Broker(path='{self.path}', lease={self.lease})"
+
+
+def serve(
+    path: str | os.PathLike,
+    imports: Iterable[str] = (),
+    lease: float = 60.0,
+    batch: int = 16,
+    poll_interval: float = 0.01,
+) -> int:
+    """Run the jobs of a broker until it is closed and empty.
+
+    Each import target is imported first, so that it registers the pipes
+    the jobs name. Jobs are claimed up to batch at a time: larger batches
+    cost fewer broker round trips, smaller ones spread short queues more
+    evenly across workers. Each outcome is stored as soon as its job ends,
+    which renews the lease of the rest of the batch, so the lease only
+    needs to exceed the longest single run. Returns the number of jobs
+    this worker ran.
+    """
+    for target in imports:
+        import_target(target)
+    broker = Broker(path, lease)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    pipes: dict[str, Pipe] = {}
+    ran = 0
+    while True:
+        jobs = broker.claim(owner, batch)
+        if not jobs:
+            if broker.closed:
+                return ran
+            time.sleep(poll_interval)
+            continue
+        for job, name, data in jobs:
+            try:
+                if name not in pipes:
+                    pipes[name] = pipe_registry.get(name)
+                outcome = (job, handover(pipes[name].execute(data)), None)
+            except Exception:
+                outcome = (job, None, traceback.format_exc())
+            broker.complete(owner, [outcome])
+            ran += 1
+
+
+class LocalCluster:
+    """Broker with a pool of worker processes on this host.
+
+    Workers are spawned fresh, so they import the given targets to find
+    the pipes, and keep serving until the cluster is closed. More workers
+    can join at any time, including ones started elsewhere on the host
+    with python -m sweetshop.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        workers: int = 1,
+        imports: Iterable[str] = (),
+        lease: float = 60.0,
+    ):
+        self.broker: Broker = Broker(path, lease)
+        # The file may hold the close of an earlier cluster
+        self.broker.open()
+        self.imports: tuple[str, ...] = tuple(imports)
+        self.processes: list[multiprocessing.Process] = []
+        self.add_workers(workers)
+
+    def add_workers(self, count: int) -> None:
+        """Start count more worker processes"""
+        context = multiprocessing.get_context("spawn")
+        for _ in range(count):
+            process = context.Process(
+                target=serve,
+                args=(self.broker.path, self.imports, self.broker.lease),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+
+    def execute(self, pipe: str, data: TData, timeout: float | None = None) -> TData:
+        """Run a registered pipe on a worker and return its result"""
+        return self.broker.result(self.broker.submit(pipe, data), timeout)
+
+    def execute_many(
+        self, pipe: str, items: Iterable[TData], timeout: float | None = None
+    ) -> list[TData]:
+        """Run a registered pipe on the workers, one result per item"""
+        return self.broker.results(self.broker.submit_many(pipe, items), timeout)
+
+    def close(self) -> None:
+        """Let the workers drain the queue, then wait for them to exit"""
+        self.broker.close()
+        for process in self.processes:
+            process.join()
+        self.processes.clear()
+
+    def __enter__(self) -> "LocalCluster":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self):
+        return f"LocalCluster(broker={self.broker!r}, workers={len(self.processes)})"
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the jobs of a broker file")
+    parser.add_argument("broker", help="path of the broker's SQLite file")
+    parser.add_argument(
+        "--import",
+        dest="imports",
+        action="append",
+        default=[],
+        help="module registering the pipes, may be repeated",
+    )
+    parser.add_argument("--lease", type=float, default=60.0)
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args(argv)
+    serve(args.broker, args.imports, args.lease, args.batch)
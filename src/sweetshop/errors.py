@@ -0,0 +1,53 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sweetshop.node import Node
+
+
+class NodeExecutionError(RuntimeError):
+    """A node of a running plan failed.
+
+    The failing node and the original exception are kept as attributes,
+    the exception is also chained as __cause__.
+    """
+
+    def __init__(self, node: "Node", cause: BaseException, action: str = "execution"):
+        super().__init__(f"Node {node} {action} failed: {cause}")
+        self.node: "Node" = node
+        self.cause: BaseException = cause
+
+
+class NodeTimeoutError(NodeExecutionError, TimeoutError):
+    """A node call ran longer than its timeout."""
+
+
+class DeadlineExceededError(NodeTimeoutError):
+    """The run deadline passed before or while node was running.
+
+    Nodes after it are skipped; a call cut off by the deadline may still
+    finish in the background, as threads cannot be interrupted.
+    """
+
+    def __init__(self, node: "Node"):
+        super().__init__(node, TimeoutError("run deadline exceeded"))
+
+
+def node_error(node: "Node", error: Exception) -> NodeExecutionError:
+    """Wrap the exception of a node call in a structured error"""
+    if isinstance(error, TimeoutError):
+        return NodeTimeoutError(node, error)
+    return NodeExecutionError(node, error)
+
+
+class RemoteExecutionError(RuntimeError):
+    """A pipe run submitted to a broker failed in its worker process.
+
+    The worker's formatted traceback is kept as the traceback attribute.
+    """
+
+    def __init__(self, pipe: str, job: int, traceback: str):
+        summary = traceback.strip().splitlines()[-1]
+        super().__init__(f"Pipe {pipe} job {job} failed: {summary}")
+        self.pipe: str = pipe
+        self.job: int = job
+        self.traceback: str = traceback
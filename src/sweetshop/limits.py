@@ -0,0 +1,101 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+
+from sweetshop.base_data import TData
+from sweetshop.metrics import QUANTILES, Histogram
+
+# Priority of the pipe run in the current context, higher runs first
+PRIORITY: ContextVar[int] = ContextVar("priority", default=0)
+
+
+class Limiter:
+    """Bound on the concurrent calls of a worker, shared by every pipe.
+
+    Calls beyond the limit wait for a slot, which goes to the waiting call
+    of the highest run priority, the earliest one among equals. Waiting
+    times are recorded to help size the limit.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.limit: int = limit
+        self.active: int = 0
+        self.wait_time: Histogram = Histogram()
+        # Heap of (-priority, arrival, event) of the calls waiting for a slot
+        self._waiting: list[tuple[int, int, threading.Event]] = []
+        self._arrivals = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a slot, waiting for one while the limit is reached"""
+        with self._lock:
+            if self.active < self.limit:
+                self.active += 1
+                self.wait_time.record(0)
+                return
+            slot = threading.Event()
+            heapq.heappush(self._waiting, (-PRIORITY.get(), next(self._arrivals), slot))
+        start = time.perf_counter_ns()
+        slot.wait()
+        with self._lock:
+            self.wait_time.record(time.perf_counter_ns() - start)
+
+    def release(self) -> None:
+        """Give a slot back, handing it straight to the next waiting call"""
+        with self._lock:
+            if self._waiting:
+                heapq.heappop(self._waiting)[2].set()
+            else:
+                self.active -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            wait_time = self.wait_time
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "waiting": len(self._waiting),
+                "calls": wait_time.count,
+                "wait_total_seconds": wait_time.total / 1e9,
+                "wait_max_seconds": wait_time.max / 1e9,
+                **{
+                    f"wait_p{q * 100:g}_seconds": wait_time.percentile(q) / 1e9
+                    for q in QUANTILES
+                },
+            }
+
+    def __repr__(self):
+        return f"Limiter(limit={self.limit}, active={self.active})"
+
+
+def limited_call(limiter: Limiter, func: Callable, data: TData) -> TData:
+    """Call func holding one of the limiter's slots"""
+    limiter.acquire()
+    try:
+        return func(data)
+    finally:
+        limiter.release()
+
+
+async def alimited_call(limiter: Limiter, func: Callable, data: TData) -> TData:
+    """Await func holding one of the limiter's slots.
+
+    The slot is waited for in a thread; when the call is cancelled
+    meanwhile, the slot is given back as soon as it is granted.
+    """
+    acquiring = asyncio.ensure_future(asyncio.to_thread(limiter.acquire))
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        acquiring.add_done_callback(lambda _: limiter.release())
+        raise
+    try:
+        return await func(data)
+    finally:
+        limiter.release()
@@ -0,0 +1,224 @@
+import threading
+import time
+from collections.abc import Callable
+from itertools import accumulate
+from typing import TYPE_CHECKING
+
+from sweetshop.base_data import TData
+
+if TYPE_CHECKING:
+    from sweetshop.node import Node
+
+QUANTILES: tuple[float, ...] = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """Log-linear latency histogram in the style of HDR histograms.
+
+    Values are bucketed in nanoseconds with 16 linear sub-buckets per power of
+    two, which bounds the relative error of any percentile to about 6%.
+    """
+
+    SUB_BITS: int = 4
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: int = 0
+        self.max: int = 0
+        self._buckets: dict[int, int] = {}
+
+    def _index(self, value: int) -> int:
+        shift = max(value.bit_length() - self.SUB_BITS - 1, 0)
+        return (shift << self.SUB_BITS) + (value >> shift)
+
+    def _upper(self, index: int) -> int:
+        """Largest value that falls in bucket index"""
+        shift = max((index >> self.SUB_BITS) - 1, 0)
+        return ((index - (shift << self.SUB_BITS) + 1) << shift) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        """Record a value in nanoseconds, count times"""
+        index = self._index(value)
+        self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.max = max(self.max, value)
+
+    def percentile(self, quantile: float) -> int:
+        """Get the value in nanoseconds at the given quantile (0 to 1)"""
+        if not self.count:
+            return 0
+        rank = quantile * self.count
+        indices = sorted(self._buckets)
+        seen = accumulate(self._buckets[index] for index in indices)
+        index = next(index for index, n in zip(indices, seen) if n >= rank)
+        return min(self._upper(index), self.max)
+
+
+class NodeMetrics:
+    """Call, error and latency counters of one plan node."""
+
+    def __init__(self, label: str, worker: str):
+        self.label: str = label
+        self.worker: str = worker
+        self.calls: int = 0
+        self.errors: int = 0
+        self.latency: Histogram = Histogram()
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed: int, calls: int = 1, failed: bool = False) -> None:
+        """Record calls that took elapsed nanoseconds in total"""
+        with self._lock:
+            self.calls += calls
+            self.errors += failed
+            self.latency.record(elapsed // calls, calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latency = self.latency
+            return {
+                "node": self.label,
+                "worker": self.worker,
+                "calls": self.calls,
+                "errors": self.errors,
+                "total_seconds": latency.total / 1e9,
+                "max_seconds": latency.max / 1e9,
+                **{
+                    f"p{q * 100:g}_seconds": latency.percentile(q) / 1e9
+                    for q in QUANTILES
+                },
+            }
+
+
+class ConditionMetrics:
+    """Evaluation and hit counters of one branch condition."""
+
+    def __init__(self, source: str, target: str):
+        self.source: str = source
+        self.target: str = target
+        self.evaluations: int = 0
+        self.hits: int = 0
+        self._lock = threading.Lock()
+
+    def observe(self, hit: bool) -> None:
+        with self._lock:
+            self.evaluations += 1
+            self.hits += hit
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "source": self.source,
+                "target": self.target,
+                "evaluations": self.evaluations,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.evaluations if self.evaluations else 0.0,
+            }
+
+
+class PipeMetrics:
+    """Runtime metrics of every node and branch condition in a plan."""
+
+    def __init__(self, order: list["Node"]):
+        self.nodes: list[NodeMetrics] = [
+            NodeMetrics(f"{i}:{node.worker.name}", node.worker.name)
+            for i, node in enumerate(order)
+        ]
+        self.conditions: list[ConditionMetrics] = []
+
+    def condition(self, source: int, target: int) -> ConditionMetrics:
+        """Create the metrics of the condition on edge source -> target"""
+        metrics = ConditionMetrics(self.nodes[source].label, self.nodes[target].label)
+        self.conditions.append(metrics)
+        return metrics
+
+    def stats(self) -> dict:
+        """Export every metric as a plain dict"""
+        return {
+            "nodes": [node.stats() for node in self.nodes],
+            "conditions": [condition.stats() for condition in self.conditions],
+        }
+
+    def to_prometheus(self, prefix: str = "sweetshop") -> str:
+        """Export every metric in the Prometheus text exposition format"""
+        lines = [
+            f"# TYPE {prefix}_node_calls_total counter",
+            f"# TYPE {prefix}_node_errors_total counter",
+            f"# TYPE {prefix}_node_latency_seconds summary",
+        ]
+        for node in self.nodes:
+            stats = node.stats()
+            labels = f'node="{node.label}",worker="{node.worker}"'
+            lines.append(f"{prefix}_node_calls_total{{{labels}}} {stats['calls']}")
+            lines.append(f"{prefix}_node_errors_total{{{labels}}} {stats['errors']}")
+            for q in QUANTILES:
+                value = stats[f"p{q * 100:g}_seconds"]
+                lines.append(
+                    f'{prefix}_node_latency_seconds{{{labels},quantile="{q}"}} {value}'
+                )
+            lines.append(
+                f"{prefix}_node_latency_seconds_sum{{{labels}}} {stats['total_seconds']}"
+            )
+            lines.append(
+                f"{prefix}_node_latency_seconds_count{{{labels}}} {stats['calls']}"
+            )
+
+        lines.append(f"# TYPE {prefix}_condition_evaluations_total counter")
+        lines.append(f"# TYPE {prefix}_condition_hits_total counter")
+        for condition in self.conditions:
+            stats = condition.stats()
+            labels = f'source="{condition.source}",target="{condition.target}"'
+            lines.append(
+                f"{prefix}_condition_evaluations_total{{{labels}}} "
+                f"{stats['evaluations']}"
+            )
+            lines.append(f"{prefix}_condition_hits_total{{{labels}}} {stats['hits']}")
+        return "\n".join(lines) + "\n"
+
+
+def timed_call(metrics: NodeMetrics, func: Callable, data: TData) -> TData:
+    """Call func, recording its latency and failure"""
+    start = time.perf_counter_ns()
+    try:
+        result = func(data)
+    except Exception:
+        metrics.observe(time.perf_counter_ns() - start, failed=True)
+        raise
+    metrics.observe(time.perf_counter_ns() - start)
+    return result
+
+
+def timed_batch_call(
+    metrics: NodeMetrics, func: Callable, items: list[TData]
+) -> list[TData]:
+    """Call func on a batch, recording the per-item latency"""
+    start = time.perf_counter_ns()
+    calls = max(len(items), 1)
+    try:
+        results = func(items)
+    except Exception:
+        metrics.observe(time.perf_counter_ns() - start, calls, failed=True)
+        raise
+    metrics.observe(time.perf_counter_ns() - start, calls)
+    return results
+
+
+async def atimed_call(metrics: NodeMetrics, func: Callable, data: TData) -> TData:
+    """Await func, recording its latency and failure"""
+    start = time.perf_counter_ns()
+    try:
+        result = await func(data)
+    except Exception:
+        metrics.observe(time.perf_counter_ns() - start, failed=True)
+        raise
+    metrics.observe(time.perf_counter_ns() - start)
+    return result
+
+
+def counted_condition(
+    metrics: ConditionMetrics, condition: Callable, data: TData
+) -> bool:
+    """Evaluate a branch condition, recording whether it matched"""
+    hit = bool(condition(data))
+    metrics.observe(hit)
+    return hit
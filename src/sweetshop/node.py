@@ -0,0 +1,80 @@
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Generic
+
+from sweetshop.base_data import TData
+from sweetshop.timeouts import check_timeout
+
+if TYPE_CHECKING:
+    from sweetshop.worker import Worker
+
+
+class Case:
+    """Branch condition matching data whose switch key equals value.
+
+    Switch branches route through a dict lookup of the key instead of
+    evaluating each case in turn.
+    """
+
+    __slots__ = ("key", "value")
+
+    def __init__(self, key: Callable, value: object):
+        self.key: Callable = key
+        self.value: object = value
+
+    def __call__(self, data: TData) -> bool:
+        return self.key(data) == self.value
+
+    def __repr__(self):
+        return f"Case(key={self.key!r}, value={self.value!r})"
+
+
+class Node(Generic[TData]):
+    def __init__(self, worker: "Worker", config: dict | None = None):
+        self.worker: "Worker" = worker
+        self.config: dict = config or {}
+        self.next_nodes: list["Node"] = []
+        self.condition: Callable | None = None
+        # Join nodes run once, merging the outputs of all finished branches
+        self.merge: Callable[[list[TData]], TData] | None = None
+        # Taken instead of next_nodes when none of their conditions match
+        self.fallback: Node | None = None
+        # Overrides the worker's timeout for this node
+        self.timeout: float | None = None
+        # Exclusive branch mode: "first", "adaptive" or "switch", None for all
+        self.routing: str | None = None
+
+    def add_next(self, node: "Node", condition: Callable | None = None):
+        self.next_nodes.append(node)
+        node.condition = condition
+
+    def with_timeout(self, timeout: float | None) -> "Node":
+        """Override the worker's timeout for this node, None to inherit it"""
+        check_timeout(timeout)
+        self.timeout = timeout
+        return self
+
+    def execute(self, data: TData) -> TData:
+        """Execute the node with given data"""
+        return self.worker.execute(data, **self.config)
+
+    def __repr__(self):
+        return f"Node(worker={self.worker}, config={self.config})"
+
+
+def clone_graph(nodes: list[Node]) -> dict[Node, Node]:
+    """Copy the given nodes and the edges between them, keyed by original.
+
+    Workers, conditions and merge functions are shared with the originals.
+    """
+    clones = {}
+    for node in nodes:
+        clone = Node(node.worker, dict(node.config))
+        clone.condition = node.condition
+        clone.merge = node.merge
+        clone.routing = node.routing
+        clone.timeout = node.timeout
+        clones[node] = clone
+    for node, clone in clones.items():
+        clone.next_nodes = [clones[n] for n in node.next_nodes]
+        clone.fallback = clones.get(node.fallback)
+    return clones
@@ -0,0 +1,319 @@
+import dis
+from collections.abc import Callable
+from functools import partial
+
+from sweetshop.base_data import TData
+from sweetshop.cache import config_key
+from sweetshop.errors import node_error
+from sweetshop.node import Case, Node, clone_graph
+from sweetshop.pipe import Pipe
+from sweetshop.plan import _bind, _type_error, topological_order
+from sweetshop.worker import Worker
+
+
+def _label(node: Node) -> str:
+    if not node.config:
+        return node.worker.name
+    config = ", ".join(f"{key}={value!r}" for key, value in node.config.items())
+    return f"{node.worker.name}({config})"
+
+
+def _condition_label(condition: Callable) -> str:
+    if isinstance(condition, Case):
+        return f"{getattr(condition.key, '__name__', condition.key)} == {condition.value!r}"
+    return getattr(condition, "__name__", repr(condition))
+
+
+def describe(pipe: Pipe) -> str:
+    """Render the graph of a pipe as one line per node in plan order.
+
+    Each line lists the node's successors, with their conditions, and its
+    fallback, merge and exclusive routing where set.
+    """
+    order = pipe.compile().nodes
+    index = {node: i for i, node in enumerate(order)}
+    lines = []
+    for i, node in enumerate(order):
+        line = f"{i}: {_label(node)}"
+        if node.merge is not None:
+            line += f" merge={getattr(node.merge, '__name__', node.merge)}"
+        edges = [
+            str(index[n])
+            if n.condition is None
+            else f"{index[n]} if {_condition_label(n.condition)}"
+            for n in node.next_nodes
+        ]
+        if edges:
+            line += f" -> {', '.join(edges)}"
+        if node.routing is not None:
+            line += f" ({node.routing})"
+        if node.fallback is not None:
+            line += f" else {index[node.fallback]}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class Optimization:
+    """Optimized copy of a pipe, with its graph before and after the passes."""
+
+    def __init__(self, pipe: Pipe, before: str):
+        self.pipe: Pipe = pipe
+        self.before: str = before
+        self.after: str = ""
+        self.pruned: int = 0
+        self.deduplicated: int = 0
+        self.fused: int = 0
+
+    def __str__(self):
+        return (
+            f"before:\n{self.before}\nafter:\n{self.after}\n"
+            f"pruned {self.pruned} edges, deduplicated {self.deduplicated} nodes, "
+            f"fused {self.fused} nodes"
+        )
+
+    def __repr__(self):
+        return (
+            f"Optimization(pruned={self.pruned}, deduplicated={self.deduplicated}, "
+            f"fused={self.fused})"
+        )
+
+
+_CONSTANT_LOADS = ("LOAD_CONST", "LOAD_SMALL_INT")
+
+
+def constant_condition(condition: Callable) -> bool | None:
+    """Truth value of a condition whose body is a constant, None otherwise"""
+    code = getattr(condition, "__code__", None)
+    if code is None:
+        return None
+    ops = []
+    for instruction in dis.get_instructions(code):
+        if instruction.opname == "RETURN_CONST":
+            # Python 3.12 and 3.13 fold the load into the return
+            ops += [("LOAD_CONST", instruction.argval), ("RETURN_VALUE", None)]
+        elif instruction.opname not in ("RESUME", "NOP", "CACHE"):
+            ops.append((instruction.opname, instruction.argval))
+    if len(ops) == 2 and ops[0][0] in _CONSTANT_LOADS and ops[1][0] == "RETURN_VALUE":
+        return bool(ops[0][1])
+    return None
+
+
+def _prune(order: list[Node]) -> int:
+    """Drop edges whose condition is constantly false, unguard true ones"""
+    pruned = 0
+    for node in order:
+        exclusive = node.routing in ("first", "adaptive")
+        kept = []
+        for position, next_node in enumerate(node.next_nodes):
+            if next_node.condition is not None:
+                constant = constant_condition(next_node.condition)
+                if constant is False:
+                    pruned += 1
+                    continue
+                if constant:
+                    next_node.condition = None
+            kept.append(next_node)
+            if exclusive and next_node.condition is None:
+                # No branch after an unconditional one is ever taken
+                pruned += len(node.next_nodes) - position - 1
+                break
+        node.next_nodes = kept
+        if not kept and node.fallback is not None:
+            # Without branches left, the fallback join is the only way on
+            node.add_next(node.fallback)
+            node.fallback = None
+        if exclusive and all(n.condition is None for n in kept):
+            node.routing = None
+    return pruned
+
+
+def _in_degrees(order: list[Node]) -> dict[Node, int]:
+    degrees = {node: 0 for node in order}
+    for node in order:
+        for next_node in node.next_nodes:
+            degrees[next_node] += 1
+    return degrees
+
+
+def _dedupe(order: list[Node]) -> int:
+    """Merge sibling nodes computing the same worker and config on the same data.
+
+    Only adjacent siblings reached under the same condition and continuing
+    unconditionally into distinct nodes are merged, so every downstream
+    node still receives the same inputs, in the same order.
+    """
+    degrees = _in_degrees(order)
+    merged = 0
+    for node in order:
+        if node.routing is not None:
+            continue
+        kept: dict[tuple, Node] = {}
+        for next_node in list(node.next_nodes):
+            if (
+                degrees[next_node] != 1
+                or next_node.merge is not None
+                or next_node.fallback is not None
+                or next_node.routing is not None
+                or not next_node.next_nodes
+                or any(n.condition is not None for n in next_node.next_nodes)
+            ):
+                continue
+            key = (
+                next_node.worker,
+                repr(sorted(next_node.config.items())),
+                id(next_node.condition),
+                next_node.timeout,
+            )
+            twin = kept.setdefault(key, next_node)
+            if twin is next_node:
+                continue
+            siblings = node.next_nodes
+            # Only adjacent twins merge, so joins still see their inputs
+            # in branch order
+            if siblings.index(twin) + 1 != siblings.index(next_node) or (
+                set(twin.next_nodes) & set(next_node.next_nodes)
+            ):
+                kept[key] = next_node
+                continue
+            twin.next_nodes += next_node.next_nodes
+            node.next_nodes.remove(next_node)
+            merged += 1
+    return merged
+
+
+def _fusable(node: Node) -> bool:
+    worker = node.worker
+    return (
+        worker.executor is None
+        and not worker.batch
+        and not worker.is_async
+        and worker.cache is None
+        and worker.timeout is None
+        and worker.hedge is None
+        and worker.limiter is None
+        and node.timeout is None
+    )
+
+
+def _run_steps(steps: tuple[tuple[Node, Callable, type], ...], data: TData) -> TData:
+    """Run the workers of a fused chain, failing as their own node would"""
+    node, func, _ = steps[0]
+    try:
+        data = func(data)
+        for node, func, data_type in steps[1:]:
+            if not isinstance(data, data_type):
+                raise _type_error(data_type, data)
+            data = func(data)
+    except Exception as e:
+        raise node_error(node, e) from e
+    return data
+
+
+def _fuse(chain: list[Node], trusted: bool) -> Node:
+    """Build the node running a linear chain as a single call"""
+    steps = tuple(
+        (node, _bind(node), object if trusted else node.worker.data_type)
+        for node in chain
+    )
+    first, last = chain[0], chain[-1]
+    # Cached results of the chain go stale when any of its workers changes
+    version = repr(
+        tuple(
+            (node.worker.name, node.worker.version, config_key(node.config))
+            for node in chain
+        )
+    )
+    worker = Worker(
+        partial(_run_steps, steps),
+        name="+".join(map(_label, chain)),
+        data_type=first.worker.data_type,
+        inplace=any(node.worker.inplace for node in chain),
+        version=version,
+    )
+    fused = Node(worker)
+    fused.condition = first.condition
+    fused.merge = first.merge
+    fused.next_nodes = list(last.next_nodes)
+    fused.fallback = last.fallback
+    fused.routing = last.routing
+    return fused
+
+
+def _fuse_chains(order: list[Node], trusted: bool) -> dict[Node, Node]:
+    """Replace every unbranched run of plain nodes by one fused node.
+
+    Returns the fused node of every node that was fused.
+    """
+    degrees = _in_degrees(order)
+    replaced: dict[Node, Node] = {}
+    for node in order:
+        if node in replaced or not _fusable(node):
+            continue
+        chain = [node]
+        while (
+            len(chain[-1].next_nodes) == 1
+            and chain[-1].fallback is None
+            and chain[-1].routing is None
+        ):
+            next_node = chain[-1].next_nodes[0]
+            if (
+                next_node.condition is not None
+                or degrees[next_node] != 1
+                or next_node.merge is not None
+                or not _fusable(next_node)
+            ):
+                break
+            chain.append(next_node)
+        if len(chain) > 1:
+            replaced.update(dict.fromkeys(chain, _fuse(chain, trusted)))
+
+    for node in {*order, *replaced.values()}:
+        node.next_nodes = [replaced.get(n, n) for n in node.next_nodes]
+        node.fallback = replaced.get(node.fallback, node.fallback)
+    return replaced
+
+
+def optimize(
+    pipe: Pipe, prune: bool = True, dedupe: bool = True, fuse: bool = True
+) -> Optimization:
+    """Optimize a copy of a finished pipe's graph, leaving the pipe untouched.
+
+    The passes run in this order: prune drops branches whose condition is
+    a constant false and unguards constant true ones, dedupe merges sibling
+    nodes running the same worker and config on the same input, and fuse
+    turns unbranched chains of plain synchronous nodes into one node, so
+    each chain costs a single dispatch. Workers are assumed to be pure, as
+    for caching. Fused nodes report failures as their original node but
+    share one metrics entry and one timeout check of a run deadline.
+    """
+    if pipe.current_node is None:
+        raise ValueError("Pipe has no start node")
+    order = list(pipe.compile().nodes)
+    result = Optimization(Pipe(data_type=pipe.data_type), describe(pipe))
+    clones = clone_graph(order)
+    order = [clones[node] for node in order]
+    start, current = order[0], clones[pipe.current_node]
+
+    if prune:
+        result.pruned = _prune(order)
+        # Branches that can no longer be reached are dropped with their edges
+        order = topological_order(start, [start])
+    if dedupe:
+        result.deduplicated = _dedupe(order)
+    if fuse:
+        replaced = _fuse_chains(topological_order(start, [start]), pipe.trusted)
+        result.fused = len(replaced)
+        start = replaced.get(start, start)
+        current = replaced.get(current, current)
+    order = topological_order(start, [start])
+
+    optimized = result.pipe
+    optimized.start_node = start
+    optimized.current_node = current if current in order else order[-1]
+    optimized.nodes = order
+    optimized.trusted = pipe.trusted
+    optimized.metrics_enabled = pipe.metrics_enabled
+    optimized.result_cache = pipe.result_cache
+    optimized.tracer = pipe.tracer
+    result.after = describe(optimized)
+    return result
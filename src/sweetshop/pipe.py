@@ -1,29 +1,19 @@
-from collections import deque
-from collections.abc import Callable
+from collections.abc import Callable, Generator, Iterable, Iterator
+from concurrent.futures import Executor
 from typing import Generic, Type
 
 from sweetshop.base_data import TData
+from sweetshop.cache import LRU, DiskCache
+from sweetshop.metrics import PipeMetrics
+from sweetshop.node import Case, Node, clone_graph
+from sweetshop.plan import ExecutionPlan, topological_order
 from sweetshop.registry import BaseRegistry
-from sweetshop.worker import Worker
+from sweetshop.tracing import Tracer
 
 
-class Node(Generic[TData]):
-    def __init__(self, worker: Worker, config: dict | None = None):
-        self.worker: Worker = worker
-        self.config: dict = config or {}
-        self.next_nodes: list["Node"] = []
-        self.condition: Callable | None = None
-
-    def add_next(self, node: "Node", condition: Callable | None = None):
-        self.next_nodes.append(node)
-        node.condition = condition
-
-    def execute(self, data: TData) -> TData:
-        """Execute the node with given data"""
-        return self.worker.execute(data, **self.config)
-
-    def __repr__(self):
-        return f"Node(worker={self.worker}, config={self.config})"
+def first_result(results: list[TData]) -> TData:
+    """Default join policy: keep the output of the first matching branch"""
+    return results[0]
 
 
 class Pipe(Generic[TData]):
@@ -34,101 +24,284 @@ class Pipe(Generic[TData]):
         # Branch management
         self.branch_node: Node | None = None
         self.branch_end_nodes: list[Node] = []  # Track all branch end nodes
-
-    def start_with(self, node: Node) -> "Pipe":
+        # Key function of the open switch(), whose branches are added by case()
+        self.branch_key: Callable | None = None
+        # Branch node and merge function of the branch awaiting its join
+        self.branch_join: tuple[Node, Callable] | None = None
+        # Every node added through the builder, used to validate the graph
+        self.nodes: list[Node] = []
+        self.metrics_enabled: bool = False
+        # Trusted plans skip the per-call type checks of every node
+        self.trusted: bool = False
+        # Result cache of the nodes whose worker has no cache of its own
+        self.result_cache: LRU | DiskCache | None = None
+        # Tracer recording a sample of the runs as Chrome trace events
+        self.tracer: Tracer | None = None
+        self._plan: ExecutionPlan[TData] | None = None
+
+    def _add(self, node: Node) -> None:
+        """Track a node added to the graph and drop the stale plan"""
+        self.nodes.append(node)
+        self._plan = None
+
+    def _inline(self, node: "Node | Pipe") -> tuple[Node, Node]:
+        """Add a node or a copy of a sub-pipe's graph, returning its entry and exit.
+
+        A sub-pipe is inlined node by node, so nesting costs nothing at run
+        time. Its own metrics, trust, result cache and tracer settings are
+        ignored in favour of this pipe's, and later changes to it are not seen.
+        """
+        if not isinstance(node, Pipe):
+            self._add(node)
+            return node, node
+        if node.start_node is None or node.current_node is None:
+            raise ValueError("Sub-pipe has no start node")
+        if node.branch_node is not None or node.branch_join is not None:
+            raise ValueError("Sub-pipe branch must be joined before it is reused")
+
+        clones = clone_graph(node.nodes)
+        for clone in clones.values():
+            self._add(clone)
+        return clones[node.start_node], clones[node.current_node]
+
+    def start_with(self, node: "Node | Pipe") -> "Pipe":
+        node, self.current_node = self._inline(node)
         self.start_node = node
-        self.current_node = node
         return self
 
-    def then(self, node: Node) -> "Pipe":
-        """Connect the next node in sequence"""
+    def then(self, node: "Node | Pipe") -> "Pipe":
+        """Connect the next node, or sub-pipe, in sequence"""
         if self.current_node is None:
             raise ValueError("No current node to connect to")
 
-        # We're after end_branch() - connect to all branch end nodes
+        node, exit_node = self._inline(node)
+        # We're after end_branch() - join all branch end nodes into this node
         if not self.branch_node and self.branch_end_nodes:
             for end_node in self.branch_end_nodes:
                 end_node.add_next(node)
             self.branch_end_nodes.clear()  # Clear after connecting
+            branch_node, node.merge = self.branch_join
+            # Data no branch matched goes straight to the join
+            branch_node.fallback = node
         else:
             # Normal sequential connection
             self.current_node.add_next(node)
+        self.branch_join = None
 
-        self.current_node = node
+        self.current_node = exit_node
         return self
 
-    def branch(self) -> "Pipe":
-        """Start a branching structure"""
+    def branch(self, exclusive: bool = False, adaptive: bool = False) -> "Pipe":
+        """Start a branching structure.
+
+        By default every branch whose condition matches runs. An exclusive
+        branch runs only the first matching one, in declaration order. An
+        adaptive branch is exclusive and periodically evaluates the most
+        frequently matching conditions first, so use it only when at most
+        one condition can match.
+        """
         self.branch_node = self.current_node
+        if self.branch_node is not None:
+            self.branch_node.routing = (
+                "adaptive" if adaptive else "first" if exclusive else None
+            )
+        self.branch_key = None
         self.branch_end_nodes.clear()
         return self
 
-    def on(self, condition_func: Callable, node: Node) -> "Pipe":
-        """Start a conditional branch with given condition function"""
+    def switch(self, key: Callable) -> "Pipe":
+        """Start an exclusive branching structure dispatching on key(data).
+
+        The key is computed once per item and looked up in a table of the
+        values given to case(), instead of evaluating one condition per
+        branch. Data without a matching case takes the end_branch() path.
+        """
+        if self.current_node is None:
+            raise ValueError("No current node to connect to")
+
+        self.branch()
+        self.branch_node.routing = "switch"
+        self.branch_key = key
+        return self
+
+    def case(self, value: object, node: "Node | Pipe") -> "Pipe":
+        """Start the branch of a switch taken when the key equals value"""
+        if self.branch_key is None:
+            raise ValueError("Must call switch() before case()")
+        return self.on(Case(self.branch_key, value), node)
+
+    def on(self, condition_func: Callable, node: "Node | Pipe") -> "Pipe":
+        """Start a conditional branch, of a node or sub-pipe, with given condition"""
         if self.current_node is None:
             raise ValueError("No current node to connect to")
 
         if self.branch_node is None:
             raise ValueError("Must call branch() before on()")
 
+        if self.branch_key is not None and not isinstance(condition_func, Case):
+            raise ValueError("Use case() to add branches to a switch")
+
+        node, exit_node = self._inline(node)
         self.branch_node.add_next(node, condition_func)
 
         # If we have a previous branch chain, record its end node
         if self.current_node != self.branch_node:
             self.branch_end_nodes.append(self.current_node)
 
-        # Set current_node to the new branch node for then() calls
-        self.current_node = node
+        # Set current_node to the new branch's last node for then() calls
+        self.current_node = exit_node
         return self
 
-    def end_branch(self) -> "Pipe":
-        """End the current branching structure"""
+    def end_branch(self, merge: Callable[[list[TData]], TData] | None = None) -> "Pipe":
+        """End the current branching structure.
+
+        The node connected next is a join: it runs once after all matching
+        branches finish, with their outputs combined by merge. By default the
+        output of the first matching branch is kept.
+        """
         if self.current_node is None:
             raise ValueError("No current node to connect to")
 
         if self.branch_node is None:
             raise ValueError("No active branch to end")
 
+        if self.branch_key is not None and not self.branch_node.next_nodes:
+            raise ValueError("Switch must have at least one case()")
+
         # Add the current node as a branch end node if it's not the start node
         if self.current_node != self.branch_node:
             self.branch_end_nodes.append(self.current_node)
 
         # Clear branch state
+        self.branch_join = (self.branch_node, merge or first_result)
         self.branch_node = None
+        self.branch_key = None
         # current_node will be set by the next then() call
         return self
 
-    def execute(self, data: TData) -> TData:
-        """Execute the pipe with the given initial data"""
-        if self.start_node is None:
-            raise ValueError("Pipe has no start node")
+    def compile(self) -> ExecutionPlan[TData]:
+        """Validate the graph once and return its cached execution plan"""
+        if self._plan is None:
+            if self.start_node is None:
+                raise ValueError("Pipe has no start node")
+            if self.branch_node is not None:
+                raise ValueError("Branch must be closed with end_branch()")
+            for node in self.nodes:
+                data_type = node.worker.data_type
+                if not issubclass(self.data_type, data_type):
+                    raise TypeError(
+                        f"Node {node} expects {data_type.__name__}, which "
+                        f"{self.data_type.__name__} data is not"
+                    )
+
+            self._plan = ExecutionPlan(
+                topological_order(self.start_node, self.nodes),
+                metrics=self.metrics_enabled,
+                trusted=self.trusted,
+                cache=self.result_cache,
+                tracer=self.tracer,
+            )
+        return self._plan
+
+    def enable_metrics(self, enabled: bool = True) -> "Pipe":
+        """Record per-node runtime metrics, exposed through stats()"""
+        self.metrics_enabled = enabled
+        self._plan = None
+        return self
 
-        # Use BFS to traverse the pipe
-        queue = deque([(self.start_node, data)])
-        final_results = []
+    def trust(self, enabled: bool = True) -> "Pipe":
+        """Skip per-call type checks, relying on the check done at compile.
 
-        while queue:
-            current_node, current_data = queue.popleft()
+        Only the pipe's data type is verified against every worker, so trust
+        pipes whose workers return the data type they are given.
+        """
+        self.trusted = enabled
+        self._plan = None
+        return self
 
-            # Execute current node
-            try:
-                result_data = current_node.execute(current_data)
-            except Exception as e:
-                raise RuntimeError(f"Node {current_node} execution failed: {e}")
+    def cache_results(self, cache: LRU | DiskCache | None) -> "Pipe":
+        """Cache the result of every node whose worker has no cache of its own.
 
-            # Check if this node has any next nodes
-            has_next: bool = False
-            for next_node in current_node.next_nodes:
-                if next_node.condition is None or next_node.condition(result_data):
-                    queue.append((next_node, result_data))
-                    has_next = True
+        With a DiskCache, re-running the pipe on the same data skips every
+        node that already finished, so a run that failed late resumes from
+        its last successful node, even in another process.
+        """
+        self.result_cache = cache
+        self._plan = None
+        return self
+
+    def trace(self, tracer: Tracer | None) -> "Pipe":
+        """Trace a sample of the runs, writing them as Chrome trace events.
 
-            # If no next nodes executed, this could be a final result
-            if not has_next:
-                final_results.append(result_data)
+        Each sampled run records a span per node call and the branch
+        decisions it takes; see Tracer for the sampling and the file.
+        """
+        self.tracer = tracer
+        self._plan = None
+        return self
 
-        # TODO: support multiple final results
-        return final_results[0]
+    def stats(self) -> dict:
+        """Get the per-node and branch condition metrics as a dict"""
+        return self.metrics().stats()
+
+    def metrics(self) -> PipeMetrics:
+        """Get the runtime metrics of the compiled plan"""
+        metrics = self.compile().metrics
+        if metrics is None:
+            raise ValueError("Metrics are not enabled, call enable_metrics()")
+        return metrics
+
+    def execute(
+        self,
+        data: TData,
+        executor: Executor | None = None,
+        timeout: float | None = None,
+    ) -> TData:
+        """Execute the pipe with the given initial data.
+
+        With an executor, such as a ThreadPoolExecutor, matching branches run
+        concurrently and are joined before the node after end_branch(). With
+        a timeout in seconds, the run fails with DeadlineExceededError once
+        it expires, skipping the remaining nodes. Node failures raise a
+        NodeExecutionError holding the node and the original exception.
+        """
+        return self.compile().execute(data, executor, timeout)
+
+    def execute_all(
+        self,
+        data: TData,
+        executor: Executor | None = None,
+        timeout: float | None = None,
+    ) -> list[tuple[Node, TData]]:
+        """Execute the pipe and return every final result with its leaf node.
+
+        Every branch that does not end in a join produces its own result,
+        of which execute() only returns the first.
+        """
+        return self.compile().execute_all(data, executor, timeout)
+
+    def iter_results(
+        self,
+        data: TData,
+        executor: Executor | None = None,
+        timeout: float | None = None,
+    ) -> Iterator[tuple[Node, TData]]:
+        """Execute the pipe, yielding each leaf node and result as it finishes"""
+        return self.compile().iter_results(data, executor, timeout)
+
+    async def aexecute(self, data: TData, timeout: float | None = None) -> TData:
+        """Asynchronously execute the pipe, awaiting async workers"""
+        return await self.compile().aexecute(data, timeout)
+
+    def execute_many(self, items: Iterable[TData]) -> list[TData]:
+        """Execute the pipe over a batch of data, one result per item"""
+        return self.compile().execute_many(items)
+
+    def stream(
+        self, items: Iterable[TData], batch_size: int = 1
+    ) -> Generator[TData, None, None]:
+        """Lazily execute the pipe over items, yielding results as they finish"""
+        return self.compile().stream(items, batch_size)
 
     def __repr__(self):
         return f"Pipe(data_type={self.data_type.__name__})"
@@ -137,20 +310,41 @@ class Pipe(Generic[TData]):
 class PipeRegistry(BaseRegistry[Pipe]):
     """Registry for managing Pipe instances."""
 
+    entry_point_group = "sweetshop.pipes"
+
     def __getattr__(self, name: str) -> Pipe:
         """Allow accessing pipes as attributes."""
         if self.exists(name):
-            return self._registry[name]
+            return self.get(name)
         raise AttributeError(f"Pipe '{name}' not found in registry")
 
-    def register_pipe(self, name: str | None = None) -> Callable:
-        """Register decorator for pipes"""
+    def _coerce(self, obj: object) -> Pipe:
+        """Accept a pipe or a function building one"""
+        pipe = obj if isinstance(obj, Pipe) else obj()
+        if not isinstance(pipe, Pipe):
+            raise TypeError(f"Expected a Pipe, got {type(pipe).__name__}")
+        return pipe
+
+    def get_plan(self, name: str) -> ExecutionPlan:
+        """Get the compiled execution plan of a registered pipe."""
+        return self.get(name).compile()
+
+    def register_pipe(self, name: str | None = None, compile: bool = False) -> Callable:
+        """Register decorator for pipes.
+
+        The builder runs on first access of the pipe, unless compile asks
+        for the pipe to be built and compiled up front.
+        """
 
         def wrapper(func: Callable[[], Pipe]) -> None:
             nonlocal name
             name = name or getattr(func, "__name__", "unknown_pipe")
-            pipe: Pipe = func()
+            if not compile:
+                self.register_lazy(name, func)
+                return
 
+            pipe: Pipe = func()
+            pipe.compile()
             self.register(name, pipe)
 
         return wrapper
@@ -0,0 +1,969 @@
+import asyncio
+import queue
+import time
+from collections.abc import Callable, Generator, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from contextvars import copy_context
+from functools import partial
+from itertools import islice
+from operator import itemgetter
+from typing import TYPE_CHECKING, Generic, cast
+
+from sweetshop.base_data import TData
+from sweetshop.cache import (
+    LRU,
+    DiskCache,
+    acached_call,
+    cached_batch_call,
+    cached_call,
+    config_key,
+)
+from sweetshop.errors import DeadlineExceededError, NodeExecutionError, node_error
+from sweetshop.limits import alimited_call, limited_call
+from sweetshop.metrics import (
+    PipeMetrics,
+    atimed_call,
+    counted_condition,
+    timed_batch_call,
+    timed_call,
+)
+from sweetshop.process import run_in_process, run_many_in_process
+from sweetshop.timeouts import (
+    AsyncHedge,
+    Hedge,
+    acall_with_timeout,
+    call_with_timeout,
+    start_call,
+)
+from sweetshop.tracing import (
+    Tracer,
+    atraced_call,
+    traced_call,
+    traced_condition,
+    traced_router,
+)
+
+if TYPE_CHECKING:
+    from sweetshop.node import Case, Node
+
+
+def _bind(node: "Node") -> Callable:
+    """Pre-bind a node's worker function to its configuration"""
+    if node.config:
+        return partial(node.worker.func, **node.config)
+    return node.worker.func
+
+
+def _call_single(func: Callable, data: TData) -> TData:
+    """Run a batch worker function on a single item"""
+    return func([data])[0]
+
+
+def _call_each(func: Callable, items: list[TData]) -> list[TData]:
+    """Run a per-item worker function over a batch"""
+    return [func(item) for item in items]
+
+
+def _run_sync(func: Callable, data: TData) -> TData:
+    """Run an async worker function to completion from synchronous code"""
+    return asyncio.run(func(data))
+
+
+async def _acall_single(func: Callable, data: TData) -> TData:
+    """Await an async batch worker function on a single item"""
+    return (await func([data]))[0]
+
+
+async def _offload(func: Callable, data: TData) -> TData:
+    """Run a synchronous call in the loop's executor to avoid blocking it"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, data)
+
+
+def _bind_worker_calls(node: "Node") -> tuple[Callable, Callable, Callable]:
+    """Bind a node's worker into its single, batch and async call forms"""
+    if node.worker.executor == "process":
+        call = partial(run_in_process, node.worker, node.config)
+        batch_call = partial(run_many_in_process, node.worker, node.config)
+        return call, batch_call, partial(_offload, call)
+
+    func = _bind(node)
+    if node.worker.is_async:
+        acall = partial(_acall_single, func) if node.worker.batch else func
+        func = partial(_run_sync, func)
+    if node.worker.batch:
+        call, batch_call = partial(_call_single, func), func
+    else:
+        call, batch_call = func, partial(_call_each, func)
+    if not node.worker.is_async:
+        acall = partial(_offload, call)
+    return call, batch_call, acall
+
+
+def _bind_calls(
+    node: "Node", default_cache: LRU | DiskCache | None = None
+) -> tuple[Callable, Callable, Callable]:
+    """Bind a node's calls, wrapping them in the worker's opt-in features"""
+    call, batch_call, acall = _bind_worker_calls(node)
+    worker = node.worker
+    if worker.limiter is not None:
+        # Innermost, so hedged attempts and calls left running after a
+        # timeout keep holding their slot
+        call = partial(limited_call, worker.limiter, call)
+        batch_call = partial(limited_call, worker.limiter, batch_call)
+        if worker.is_async:
+            acall = partial(alimited_call, worker.limiter, acall)
+        else:
+            acall = partial(_offload, call)
+    if worker.hedge is not None:
+        # A batch call is hedged as a whole
+        call = Hedge(call, worker.hedge)
+        batch_call = Hedge(batch_call, worker.hedge)
+        if worker.is_async:
+            acall = AsyncHedge(acall, worker.hedge)
+        else:
+            acall = partial(_offload, call)
+    timeout = node.timeout if node.timeout is not None else worker.timeout
+    if timeout is not None:
+        # A batch call is bounded as a whole
+        call = partial(call_with_timeout, timeout, call)
+        batch_call = partial(call_with_timeout, timeout, batch_call)
+        acall = partial(acall_with_timeout, timeout, acall)
+    cache = worker.cache
+    if cache is None:
+        cache = default_cache
+    if cache is not None:
+        prefix = (worker.name, worker.version, config_key(node.config))
+        # Cached results must not be mutated by this or a downstream node
+        isolate = node.worker.inplace or any(
+            n is not None and n.worker.inplace
+            for n in (*node.next_nodes, node.fallback)
+        )
+        call = partial(cached_call, cache, prefix, call, isolate=isolate)
+        batch_call = partial(
+            cached_batch_call, cache, prefix, batch_call, isolate=isolate
+        )
+        acall = partial(acached_call, cache, prefix, acall, isolate=isolate)
+    return call, batch_call, acall
+
+
+def _instrument(
+    metrics: PipeMetrics,
+    calls: tuple[Callable, ...],
+    batch_calls: tuple[Callable, ...],
+    async_calls: tuple[Callable, ...],
+    successors: tuple[tuple[tuple[int, Callable | None], ...], ...],
+) -> tuple:
+    """Wrap bound calls and branch conditions to record runtime metrics"""
+
+    def count(source: int, target: int, condition: Callable | None):
+        if condition is None:
+            return None
+        return partial(counted_condition, metrics.condition(source, target), condition)
+
+    nodes = metrics.nodes
+    return (
+        tuple(partial(timed_call, m, call) for m, call in zip(nodes, calls)),
+        tuple(partial(timed_batch_call, m, c) for m, c in zip(nodes, batch_calls)),
+        tuple(partial(atimed_call, m, call) for m, call in zip(nodes, async_calls)),
+        tuple(
+            tuple((target, count(source, target, cond)) for target, cond in edges)
+            for source, edges in enumerate(successors)
+        ),
+    )
+
+
+def _trace(
+    order: list["Node"],
+    calls: tuple[Callable, ...],
+    async_calls: tuple[Callable, ...],
+    successors: tuple[tuple[tuple[int, Callable | None], ...], ...],
+    routers: tuple[Callable | None, ...],
+) -> tuple:
+    """Wrap bound calls, conditions and routers to record sampled runs"""
+    labels = tuple(f"{i}:{node.worker.name}" for i, node in enumerate(order))
+    spans = [
+        (label, {"worker": node.worker.name, "config": node.config})
+        for label, node in zip(labels, order)
+    ]
+
+    def decide(source: int, target: int, condition: Callable | None):
+        if condition is None or routers[source] is not None:
+            return condition
+        name = f"{labels[source]} -> {labels[target]}"
+        return partial(traced_condition, name, condition)
+
+    return (
+        tuple(partial(traced_call, *span, call) for span, call in zip(spans, calls)),
+        tuple(
+            partial(atraced_call, *span, call) for span, call in zip(spans, async_calls)
+        ),
+        tuple(
+            tuple((target, decide(source, target, cond)) for target, cond in edges)
+            for source, edges in enumerate(successors)
+        ),
+        tuple(
+            router and partial(traced_router, f"{label} route", labels, router)
+            for label, router in zip(labels, routers)
+        ),
+    )
+
+
+def _first_match(
+    edges: tuple[tuple[int, Callable | None], ...], data: TData
+) -> int | None:
+    """Route data to the first successor whose condition matches"""
+    for target, condition in edges:
+        if condition is None or condition(data):
+            return target
+    return None
+
+
+def _dispatch(key: Callable, table: dict, data: TData) -> int | None:
+    """Route data to the successor registered for its switch key"""
+    return table.get(key(data))
+
+
+class _SelectivityOrder(Generic[TData]):
+    """First-match router evaluating the most selected conditions first.
+
+    Hits are counted per condition and the conditions are re-sorted every
+    interval calls, halving the counts so the order follows drifting
+    traffic. Reordering only preserves the routing of exclusive conditions.
+    """
+
+    __slots__ = ("edges", "hits", "calls", "interval")
+
+    def __init__(
+        self, edges: tuple[tuple[int, Callable | None], ...], interval: int = 1024
+    ):
+        self.edges: list[tuple[int, Callable | None]] = list(edges)
+        self.hits: list[int] = [0] * len(edges)
+        self.calls: int = 0
+        self.interval: int = interval
+
+    def __call__(self, data: TData) -> int | None:
+        self.calls += 1
+        if self.calls % self.interval == 0:
+            self.reorder()
+        hits = self.hits
+        for slot, (target, condition) in enumerate(self.edges):
+            if condition is None or condition(data):
+                hits[slot] += 1
+                return target
+        return None
+
+    def reorder(self) -> None:
+        ranked = sorted(zip(self.hits, self.edges), key=itemgetter(0), reverse=True)
+        # Swap whole lists so concurrent callers never see a partial order
+        self.edges = [edge for _, edge in ranked]
+        self.hits = [hits // 2 for hits, _ in ranked]
+
+
+def _router(
+    node: "Node[TData]", edges: tuple[tuple[int, Callable | None], ...]
+) -> Callable[[TData], int | None] | None:
+    """Build the router of an exclusive branch node, None for other nodes"""
+    if node.routing == "switch":
+        # Switch branches are only added with case(), so every condition is one
+        cases = [cast("Case", next_node.condition) for next_node in node.next_nodes]
+        table: dict = {}
+        for (target, _), case in zip(edges, cases):
+            # Like first-match, the earliest case of a repeated value wins
+            table.setdefault(case.value, target)
+        return partial(_dispatch, cases[0].key, table)
+    if node.routing == "adaptive":
+        return _SelectivityOrder(edges)
+    if node.routing == "first":
+        return partial(_first_match, edges)
+    return None
+
+
+def _deadline(timeout: float) -> float:
+    """Monotonic clock time at which a run started now with timeout ends"""
+    if timeout <= 0:
+        raise ValueError("timeout must be positive")
+    return time.monotonic() + timeout
+
+
+def _type_error(expected: type, data: object) -> TypeError:
+    return TypeError(
+        f"Expected first argument of type {expected.__name__}, "
+        f"got {type(data).__name__}"
+    )
+
+
+def topological_order(start: "Node", nodes: list["Node"]) -> list["Node"]:
+    """Order the nodes reachable from start, validating the graph.
+
+    Branches are laid out one after another in declaration order, so the
+    end nodes feeding a join are ordered like their branches. Raises
+    ValueError when the graph contains a cycle or when any of the given
+    nodes cannot be reached from start.
+    """
+    # Iterative depth-first search: False while a node is on the stack
+    done: dict[Node, bool] = {start: False}
+    stack = [(start, reversed(start.next_nodes))]
+    order: list[Node] = []
+    while stack:
+        node, next_nodes = stack[-1]
+        for next_node in next_nodes:
+            if next_node not in done:
+                done[next_node] = False
+                stack.append((next_node, reversed(next_node.next_nodes)))
+                break
+            if not done[next_node]:
+                raise ValueError(f"Cycle detected at node {next_node}")
+        else:
+            stack.pop()
+            done[node] = True
+            order.append(node)
+
+    unreachable = [node for node in nodes if node not in done]
+    if unreachable:
+        raise ValueError(f"Unreachable nodes in pipe: {unreachable}")
+    order.reverse()
+    return order
+
+
+class ExecutionPlan(Generic[TData]):
+    """Flat, immutable execution form of a validated Pipe graph.
+
+    Nodes are stored in topological order, edges become successor index
+    tables and worker functions are pre-bound to their node configuration,
+    so running the plan does no graph walking.
+    """
+
+    __slots__ = (
+        "nodes",
+        "calls",
+        "batch_calls",
+        "async_calls",
+        "data_types",
+        "successors",
+        "routers",
+        "fallbacks",
+        "merges",
+        "in_degrees",
+        "linear",
+        "forks",
+        "metrics",
+        "trusted",
+        "tracer",
+    )
+
+    nodes: tuple["Node", ...]
+    calls: tuple[Callable, ...]
+    batch_calls: tuple[Callable, ...]
+    async_calls: tuple[Callable, ...]
+    data_types: tuple[type, ...]
+    successors: tuple[tuple[tuple[int, Callable | None], ...], ...]
+    routers: tuple[Callable[[TData], int | None] | None, ...]
+    fallbacks: tuple[int | None, ...]
+    merges: tuple[Callable[[list[TData]], TData] | None, ...]
+    in_degrees: tuple[int, ...]
+    linear: bool
+    forks: tuple[tuple[int, ...], ...]
+    metrics: PipeMetrics | None
+    trusted: bool
+    tracer: Tracer | None
+
+    def __init__(
+        self,
+        order: list["Node"],
+        metrics: bool = False,
+        trusted: bool = False,
+        cache: LRU | DiskCache | None = None,
+        tracer: Tracer | None = None,
+    ):
+        index = {node: i for i, node in enumerate(order)}
+        # Nodes without a cache of their own store their results in cache
+        calls, batch_calls, async_calls = zip(
+            *(_bind_calls(node, cache) for node in order)
+        )
+        successors = tuple(
+            tuple((index[n], n.condition) for n in node.next_nodes) for node in order
+        )
+        # Metrics are bound in at compile time so disabled plans pay nothing
+        pipe_metrics = PipeMetrics(order) if metrics else None
+        if pipe_metrics is not None:
+            calls, batch_calls, async_calls, successors = _instrument(
+                pipe_metrics, calls, batch_calls, async_calls, successors
+            )
+        # Exclusive branch nodes route each item to at most one successor
+        routers = tuple(
+            _router(node, edges) if node.next_nodes else None
+            for node, edges in zip(order, successors)
+        )
+        if tracer is not None:
+            calls, async_calls, successors, routers = _trace(
+                order, calls, async_calls, successors, routers
+            )
+        in_degrees = [0] * len(order)
+        for edges in successors:
+            for target, _ in edges:
+                in_degrees[target] += 1
+        # A linear plan is a chain of unconditional single successors
+        linear = not successors[-1] and all(
+            edges == ((i + 1, None),) for i, edges in enumerate(successors[:-1])
+        )
+        object.__setattr__(self, "nodes", tuple(order))
+        object.__setattr__(self, "calls", calls)
+        object.__setattr__(self, "batch_calls", batch_calls)
+        object.__setattr__(self, "async_calls", async_calls)
+        # Every value is an object, so trusted plans never fail a type check
+        object.__setattr__(
+            self,
+            "data_types",
+            tuple(object if trusted else node.worker.data_type for node in order),
+        )
+        object.__setattr__(self, "successors", successors)
+        object.__setattr__(self, "routers", routers)
+        object.__setattr__(
+            self,
+            "fallbacks",
+            tuple(index.get(node.fallback) for node in order),
+        )
+        object.__setattr__(self, "merges", tuple(node.merge for node in order))
+        object.__setattr__(self, "in_degrees", tuple(in_degrees))
+        object.__setattr__(self, "linear", linear)
+        # In-place successors of fan-out nodes, which may need their own copy
+        object.__setattr__(
+            self,
+            "forks",
+            tuple(
+                tuple(t for t, _ in edges if order[t].worker.inplace)
+                if len(edges) > 1
+                else ()
+                for edges in successors
+            ),
+        )
+        object.__setattr__(self, "metrics", pipe_metrics)
+        object.__setattr__(self, "trusted", trusted)
+        object.__setattr__(self, "tracer", tracer)
+
+    def __setattr__(self, name: str, value: object):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def run(self, data: TData, timeout: float | None = None) -> list[TData]:
+        """Execute the plan and return every final result in plan order.
+
+        With a timeout, the run fails with DeadlineExceededError once that
+        many seconds passed, and the remaining nodes are skipped.
+        """
+        if timeout is not None:
+            return [result for _, result in self._walk_by(data, _deadline(timeout))]
+
+        nodes, calls, data_types = self.nodes, self.calls, self.data_types
+        if self.linear and self.trusted:
+            index = 0
+            try:
+                for index, call in enumerate(calls):
+                    data = call(data)
+            except NodeExecutionError:
+                raise
+            except Exception as e:
+                raise node_error(nodes[index], e) from e
+            return [data]
+
+        if self.linear:
+            for index, call in enumerate(calls):
+                try:
+                    if not isinstance(data, data_types[index]):
+                        raise _type_error(data_types[index], data)
+                    data = call(data)
+                except NodeExecutionError:
+                    raise
+                except Exception as e:
+                    raise node_error(nodes[index], e) from e
+            return [data]
+
+        return [result_data for _, result_data in self._walk(data)]
+
+    def _walk_by(self, data: TData, deadline: float) -> Iterator[tuple[int, TData]]:
+        """Walk the plan in one thread, failing once the run deadline passes.
+
+        The walk checks the deadline before each node call, so only a node
+        still running when it passes is abandoned, like a timed out call.
+        """
+        # Index of the node being called, and whether the caller stopped
+        progress: list = [0, False]
+        outputs: queue.SimpleQueue = queue.SimpleQueue()
+
+        def walk(data: TData) -> None:
+            for result in self._walk(data, deadline, progress):
+                outputs.put(result)
+
+        finished = start_call(walk, data)
+        finished.add_done_callback(lambda _: outputs.put(None))
+        try:
+            while True:
+                try:
+                    result = outputs.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    raise DeadlineExceededError(self.nodes[progress[0]]) from None
+                if result is None:
+                    finished.result()  # raises the failure of the walk
+                    return
+                yield result
+        finally:
+            progress[1] = True
+
+    def _walk(
+        self, data: TData, deadline: float | None = None, progress: list | None = None
+    ) -> Iterator[tuple[int, TData]]:
+        """Run the plan node by node, yielding each final result as it is made"""
+        nodes, calls, data_types = self.nodes, self.calls, self.data_types
+
+        # Inputs waiting for each node; topological order guarantees every
+        # predecessor has run before a node's inputs are consumed
+        pending: list[list] = [[] for _ in calls]
+        pending[0].append(data)
+        for index, inputs in enumerate(pending):
+            if not inputs:
+                continue
+            # Drop the inputs along with this node's last use of them
+            pending[index] = []
+            if self.merges[index] is not None:
+                inputs = self._merge(index, inputs)
+            call, edges = calls[index], self.successors[index]
+            router = self.routers[index]
+            for item in inputs:
+                try:
+                    if not isinstance(item, data_types[index]):
+                        raise _type_error(data_types[index], item)
+                    if progress is not None:
+                        if progress[1]:
+                            return
+                        progress[0] = index
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DeadlineExceededError(nodes[index])
+                    result_data = call(item)
+                except NodeExecutionError:
+                    raise
+                except Exception as e:
+                    raise node_error(nodes[index], e) from e
+
+                matches = 0
+                if router is None:
+                    for target, condition in edges:
+                        if condition is None or condition(result_data):
+                            pending[target].append(result_data)
+                            matches += 1
+                elif (target := router(result_data)) is not None:
+                    pending[target].append(result_data)
+                    matches = 1
+
+                if matches > 1 and self.forks[index]:
+                    self._copy_forked(index, result_data, matches, pending)
+                elif not matches:
+                    fallback = self.fallbacks[index]
+                    if fallback is None:
+                        yield index, result_data
+                    else:
+                        pending[fallback].append(result_data)
+
+    def iter_results(
+        self,
+        data: TData,
+        executor: Executor | None = None,
+        timeout: float | None = None,
+    ) -> Iterator[tuple["Node", TData]]:
+        """Execute the plan, yielding each final result with its leaf node.
+
+        Results are yielded as soon as they are produced, so the caller can
+        act on the first one before later branches run. With an executor,
+        they come in completion order rather than plan order.
+        """
+        deadline = None if timeout is None else _deadline(timeout)
+        if executor is not None:
+            results = self._iter_concurrent(data, executor, deadline)
+        elif deadline is not None:
+            results = self._walk_by(data, deadline)
+        elif self.linear:
+            results = iter([(len(self.nodes) - 1, self.run(data)[0])])
+        else:
+            results = self._walk(data)
+        nodes = self.nodes
+        return ((nodes[index], result_data) for index, result_data in results)
+
+    def execute_all(
+        self,
+        data: TData,
+        executor: Executor | None = None,
+        timeout: float | None = None,
+    ) -> list[tuple["Node", TData]]:
+        """Execute the plan and return every final result with its leaf node"""
+        if self.tracer is not None:
+            return self.tracer.trace(self._execute_all, data, executor, timeout)
+        return self._execute_all(data, executor, timeout)
+
+    def _execute_all(
+        self, data: TData, executor: Executor | None, timeout: float | None
+    ) -> list[tuple["Node", TData]]:
+        results = list(self.iter_results(data, executor, timeout))
+        if executor is not None:
+            index = {node: i for i, node in enumerate(self.nodes)}
+            results.sort(key=lambda result: index[result[0]])
+        return results
+
+    def run_many(self, items: list[TData]) -> list[list[TData]]:
+        """Execute the plan over a batch, returning every final result per item.
+
+        Items are routed through branch conditions individually and regrouped
+        into one batch per node, so each worker is called once per node.
+        """
+        nodes, batch_calls, data_types = self.nodes, self.batch_calls, self.data_types
+
+        # Per node: the owning item index and the data of each pending input
+        pending: list[tuple[list[int], list] | None] = [None] * len(batch_calls)
+        pending[0] = (list(range(len(items))), list(items))
+        final_results: list[list[TData]] = [[] for _ in items]
+        for index, batch in enumerate(pending):
+            if batch is None:
+                continue
+            pending[index] = None
+            owners, inputs = batch
+            if self.merges[index] is not None:
+                # Join each item's branch outputs separately
+                groups: dict[int, list] = {}
+                for owner, item in zip(owners, inputs):
+                    groups.setdefault(owner, []).append(item)
+                owners = list(groups)
+                inputs = [self._merge(index, group)[0] for group in groups.values()]
+            try:
+                for item in inputs:
+                    if not isinstance(item, data_types[index]):
+                        raise _type_error(data_types[index], item)
+                outputs = batch_calls[index](inputs)
+                if len(outputs) != len(inputs):
+                    raise ValueError(
+                        f"Expected {len(inputs)} batch results, got {len(outputs)}"
+                    )
+            except NodeExecutionError:
+                raise
+            except Exception as e:
+                raise node_error(nodes[index], e) from e
+
+            edges, router = self.successors[index], self.routers[index]
+            for owner, result_data in zip(owners, outputs):
+                if router is None:
+                    targets = [
+                        target
+                        for target, condition in edges
+                        if condition is None or condition(result_data)
+                    ]
+                else:
+                    target = router(result_data)
+                    targets = [] if target is None else [target]
+                matches = len(targets)
+                for target in targets:
+                    slot = pending[target]
+                    if slot is None:
+                        slot = pending[target] = ([], [])
+                    slot[0].append(owner)
+                    slot[1].append(result_data)
+
+                if matches > 1 and self.forks[index]:
+                    inputs = [slot and slot[1] for slot in pending]
+                    self._copy_forked(index, result_data, matches, inputs)
+                elif not matches:
+                    fallback = self.fallbacks[index]
+                    if fallback is None:
+                        final_results[owner].append(result_data)
+                        continue
+                    slot = pending[fallback]
+                    if slot is None:
+                        slot = pending[fallback] = ([], [])
+                    slot[0].append(owner)
+                    slot[1].append(result_data)
+
+        return final_results
+
+    def execute(
+        self,
+        data: TData,
+        executor: Executor | None = None,
+        timeout: float | None = None,
+    ) -> TData:
+        """Execute the plan and return the first final result"""
+        if self.tracer is not None:
+            return self.tracer.trace(self._execute, data, executor, timeout)
+        return self._execute(data, executor, timeout)
+
+    def _execute(
+        self, data: TData, executor: Executor | None, timeout: float | None
+    ) -> TData:
+        if executor is not None:
+            return self.run_concurrent(data, executor, timeout)[0]
+        return self.run(data, timeout)[0]
+
+    def execute_many(self, items: Iterable[TData]) -> list[TData]:
+        """Execute the plan over a batch and return the first result per item"""
+        return [results[0] for results in self.run_many(list(items))]
+
+    def _merge(self, index: int, inputs: list[TData]) -> list[TData]:
+        """Merge a join node's branch outputs into its single input"""
+        try:
+            return [self.merges[index](inputs)]
+        except Exception as e:
+            raise NodeExecutionError(self.nodes[index], e, "merge") from e
+
+    def _copy_forked(
+        self, index: int, data: TData, matches: int, pending: list[list | None]
+    ) -> None:
+        """Copy data sent to several branches for the in-place ones among them.
+
+        Each in-place target's just-routed input is replaced by a copy, so
+        branches never see each other's mutations. When every receiver is
+        in place, the last one keeps the original.
+        """
+        targets = []
+        for target in self.forks[index]:
+            last = pending[target][-1] if pending[target] else None
+            if last is data:
+                targets.append((target, False))
+            elif type(last) is tuple and last[1] is data:  # tagged join input
+                targets.append((target, True))
+        if len(targets) == matches:
+            targets.pop()
+        for target, tagged in targets:
+            pending[target][-1] = (index, data.fork()) if tagged else data.fork()
+
+    def _join(self, index: int, inputs: list) -> list[TData]:
+        """Order a join node's tagged inputs by predecessor and merge them"""
+        if self.merges[index] is None or not inputs:
+            return inputs
+        inputs.sort(key=itemgetter(0))
+        return self._merge(index, [data for _, data in inputs])
+
+    def _invoke(
+        self, index: int, items: list, deadline: float | None = None
+    ) -> list[TData]:
+        """Call node index on each of its inputs, wrapping failures"""
+        items = self._join(index, items)
+        call, data_type = self.calls[index], self.data_types[index]
+        try:
+            for item in items:
+                if not isinstance(item, data_type):
+                    raise _type_error(data_type, item)
+            if deadline is None:
+                return [call(item) for item in items]
+            outputs = []
+            for item in items:
+                if time.monotonic() >= deadline:
+                    raise DeadlineExceededError(self.nodes[index])
+                outputs.append(call(item))
+            return outputs
+        except NodeExecutionError:
+            raise
+        except Exception as e:
+            raise node_error(self.nodes[index], e) from e
+
+    def _route(
+        self,
+        index: int,
+        outputs: list[TData],
+        pending: list[list],
+        waiting: list[int],
+        final_results: list[tuple[int, TData]],
+    ) -> list[int]:
+        """Route a finished node's outputs and return the nodes now ready.
+
+        A node is ready once every predecessor has finished; nodes left
+        without input are still released so their successors can proceed.
+        Inputs of join nodes are tagged with their source, since concurrent
+        predecessors finish in any order.
+        """
+        edges, merges = self.successors[index], self.merges
+        router = self.routers[index]
+        for result_data in outputs:
+            if router is None:
+                targets = [
+                    target
+                    for target, condition in edges
+                    if condition is None or condition(result_data)
+                ]
+            else:
+                target = router(result_data)
+                targets = [] if target is None else [target]
+            matches = len(targets)
+            for target in targets:
+                tagged = (index, result_data) if merges[target] else result_data
+                pending[target].append(tagged)
+
+            if matches > 1 and self.forks[index]:
+                self._copy_forked(index, result_data, matches, pending)
+            elif not matches:
+                fallback = self.fallbacks[index]
+                if fallback is None:
+                    final_results.append((index, result_data))
+                else:
+                    pending[fallback].append((index, result_data))
+
+        ready = []
+        for target, _ in edges:
+            waiting[target] -= 1
+            if waiting[target] == 0:
+                ready.append(target)
+        return ready
+
+    def run_concurrent(
+        self, data: TData, executor: Executor, timeout: float | None = None
+    ) -> list[TData]:
+        """Execute the plan, running independent branches on an executor.
+
+        Nodes that become ready together are submitted to the executor and
+        joined before any successor runs, so latency follows the longest
+        branch instead of the sum. Without a deadline, a lone ready node
+        runs in the caller.
+        """
+        deadline = None if timeout is None else _deadline(timeout)
+        final_results = sorted(
+            self._iter_concurrent(data, executor, deadline), key=itemgetter(0)
+        )
+        return [result_data for _, result_data in final_results]
+
+    def _iter_concurrent(
+        self, data: TData, executor: Executor, deadline: float | None = None
+    ) -> Iterator[tuple[int, TData]]:
+        """Run the plan on an executor, yielding final results as they finish"""
+        pending: list[list] = [[] for _ in self.nodes]
+        pending[0].append(data)
+        waiting = list(self.in_degrees)
+        final_results: list[tuple[int, TData]] = []
+
+        ready, running = [0], {}
+
+        def submit(indices: list[int]) -> None:
+            for index in indices:
+                items, pending[index] = pending[index], []
+                # Branches see the run's context, such as its trace and priority
+                future = executor.submit(
+                    copy_context().run, self._invoke, index, items, deadline
+                )
+                running[future] = index
+            indices.clear()
+
+        try:
+            while ready or running:
+                if final_results:
+                    # Ready nodes keep running while the caller handles these
+                    submit(ready)
+                    yield from final_results
+                    final_results.clear()
+                    continue
+
+                if len(ready) == 1 and not running and deadline is None:
+                    index = ready.pop()
+                    items, pending[index] = pending[index], []
+                    outputs = self._invoke(index, items)
+                    ready = self._route(index, outputs, pending, waiting, final_results)
+                    continue
+
+                # With a deadline, every node runs on the executor so the
+                # caller can stop waiting for it
+                submit(ready)
+                remaining = None
+                if deadline is not None:
+                    remaining = max(deadline - time.monotonic(), 0)
+                done, _ = wait(running, remaining, FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceededError(self.nodes[min(running.values())])
+                for future in done:
+                    index = running.pop(future)
+                    ready += self._route(
+                        index, future.result(), pending, waiting, final_results
+                    )
+            yield from final_results
+        finally:
+            for future in running:
+                future.cancel()
+
+    async def arun(self, data: TData, timeout: float | None = None) -> list[TData]:
+        """Asynchronously execute the plan and return every final result.
+
+        A node runs once all its predecessors have finished, and successors
+        that become ready together, such as matching branches, are awaited
+        concurrently. Synchronous workers are offloaded to the executor.
+        """
+        deadline = None if timeout is None else _deadline(timeout)
+        nodes, data_types = self.nodes, self.data_types
+        pending: list[list] = [[] for _ in nodes]
+        pending[0].append(data)
+        waiting = list(self.in_degrees)
+        final_results: list[tuple[int, TData]] = []
+
+        async def call(index: int, item: TData) -> TData:
+            try:
+                if not isinstance(item, data_types[index]):
+                    raise _type_error(data_types[index], item)
+                if deadline is None:
+                    return await self.async_calls[index](item)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceededError(nodes[index])
+                try:
+                    return await acall_with_timeout(
+                        remaining, self.async_calls[index], item
+                    )
+                except TimeoutError:
+                    if time.monotonic() < deadline:
+                        raise  # the node's own timeout
+                    raise DeadlineExceededError(nodes[index]) from None
+            except NodeExecutionError:
+                raise
+            except Exception as e:
+                raise node_error(nodes[index], e) from e
+
+        async def visit(index: int) -> None:
+            inputs, pending[index] = pending[index], []
+            inputs = self._join(index, inputs)
+            outputs = await asyncio.gather(*(call(index, i) for i in inputs))
+            ready = self._route(index, outputs, pending, waiting, final_results)
+            # Successors hold what they need, free the rest while they run
+            del inputs, outputs
+            await asyncio.gather(*map(visit, ready))
+
+        await visit(0)
+        final_results.sort(key=lambda result: result[0])
+        return [result_data for _, result_data in final_results]
+
+    async def aexecute(self, data: TData, timeout: float | None = None) -> TData:
+        """Asynchronously execute the plan and return the first final result"""
+        if self.tracer is not None:
+            return (await self.tracer.atrace(self.arun, data, timeout))[0]
+        return (await self.arun(data, timeout))[0]
+
+    def stream(
+        self, items: Iterable[TData], batch_size: int = 1
+    ) -> Generator[TData, None, None]:
+        """Lazily execute the plan over items, yielding one result per item.
+
+        Inputs are pulled batch_size at a time, so memory stays bounded by the
+        batch size rather than the input length.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        return self._stream(iter(items), batch_size)
+
+    def _stream(
+        self, items: Iterator[TData], batch_size: int
+    ) -> Generator[TData, None, None]:
+        try:
+            if batch_size == 1:
+                for item in items:
+                    yield self.run(item)[0]
+            else:
+                while batch := list(islice(items, batch_size)):
+                    yield from self.execute_many(batch)
+        finally:
+            # Release the source (e.g. an open file) once the consumer stops
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __repr__(self):
+        return f"ExecutionPlan(nodes={len(self.nodes)}, linear={self.linear})"
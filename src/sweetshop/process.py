@@ -0,0 +1,83 @@
+import asyncio
+import atexit
+import importlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from sweetshop.base_data import TData
+from sweetshop.shared_data import handover
+from sweetshop.worker import Worker, worker_registry
+
+_pool: ProcessPoolExecutor | None = None
+_pool_size: int | None = None
+_lock = threading.Lock()
+
+
+def configure_process_pool(max_workers: int | None = None) -> None:
+    """Set the size of the shared process pool, replacing any running pool"""
+    global _pool_size
+    shutdown_process_pool()
+    _pool_size = max_workers
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the persistent process pool, starting it on first use"""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_pool_size)
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the shared process pool if it is running"""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+atexit.register(shutdown_process_pool)
+
+
+def _run_worker(module: str, name: str, config: dict, data: TData) -> TData:
+    """Resolve a worker by name in the child process and run it.
+
+    Only the worker's name, its module, the node config and the data cross
+    the process boundary; importing the module registers the worker. Shared
+    buffers of the result are handed over to the parent process.
+    """
+    if not worker_registry.exists(name) and module != "__main__":
+        importlib.import_module(module)
+    worker = worker_registry.get(name)
+    result = worker.func(data, **config)
+    if worker.is_async:
+        result = asyncio.run(result)
+    return handover(result)
+
+
+def run_in_process(worker: Worker, config: dict, data: TData) -> TData:
+    """Run a worker on one item in the shared process pool"""
+    if worker.batch:
+        return run_many_in_process(worker, config, [data])[0]
+    future = get_process_pool().submit(
+        _run_worker, worker.func.__module__, worker.name, config, data
+    )
+    return future.result()
+
+
+def run_many_in_process(worker: Worker, config: dict, items: list[TData]) -> list:
+    """Run a worker over a batch in the shared process pool.
+
+    Batch workers receive the whole batch in one task, per-item workers are
+    spread across the pool in chunks.
+    """
+    call = partial(_run_worker, worker.func.__module__, worker.name, config)
+    pool = get_process_pool()
+    if worker.batch:
+        return pool.submit(call, items).result()
+    chunksize = max(1, len(items) // (4 * (_pool_size or os.cpu_count() or 1)))
+    return list(pool.map(call, items, chunksize=chunksize))
@@ -1,37 +1,150 @@
-from typing import TypeVar
+import importlib
+import json
+import os
+import threading
+from collections.abc import Callable, Mapping
+from importlib import metadata
+from typing import TypeVar, cast
 
 T = TypeVar("T")
 
 
+def import_target(target: str) -> object | None:
+    """Import a "module" or "module:attribute" target.
+
+    Returns the attribute, or None for a bare module, whose import is
+    expected to register objects through the registry decorators.
+    """
+    module_name, _, attribute = target.partition(":")
+    obj = importlib.import_module(module_name)
+    if not attribute:
+        return None
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
 class BaseRegistry[T]:
     """Base registry class for storing and managing objects."""
 
+    # Package entry point group read by load_entry_points()
+    entry_point_group: str | None = None
+
     def __init__(self):
         self._registry: dict[str, T] = {}
+        # Loaders of objects declared lazily, run on first access
+        self._lazy: dict[str, Callable[[], T | None]] = {}
+        # Import targets of the lazy names declared by declare()
+        self._targets: dict[str, str] = {}
+        # Names whose loader is running, which may register them in turn
+        self._loading: set[str] = set()
+        self._lock = threading.RLock()
+
+    def _replaceable(self, name: str) -> bool:
+        """Whether a lazy entry of name may be replaced by a new registration.
+
+        Only a declared import target, or a name being loaded, is replaced:
+        both are usually registered again by the module they import.
+        """
+        return name not in self._lazy or name in self._targets or name in self._loading
 
     def register(self, name: str, obj: T) -> None:
         """Register an object with the given name."""
-        if self.exists(name):
+        if name in self._registry or not self._replaceable(name):
             raise KeyError(f"{type(obj).__name__} '{name}' already registered")
+        # Loading a lazy declaration usually ends in registering it here
+        self._lazy.pop(name, None)
+        self._targets.pop(name, None)
         self._registry[name] = obj
 
+    def register_lazy(self, name: str, loader: Callable[[], T | None]) -> None:
+        """Register a loader that provides the object on first access.
+
+        The loader either returns the object or registers it itself, e.g.
+        by importing the module that declares it. It replaces an earlier
+        lazy declaration, such as the manifest entry of that module.
+        """
+        if name in self._registry or not self._replaceable(name):
+            raise KeyError(f"'{name}' already registered")
+        self._targets.pop(name, None)
+        self._lazy[name] = loader
+
+    def declare(self, name: str, target: str) -> None:
+        """Lazily register name, importing target only on first access"""
+        if name in self._targets:
+            if self._targets[name] == target:
+                return  # the same manifest or entry point, loaded again
+            raise KeyError(f"'{name}' already declared as {self._targets[name]}")
+
+        def load() -> T | None:
+            obj = import_target(target)
+            if name in self._registry or self._lazy.get(name) is not load:
+                return None  # the import registered or declared it
+            if obj is None:
+                raise KeyError(f"'{name}' was not registered by importing {target}")
+            return self._coerce(obj)
+
+        self.register_lazy(name, load)
+        self._targets[name] = target
+
+    def load_manifest(self, manifest: Mapping[str, str] | str | os.PathLike) -> None:
+        """Declare every name of a manifest mapping names to import targets.
+
+        The manifest is a mapping or the path of a JSON file holding one.
+        """
+        if not isinstance(manifest, Mapping):
+            with open(manifest) as file:
+                manifest = json.load(file)
+        for name, target in manifest.items():
+            self.declare(name, target)
+
+    def load_entry_points(self, group: str | None = None) -> None:
+        """Declare every entry point of a group of the installed packages"""
+        for entry_point in metadata.entry_points(group=group or self.entry_point_group):
+            self.declare(entry_point.name, entry_point.value)
+
+    def _coerce(self, obj: object) -> T:
+        """Turn an imported manifest target into a registry object"""
+        # Without a check of its own, the registry takes the target as it is
+        return cast(T, obj)
+
+    def _resolve(self, name: str) -> None:
+        """Run the loader of a lazily registered name"""
+        with self._lock:
+            # Loading may declare a new loader for the name, run that as well
+            while (loader := self._lazy.get(name)) is not None:
+                self._loading.add(name)
+                try:
+                    obj = loader()
+                finally:
+                    self._loading.discard(name)
+                if self._lazy.get(name) is loader:
+                    del self._lazy[name]
+                    self._targets.pop(name, None)
+                if obj is not None and name not in self._registry:
+                    self._registry[name] = obj
+
     def get(self, name: str) -> T:
         """Get an object by name."""
-        if not self.exists(name):
+        if name in self._lazy:
+            self._resolve(name)
+        if name not in self._registry:
             raise KeyError(f"'{name}' not found in registry")
         return self._registry[name]
 
     def exists(self, name: str) -> bool:
         """Check if an object exists in the registry."""
-        return name in self._registry
+        return name in self._registry or name in self._lazy
 
     def list_names(self) -> list[str]:
         """List all registered names."""
-        return list(self._registry.keys())
+        return [*self._registry, *self._lazy]
 
     def clear(self) -> None:
         """Clear all registered objects."""
         self._registry.clear()
+        self._lazy.clear()
+        self._targets.clear()
 
     def __contains__(self, name: str) -> bool:
         """Check if name exists in registry using 'in' operator."""
@@ -39,4 +152,4 @@ class BaseRegistry[T]:
 
     def __len__(self) -> int:
         """Get the number of registered objects."""
-        return len(self._registry)
+        return len(self._registry) + len(self._lazy)
@@ -0,0 +1,180 @@
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+
+from sweetshop.base_data import TData
+from sweetshop.limits import PRIORITY, Limiter
+from sweetshop.pipe import PipeRegistry, pipe_registry
+
+
+class Scheduler:
+    """Run many pipe runs concurrently on a pool of threads.
+
+    Runs of registered pipes start by priority, highest first. Among runs
+    of equal priority, each pipe gets its turn in proportion to its runs,
+    so a pipe with a long backlog cannot starve the others, and runs of
+    one pipe start in submission order. Workers created with
+    max_concurrency bound their own calls, granting free slots to the
+    runs of the highest priority. A run only starts while fewer runs than
+    the limit of each such worker it uses are running, so runs held back
+    by a busy worker leave the threads to the runs of other pipes.
+    """
+
+    def __init__(self, max_workers: int = 8, registry: PipeRegistry = pipe_registry):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers: int = max_workers
+        self.registry: PipeRegistry = registry
+        self.running: int = 0
+        # Heap of (-priority, virtual start, arrival, name, pipe, limiters,
+        # data, timeout, future), whose first three fields are unique
+        self._queue: list[tuple] = []
+        self._arrivals = itertools.count()
+        # Fair queuing clock: virtual start of the last run started, and
+        # the virtual finish of each pipe's last queued run
+        self._clock: int = 0
+        self._finish: dict[str, int] = {}
+        self._queued: dict[str, int] = {}
+        self._limiters: dict[str, Limiter] = {}
+        # Running runs using each limiter
+        self._admitted: dict[Limiter, int] = {}
+        self._closed: bool = False
+        self._ready = threading.Condition()
+        self._threads = [
+            threading.Thread(target=self._serve, daemon=True)
+            for _ in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        pipe: str,
+        data: TData,
+        priority: int = 0,
+        timeout: float | None = None,
+    ) -> Future:
+        """Queue a run of a registered pipe, returning the future of its result"""
+        runner = self.registry.get(pipe)
+        plan = runner.compile()
+        future: Future = Future()
+        with self._ready:
+            if self._closed:
+                raise RuntimeError("Cannot submit to a scheduler after shutdown")
+            limiters = {
+                node.worker.limiter: None
+                for node in plan.nodes
+                if node.worker.limiter is not None
+            }
+            for node in plan.nodes:
+                if node.worker.limiter is not None:
+                    self._limiters[node.worker.name] = node.worker.limiter
+            start = max(self._clock, self._finish.get(pipe, 0))
+            self._finish[pipe] = start + 1
+            self._queued[pipe] = self._queued.get(pipe, 0) + 1
+            heapq.heappush(
+                self._queue,
+                (
+                    -priority,
+                    start,
+                    next(self._arrivals),
+                    pipe,
+                    runner,
+                    tuple(limiters),
+                    data,
+                    timeout,
+                    future,
+                ),
+            )
+            self._ready.notify()
+        return future
+
+    def _admissible(self, limiters: tuple[Limiter, ...]) -> bool:
+        """Whether a run using limiters may start without waiting on them"""
+        return all(
+            self._admitted.get(limiter, 0) < limiter.limit for limiter in limiters
+        )
+
+    def _next(self) -> tuple | None:
+        """Pop the first queued run whose limited workers have room, if any"""
+        held = []
+        run = None
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            if self._admissible(entry[5]):
+                run = entry
+                break
+            held.append(entry)
+        for entry in held:
+            heapq.heappush(self._queue, entry)
+        return run
+
+    def _serve(self) -> None:
+        """Start queued runs until shut down"""
+        while True:
+            with self._ready:
+                while (run := self._next()) is None:
+                    if not self._queue and self._closed:
+                        return
+                    self._ready.wait()
+                priority, start, _, name, pipe, limiters, data, timeout, future = run
+                self._clock = start
+                self._queued[name] -= 1
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self.running += 1
+                for limiter in limiters:
+                    self._admitted[limiter] = self._admitted.get(limiter, 0) + 1
+
+            token = PRIORITY.set(-priority)
+            try:
+                future.set_result(pipe.execute(data, timeout=timeout))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                PRIORITY.reset(token)
+                with self._ready:
+                    self.running -= 1
+                    for limiter in limiters:
+                        self._admitted[limiter] -= 1
+                    if limiters:
+                        # Runs held back by these workers may start now
+                        self._ready.notify_all()
+
+    def stats(self) -> dict:
+        """Get the queued and running runs, per pipe and per limited worker.
+
+        Each worker with max_concurrency reports its limit, its active and
+        waiting calls, and the time calls waited for a slot.
+        """
+        with self._ready:
+            return {
+                "queued": len(self._queue),
+                "running": self.running,
+                "pipes": {pipe: n for pipe, n in self._queued.items() if n},
+                "workers": {
+                    name: limiter.stats() for name, limiter in self._limiters.items()
+                },
+            }
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """Stop taking runs, finishing the queued ones unless cancelled"""
+        with self._ready:
+            self._closed = True
+            if cancel_futures:
+                for *_, future in self._queue:
+                    future.cancel()
+            self._ready.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self) -> "Scheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def __repr__(self):
+        return f"Scheduler(max_workers={self.max_workers})"
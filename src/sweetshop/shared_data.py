@@ -0,0 +1,215 @@
+import hashlib
+import io
+import os
+import pickle
+import threading
+import weakref
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import TypeVar
+
+from sweetshop.base_data import BaseData
+
+# Number of live owning SharedBuffer objects per segment in this process
+_owners: dict[str, int] = {}
+_lock = threading.Lock()
+
+T = TypeVar("T")
+
+
+def _tracked_name(memory: SharedMemory) -> str:
+    """Name the resource tracker knows a segment by"""
+    # POSIX segment names start with a slash that the public name drops
+    return f"/{memory.name}" if os.name == "posix" else memory.name
+
+
+def _close(memory: SharedMemory) -> None:
+    """Close a segment even while views of it are still exported.
+
+    SharedMemory.close() refuses then, and would fail again when the object
+    is collected. This is the only place reaching into its internals: it
+    drops the object's own reference to the mapping, which the views keep
+    alive until they go, and closes the file descriptor.
+    """
+    try:
+        memory.close()
+    except BufferError:
+        memory._buf = memory._mmap = None  # ty: ignore[unresolved-attribute]
+        memory.close()
+
+
+class _Segment:
+    """One attachment of a shared memory segment and whether it owns it."""
+
+    def __init__(self, memory: SharedMemory, owned: bool):
+        self.memory: SharedMemory = memory
+        self.owned: bool = False
+        if owned:
+            self.own()
+
+    def own(self) -> None:
+        with _lock:
+            count = _owners.get(self.memory.name, 0)
+            _owners[self.memory.name] = count + 1
+        if not count:
+            resource_tracker.register(_tracked_name(self.memory), "shared_memory")
+        self.owned = True
+
+    def disown(self) -> bool:
+        """Drop ownership, returning whether this was the last owner"""
+        if not self.owned:
+            return False
+        self.owned = False
+        with _lock:
+            count = _owners.pop(self.memory.name) - 1
+            if count:
+                _owners[self.memory.name] = count
+        return not count
+
+    def close(self) -> None:
+        _close(self.memory)
+        if self.disown():
+            try:
+                self.memory.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedBuffer:
+    """Bytes in a named shared memory segment that pickle as a small handle.
+
+    Only the segment name and size cross a process boundary; the receiving
+    process maps the same memory, so view gives zero-copy access in every
+    process (wrap it with numpy.frombuffer for an array). The segment is
+    unlinked when the last owning buffer in the creating process is released
+    or garbage collected.
+    """
+
+    __slots__ = ("size", "_segment", "_handover", "__weakref__")
+
+    def __init__(self, data: bytes | bytearray | memoryview | int):
+        size = data if isinstance(data, int) else memoryview(data).nbytes
+        memory = SharedMemory(create=True, size=max(size, 1))
+        if not isinstance(data, int):
+            memory.buf[:size] = memoryview(data).cast("B")
+        self._open(_Segment(memory, owned=True), size)
+
+    def _open(self, segment: _Segment, size: int) -> None:
+        self.size: int = size
+        self._segment: _Segment = segment
+        self._handover: bool = False
+        weakref.finalize(self, segment.close)
+
+    @classmethod
+    def _attach(cls, name: str, size: int, owned: bool = False) -> "SharedBuffer":
+        memory = SharedMemory(name=name)
+        # Attaching registers the segment with this process's resource
+        # tracker, which would unlink it on exit; only owners track it
+        resource_tracker.unregister(_tracked_name(memory), "shared_memory")
+        buffer = cls.__new__(cls)
+        buffer._open(_Segment(memory, owned), size)
+        return buffer
+
+    def __reduce__(self):
+        return SharedBuffer._attach, (self.name, self.size, self._handover)
+
+    def __deepcopy__(self, memo: dict) -> "SharedBuffer":
+        # A handle would map the same segment, so copies get one of their own
+        return SharedBuffer(self.view)
+
+    @property
+    def name(self) -> str:
+        return self._segment.memory.name
+
+    @property
+    def view(self) -> memoryview:
+        """Writable zero-copy view of the buffer"""
+        return self._segment.memory.buf[: self.size]
+
+    def tobytes(self) -> bytes:
+        return bytes(self.view)
+
+    def handover(self) -> None:
+        """Pass ownership to the process that unpickles this buffer next"""
+        if self._segment.disown():
+            resource_tracker.unregister(
+                _tracked_name(self._segment.memory), "shared_memory"
+            )
+        self._handover = True
+
+    def release(self) -> None:
+        """Unmap the buffer now, unlinking the segment if this was its last owner"""
+        self._segment.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"SharedBuffer(name={self.name!r}, size={self.size})"
+
+
+class SharedData(BaseData):
+    """BaseData whose bulk fields are SharedBuffer instances.
+
+    Passing it to a process worker transfers only the buffer handles. Inside
+    a pipe run segments live as long as the data referencing them, so they
+    are released as soon as no downstream node holds the data any more; call
+    release() to free them deterministically. fork() copies the buffers
+    into new segments, so in-place branches never write to the same one.
+    """
+
+    def _values(self) -> list:
+        fields = getattr(type(self), "__fields__", None)
+        if fields is None:
+            return list(vars(self).values())
+        return [getattr(self, field) for field in fields]
+
+    def buffers(self) -> list[SharedBuffer]:
+        return [value for value in self._values() if isinstance(value, SharedBuffer)]
+
+    def release(self) -> None:
+        for buffer in self.buffers():
+            buffer.release()
+
+    def fingerprint(self) -> str:
+        """Digest of the buffer contents and the remaining fields.
+
+        Segment names differ between equal data, so buffers are hashed by
+        content instead of being pickled as handles.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        rest = []
+        for value in self._values():
+            if isinstance(value, SharedBuffer):
+                digest.update(value.view)
+            else:
+                rest.append(value)
+        digest.update(pickle.dumps((type(self).__qualname__, rest)))
+        return digest.hexdigest()
+
+
+class _ContentPickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        if isinstance(obj, SharedBuffer):
+            return SharedBuffer, (obj.tobytes(),)
+        return NotImplemented
+
+
+def dumps_contents(value: object) -> bytes:
+    """Pickle value with shared buffers stored by content instead of handle.
+
+    For storage that outlives the segments: loading it copies each buffer
+    into a new segment.
+    """
+    stream = io.BytesIO()
+    _ContentPickler(stream, pickle.HIGHEST_PROTOCOL).dump(value)
+    return stream.getvalue()
+
+
+def handover(result: T) -> T:
+    """Hand the shared buffers of a worker result over to the receiving process"""
+    for data in result if isinstance(result, list) else (result,):
+        if isinstance(data, SharedData):
+            for buffer in data.buffers():
+                buffer.handover()
+    return result
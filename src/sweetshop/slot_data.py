@@ -0,0 +1,142 @@
+import sys
+from abc import ABCMeta
+from typing import TYPE_CHECKING, ClassVar, Self, dataclass_transform, get_origin
+
+from sweetshop.base_data import BaseData
+
+_MISSING = object()
+
+if sys.version_info >= (3, 14):
+    from annotationlib import (
+        Format,
+        call_annotate_function,
+        get_annotate_from_class_namespace,
+    )
+
+    def _own_annotations(namespace: dict) -> dict:
+        """Annotations of a class body, which are evaluated on demand"""
+        annotate = get_annotate_from_class_namespace(namespace)
+        if annotate is None:  # from __future__ import annotations
+            return namespace.get("__annotations__", {})
+        # Names defined after the class become forward references
+        return call_annotate_function(annotate, Format.FORWARDREF)
+else:
+
+    def _own_annotations(namespace: dict) -> dict:
+        """Annotations of a class body"""
+        return namespace.get("__annotations__", {})
+
+
+def _compile(name: str, source: str, namespace: dict) -> object:
+    """Compile a generated method, the way dataclasses do"""
+    exec(source, namespace)
+    return namespace[name]
+
+
+@dataclass_transform()
+class SlotDataMeta(ABCMeta):
+    """Generate __slots__ and field methods from class annotations."""
+
+    def __new__(mcs, name: str, bases: tuple, namespace: dict, **kwargs):
+        inherited: tuple[str, ...] = ()
+        defaults: dict[str, object] = {}
+        for base in reversed(bases):
+            inherited += tuple(
+                f for f in getattr(base, "__fields__", ()) if f not in inherited
+            )
+            defaults.update(getattr(base, "__field_defaults__", {}))
+
+        own = [
+            field
+            for field, annotation in _own_annotations(namespace).items()
+            if get_origin(annotation) is not ClassVar and annotation is not ClassVar
+        ]
+        for field in own:
+            # Defaults move off the class so they do not shadow the slots
+            if field in namespace:
+                defaults[field] = namespace.pop(field)
+
+        fields = inherited + tuple(f for f in own if f not in inherited)
+        namespace["__slots__"] = tuple(f for f in own if f not in inherited)
+        namespace["__fields__"] = fields
+        namespace["__field_defaults__"] = defaults
+        namespace["__match_args__"] = fields
+        cls = super().__new__(mcs, name, bases, namespace, **kwargs)
+        mcs._add_methods(cls, fields, defaults)
+        return cls
+
+    @staticmethod
+    def _add_methods(cls: type, fields: tuple[str, ...], defaults: dict) -> None:
+        globals_ = {"_new": object.__new__, "_MISSING": _MISSING}
+        globals_.update({f"_default_{f}": value for f, value in defaults.items()})
+
+        params, seen_default = [], False
+        for field in fields:
+            if field in defaults:
+                params.append(f"{field}=_default_{field}")
+                seen_default = True
+            elif seen_default:
+                raise TypeError(f"Non-default field '{field}' follows default field")
+            else:
+                params.append(field)
+        assign = "".join(f"    self.{f} = {f}\n" for f in fields) or "    pass\n"
+        methods = {
+            "__init__": f"def __init__(self, {', '.join(params)}):\n{assign}",
+        }
+
+        values = "".join(f"self.{f}, " for f in fields)
+        other_values = "".join(f"other.{f}, " for f in fields)
+        methods["__eq__"] = (
+            "def __eq__(self, other):\n"
+            "    if other.__class__ is not self.__class__:\n"
+            "        return NotImplemented\n"
+            f"    return ({values}) == ({other_values})\n"
+        )
+
+        shown = ", ".join(f"{f}={{self.{f}!r}}" for f in fields)
+        methods["__repr__"] = (
+            f"def __repr__(self):\n    return f'{cls.__name__}({shown})'\n"
+        )
+
+        copy = "".join(f"    new.{f} = self.{f}\n" for f in fields)
+        methods["__copy__"] = (
+            f"def __copy__(self):\n    new = _new(self.__class__)\n{copy}    return new\n"
+        )
+
+        keywords = "".join(f", {f}=_MISSING" for f in fields)
+        keywords = f", *{keywords}" if fields else ""
+        replaced = ", ".join(f"self.{f} if {f} is _MISSING else {f}" for f in fields)
+        methods["replace"] = (
+            f"def replace(self{keywords}):\n    return self.__class__({replaced})\n"
+        )
+
+        for name, source in methods.items():
+            setattr(cls, name, _compile(name, source, globals_))
+        if "__hash__" not in cls.__dict__:
+            # Fields are mutable, so equal instances cannot share a stable hash
+            setattr(cls, "__hash__", None)
+
+
+class SlotData(BaseData, metaclass=SlotDataMeta):
+    """Compact BaseData whose annotated fields are stored in __slots__.
+
+    Subclasses declare fields as class annotations, with optional defaults,
+    and get __init__, __eq__, __repr__, __copy__ and replace() generated:
+
+        class MathData(SlotData):
+            value: float
+            unit: str = "m"
+
+    Instances have no per-instance __dict__, which makes them smaller and
+    faster to allocate than a plain BaseData subclass. Like mutable
+    dataclasses, they are unhashable unless the class defines __hash__.
+    """
+
+    __fields__: ClassVar[tuple[str, ...]]
+    __field_defaults__: ClassVar[dict[str, object]]
+
+    if TYPE_CHECKING:
+
+        def replace(self, **changes: object) -> Self:
+            """Return a copy with the given fields replaced"""
+            ...
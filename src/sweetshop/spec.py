@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+
+from sweetshop.node import Case, Node
+from sweetshop.pipe import Pipe, PipeRegistry, first_result, pipe_registry
+from sweetshop.plan import ExecutionPlan
+from sweetshop.registry import BaseRegistry, import_target
+from sweetshop.worker import worker_registry
+
+SPEC_VERSION: int = 1
+
+
+class FunctionRegistry(BaseRegistry[Callable]):
+    """Registry of named functions, such as branch conditions and merges."""
+
+    def __getattr__(self, name: str) -> Callable:
+        if self.exists(name):
+            return self.get(name)
+        raise AttributeError(f"Function '{name}' not found in registry")
+
+    def register_function(self, name: str | None = None) -> Callable:
+        """Register decorator for functions referenced by name in specs"""
+
+        def wrapper(func: Callable) -> Callable:
+            self.register(name or getattr(func, "__name__", "unknown"), func)
+            return func
+
+        return wrapper
+
+    def name_of(self, func: Callable) -> str:
+        """Get the name a function is registered under"""
+        for name in self.list_names():
+            if self.get(name) is func:
+                return name
+        raise ValueError(f"Function {func!r} is not registered")
+
+
+# Global registries of the branch conditions and join merges used in specs
+condition_registry = FunctionRegistry()
+merge_registry = FunctionRegistry()
+merge_registry.register("first_result", first_result)
+
+
+def _type_name(data_type: type) -> str:
+    return f"{data_type.__module__}:{data_type.__qualname__}"
+
+
+def _condition_spec(condition: Callable | None) -> str | dict | None:
+    if condition is None:
+        return None
+    if isinstance(condition, Case):
+        # Switch cases reference their key function and hold the JSON value
+        return {
+            "key": condition_registry.name_of(condition.key),
+            "value": condition.value,
+        }
+    return condition_registry.name_of(condition)
+
+
+def _condition(spec: str | dict | None) -> Callable | None:
+    if spec is None:
+        return None
+    if isinstance(spec, dict):
+        return Case(condition_registry.get(spec["key"]), spec["value"])
+    return condition_registry.get(spec)
+
+
+def to_spec(pipe: Pipe) -> dict:
+    """Export a pipe graph as a JSON-serializable spec.
+
+    Workers, branch conditions and merges are referenced by their name in
+    worker_registry, condition_registry and merge_registry. Switch cases
+    reference their registered key function and keep their JSON value.
+    """
+    order = pipe.compile().nodes
+    index = {node: i for i, node in enumerate(order)}
+    nodes, edges = [], []
+    for i, node in enumerate(order):
+        name = node.worker.name
+        if name not in worker_registry or worker_registry.get(name) is not node.worker:
+            raise ValueError(f"Worker of node {node} is not registered")
+        entry = {"worker": name, "config": node.config}
+        if node.merge is not None:
+            entry["merge"] = merge_registry.name_of(node.merge)
+        if node.fallback is not None:
+            entry["fallback"] = index[node.fallback]
+        if node.routing is not None:
+            entry["routing"] = node.routing
+        if node.timeout is not None:
+            entry["timeout"] = node.timeout
+        nodes.append(entry)
+        for next_node in node.next_nodes:
+            edges.append([i, index[next_node], _condition_spec(next_node.condition)])
+    return {
+        "version": SPEC_VERSION,
+        "data_type": _type_name(pipe.data_type),
+        "trusted": pipe.trusted,
+        "metrics": pipe.metrics_enabled,
+        "nodes": nodes,
+        "edges": edges,
+    }
+
+
+def spec_hash(spec: dict) -> str:
+    """Stable digest of a spec, used as its compiled plan cache key"""
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class PlanCache:
+    """On-disk cache of validated plan layouts keyed by spec hash.
+
+    A hit stores the topological node order of a spec that already passed
+    validation, so loading it skips the config, type and graph checks.
+    Clear it when worker signatures or data types change.
+    """
+
+    def __init__(self, directory: str | os.PathLike):
+        self.directory: Path = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> list[int] | None:
+        try:
+            with open(self._path(key)) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, order: list[int]) -> None:
+        # Write then rename, so readers never see a partial entry
+        path = self._path(key)
+        temp = path.with_suffix(f".{os.getpid()}.{id(order)}.tmp")
+        temp.write_text(json.dumps(order))
+        os.replace(temp, path)
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.json"):
+            path.unlink()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+    def __repr__(self):
+        return f"PlanCache(directory='{self.directory}')"
+
+
+def from_spec(spec: dict, cache: PlanCache | None = None) -> Pipe:
+    """Build a pipe from a spec, reusing a cached compiled plan if given"""
+    if spec.get("version") != SPEC_VERSION:
+        raise ValueError(f"Unsupported pipe spec version: {spec.get('version')!r}")
+    key = spec_hash(spec)
+    order = cache.get(key) if cache is not None else None
+
+    nodes = []
+    for entry in spec["nodes"]:
+        worker = worker_registry.get(entry["worker"])
+        config = entry.get("config", {})
+        # A cached plan was validated when it was stored
+        nodes.append(Node(worker, config) if order else worker.cfg(**config))
+    for entry, node in zip(spec["nodes"], nodes):
+        if "merge" in entry:
+            node.merge = merge_registry.get(entry["merge"])
+        if "fallback" in entry:
+            node.fallback = nodes[entry["fallback"]]
+        node.routing = entry.get("routing")
+        node.with_timeout(entry.get("timeout"))
+    for source, target, condition in spec["edges"]:
+        nodes[source].add_next(nodes[target], _condition(condition))
+
+    pipe = Pipe(data_type=import_target(spec["data_type"]))
+    pipe.start_node = nodes[0]
+    pipe.current_node = nodes[-1]
+    pipe.nodes = nodes
+    pipe.trusted = spec.get("trusted", False)
+    pipe.metrics_enabled = spec.get("metrics", False)
+    if order:
+        pipe._plan = ExecutionPlan(
+            [nodes[i] for i in order],
+            metrics=pipe.metrics_enabled,
+            trusted=pipe.trusted,
+        )
+    elif cache is not None:
+        index = {node: i for i, node in enumerate(nodes)}
+        cache.put(key, [index[node] for node in pipe.compile().nodes])
+    return pipe
+
+
+def dump_spec(pipe: Pipe, path: str | os.PathLike) -> None:
+    """Write the spec of a pipe to a JSON file"""
+    with open(path, "w") as file:
+        json.dump(to_spec(pipe), file, indent=2)
+
+
+def load_spec(path: str | os.PathLike, cache: PlanCache | None = None) -> Pipe:
+    """Build a pipe from a JSON spec file"""
+    with open(path) as file:
+        return from_spec(json.load(file), cache)
+
+
+def register_specs(
+    directory: str | os.PathLike,
+    cache: PlanCache | None = None,
+    registry: PipeRegistry = pipe_registry,
+) -> list[str]:
+    """Lazily register every *.json spec of a directory under its file name.
+
+    Returns the registered names; each pipe is built on first access.
+    """
+    names = []
+    for path in sorted(Path(directory).glob("*.json")):
+        registry.register_lazy(path.stem, partial(load_spec, path, cache))
+        names.append(path.stem)
+    return names
@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from sweetshop.base_data import TData
+from sweetshop.metrics import Histogram
+
+
+def check_timeout(timeout: float | None) -> None:
+    """Raise ValueError unless timeout is None or a positive number of seconds"""
+    if timeout is not None and timeout <= 0:
+        raise ValueError("timeout must be positive")
+
+
+def start_call(func: Callable, data: TData) -> Future:
+    """Run func(data) in a daemon thread, returning its future.
+
+    Daemon threads never hold up interpreter exit, so a call abandoned
+    after a timeout cannot hang the process. The call sees the caller's
+    context variables, such as the run priority.
+    """
+    future: Future = Future()
+    context = contextvars.copy_context()
+
+    def target() -> None:
+        try:
+            future.set_result(context.run(func, data))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+def call_with_timeout(timeout: float, func: Callable, data: TData) -> TData:
+    """Call func, raising TimeoutError when it runs longer than timeout"""
+    future = start_call(func, data)
+    done, _ = wait([future], timeout=timeout)
+    if not done:
+        raise TimeoutError(f"timed out after {timeout}s")
+    return future.result()
+
+
+async def acall_with_timeout(timeout: float, func: Callable, data: TData) -> TData:
+    """Await func, cancelling it when it runs longer than timeout"""
+    try:
+        async with asyncio.timeout(timeout) as scope:
+            return await func(data)
+    except TimeoutError:
+        if not scope.expired():
+            raise  # raised by func itself
+        raise TimeoutError(f"timed out after {timeout}s") from None
+
+
+class Hedge:
+    """Hedged calls of an idempotent worker function.
+
+    Once min_samples calls were observed, a call running longer than the
+    given latency quantile gets a duplicate attempt, and the first attempt
+    to finish wins. The slower attempt runs to completion in the
+    background, so only hedge workers that are safe to call twice.
+    """
+
+    __slots__ = ("func", "quantile", "min_samples", "hedges", "_latency", "_lock")
+
+    def __init__(self, func: Callable, quantile: float, min_samples: int = 20):
+        self.func: Callable = func
+        self.quantile: float = quantile
+        self.min_samples: int = min_samples
+        self.hedges: int = 0
+        self._latency = Histogram()
+        self._lock = threading.Lock()
+
+    def __call__(self, data: TData) -> TData:
+        delay = self._delay()
+        start = time.perf_counter_ns()
+        if delay is None:
+            result = self.func(data)
+        else:
+            attempts = [start_call(self.func, data)]
+            done, _ = wait(attempts, timeout=delay)
+            if not done:
+                attempts.append(start_call(self.func, data))
+                self._hedged()
+                done, _ = wait(attempts, return_when=FIRST_COMPLETED)
+            result = done.pop().result()
+        self._record(start)
+        return result
+
+    def _delay(self) -> float | None:
+        """Seconds to wait before hedging, None until warmed up"""
+        with self._lock:
+            if self._latency.count < self.min_samples:
+                return None
+            return self._latency.percentile(self.quantile) / 1e9
+
+    def _hedged(self) -> None:
+        with self._lock:
+            self.hedges += 1
+
+    def _record(self, start: int) -> None:
+        with self._lock:
+            self._latency.record(time.perf_counter_ns() - start)
+
+    def __repr__(self):
+        return f"Hedge(func={self.func!r}, quantile={self.quantile})"
+
+
+class AsyncHedge(Hedge):
+    """Hedged calls of an idempotent async worker function.
+
+    Like Hedge, but attempts are tasks on the running loop and the slower
+    attempt is cancelled once the first one finishes.
+    """
+
+    __slots__ = ()
+
+    async def __call__(self, data: TData) -> TData:
+        delay = self._delay()
+        start = time.perf_counter_ns()
+        if delay is None:
+            result = await self.func(data)
+        else:
+            attempts = {asyncio.ensure_future(self.func(data))}
+            try:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done:
+                    attempts.add(asyncio.ensure_future(self.func(data)))
+                    self._hedged()
+                    done, _ = await asyncio.wait(
+                        attempts, return_when=asyncio.FIRST_COMPLETED
+                    )
+            finally:
+                for attempt in attempts:
+                    attempt.cancel()
+            result = done.pop().result()
+        self._record(start)
+        return result
+
+    def __repr__(self):
+        return f"AsyncHedge(func={self.func!r}, quantile={self.quantile})"
@@ -0,0 +1,231 @@
+import itertools
+import json
+import os
+import pickle
+import random
+import threading
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from pathlib import Path
+
+from sweetshop.base_data import TData
+
+
+def pickled_size(data: object) -> int | None:
+    """Size of data in bytes as pickled, None for data that cannot be pickled"""
+    try:
+        return len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return None
+
+
+class Trace:
+    """Trace events recorded during one sampled run."""
+
+    def __init__(self, run: int, size: Callable[..., int | None]):
+        self.run: int = run
+        self.size: Callable[..., int | None] = size
+        self.events: list[dict] = []
+
+    def span(self, name: str, category: str, start: int, end: int, args: dict) -> None:
+        """Record a complete event between two perf_counter_ns() times"""
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start / 1e3,
+                "dur": (end - start) / 1e3,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": {"run": self.run, **args},
+            }
+        )
+
+    def instant(self, name: str, args: dict) -> None:
+        """Record a branch decision taken now"""
+        self.events.append(
+            {
+                "name": name,
+                "cat": "branch",
+                "ph": "i",
+                "s": "t",
+                "ts": time.perf_counter_ns() / 1e3,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": {"run": self.run, **args},
+            }
+        )
+
+
+# Trace of the sampled run in the current context, None when not sampled
+CURRENT = ContextVar[Trace | None]("trace", default=None)
+
+
+class Tracer:
+    """Sampled per-run tracing, written as Chrome trace events.
+
+    A sample_rate share of runs is traced, with a span per node call
+    holding the worker, its config and the size of its output, and an
+    event per branch decision. Each traced run is appended to a JSON array
+    file as it finishes, which Perfetto and chrome://tracing open even
+    before close() ends the array. Runs that are not sampled only pay for
+    a context variable lookup per node. Batches of execute_many() and
+    stream() are not runs of their own and are never traced.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        sample_rate: float = 0.01,
+        size: Callable[..., int | None] = pickled_size,
+    ):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.path: Path = Path(path)
+        self.sample_rate: float = sample_rate
+        # Measures the data of traced runs, pickling it by default
+        self.size: Callable[..., int | None] = size
+        self.runs: int = 0
+        self._ids = itertools.count(1)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> Trace | None:
+        """Trace of a new run when it is sampled and not part of a traced run"""
+        if CURRENT.get() is not None or random.random() >= self.sample_rate:
+            return None
+        return Trace(next(self._ids), self.size)
+
+    def _finish(self, trace: Trace, start: int, data: TData, error: str | None):
+        args = {"input_size": trace.size(data)}
+        if error is not None:
+            args["error"] = error
+        trace.span(f"run {trace.run}", "run", start, time.perf_counter_ns(), args)
+        self._write(trace.events)
+
+    def trace(self, func: Callable, data: TData, *args) -> object:
+        """Call func(data, *args) as a run, tracing it when sampled"""
+        trace = self._start()
+        if trace is None:
+            return func(data, *args)
+        token = CURRENT.set(trace)
+        start, error = time.perf_counter_ns(), None
+        try:
+            return func(data, *args)
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            CURRENT.reset(token)
+            self._finish(trace, start, data, error)
+
+    async def atrace(self, func: Callable, data: TData, *args) -> object:
+        """Await func(data, *args) as a run, tracing it when sampled"""
+        trace = self._start()
+        if trace is None:
+            return await func(data, *args)
+        token = CURRENT.set(trace)
+        start, error = time.perf_counter_ns(), None
+        try:
+            return await func(data, *args)
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            CURRENT.reset(token)
+            self._finish(trace, start, data, error)
+
+    def _write(self, events: list[dict]) -> None:
+        """Append the events of a run to the trace file"""
+        lines = ",\n".join(json.dumps(event, default=repr) for event in events)
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "w")
+                self._file.write("[\n")
+            else:
+                self._file.write(",\n")
+            self._file.write(lines)
+            self._file.flush()
+            self.runs += 1
+
+    def close(self) -> None:
+        """End the JSON array of the trace file; later runs start a new file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.write("\n]\n")
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "Tracer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self):
+        return f"Tracer(path='{self.path}', sample_rate={self.sample_rate})"
+
+
+def traced_call(name: str, node_args: dict, func: Callable, data: TData) -> TData:
+    """Call func, recording a span when the current run is traced"""
+    trace = CURRENT.get()
+    if trace is None:
+        return func(data)
+    start = time.perf_counter_ns()
+    try:
+        result = func(data)
+    except Exception as e:
+        trace.span(
+            name, "node", start, time.perf_counter_ns(), {**node_args, "error": repr(e)}
+        )
+        raise
+    end = time.perf_counter_ns()
+    trace.span(
+        name, "node", start, end, {**node_args, "output_size": trace.size(result)}
+    )
+    return result
+
+
+async def atraced_call(
+    name: str, node_args: dict, func: Callable, data: TData
+) -> TData:
+    """Await func, recording a span when the current run is traced"""
+    trace = CURRENT.get()
+    if trace is None:
+        return await func(data)
+    start = time.perf_counter_ns()
+    try:
+        result = await func(data)
+    except Exception as e:
+        trace.span(
+            name, "node", start, time.perf_counter_ns(), {**node_args, "error": repr(e)}
+        )
+        raise
+    end = time.perf_counter_ns()
+    trace.span(
+        name, "node", start, end, {**node_args, "output_size": trace.size(result)}
+    )
+    return result
+
+
+def traced_condition(name: str, condition: Callable, data: TData) -> bool:
+    """Evaluate a branch condition, recording its outcome in a traced run"""
+    matched = bool(condition(data))
+    trace = CURRENT.get()
+    if trace is not None:
+        trace.instant(name, {"matched": matched})
+    return matched
+
+
+def traced_router(
+    name: str, labels: tuple[str, ...], router: Callable, data: TData
+) -> int | None:
+    """Route data of an exclusive branch, recording the target in a traced run"""
+    target = router(data)
+    trace = CURRENT.get()
+    if trace is not None:
+        trace.instant(name, {"target": None if target is None else labels[target]})
+    return target
@@ -1,28 +1,98 @@
+import inspect
 from collections.abc import Callable
-from typing import TYPE_CHECKING, Generic, Type
+from typing import Generic, Type
 
 from sweetshop.base_data import TData
+from sweetshop.cache import LRU, DiskCache
+from sweetshop.limits import Limiter
+from sweetshop.node import Node
 from sweetshop.registry import BaseRegistry
+from sweetshop.timeouts import check_timeout
 
-if TYPE_CHECKING:
-    from sweetshop.pipe import Node
+EXECUTORS: tuple[str | None, ...] = (None, "process")
 
 
 class Worker(Generic[TData]):
     def __init__(
-        self, func: Callable, name: str | None = None, data_type: Type[TData] = None
+        self,
+        func: Callable,
+        name: str | None = None,
+        data_type: Type[TData] = None,
+        batch: bool = False,
+        executor: str | None = None,
+        cache: LRU | DiskCache | None = None,
+        inplace: bool = False,
+        version: str | int | None = None,
+        timeout: float | None = None,
+        hedge: float | None = None,
+        max_concurrency: int | None = None,
     ):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unsupported worker executor: {executor!r}")
+        check_timeout(timeout)
+        if hedge is not None and not 0 < hedge < 1:
+            raise ValueError("hedge must be a latency quantile between 0 and 1")
         self.name: str = name or getattr(func, "__name__", "unknown_worker")
         self.func: Callable = func
         self.data_type: Type[TData] = data_type
-
-    def cfg(self, **kwargs) -> "Node":
-        """Create a configured node for this worker"""
-        # Import here to avoid circular import
-        from sweetshop.pipe import Node
-
+        # Batch workers take a list of data and return a list of results
+        self.batch: bool = batch
+        # Async workers return awaitables and are awaited by Pipe.aexecute
+        self.is_async: bool = inspect.iscoroutinefunction(func)
+        # Where compiled plans run the worker; "process" uses a process pool
+        self.executor: str | None = executor
+        # Opt-in memoization keyed by data fingerprint and node config
+        self.cache: LRU | DiskCache | None = cache
+        # In-place workers mutate and return their input instead of a copy
+        self.inplace: bool = inplace
+        # Part of every cache key, bump it when the function's results change
+        self.version: str | int | None = version
+        # Seconds after which a call fails with NodeTimeoutError
+        self.timeout: float | None = timeout
+        # Latency quantile after which an idempotent call is attempted again
+        self.hedge: float | None = hedge
+        # Bounds the calls running at once across every pipe using the worker
+        self.limiter: Limiter | None = (
+            Limiter(max_concurrency) if max_concurrency is not None else None
+        )
+
+    def cfg(self, **kwargs) -> Node:
+        """Create a configured node for this worker.
+
+        The config is checked against the function signature, so unknown or
+        missing arguments fail here rather than on the first call.
+        """
+        self._check_config(kwargs)
         return Node(self, kwargs)
 
+    def _check_config(self, config: dict) -> None:
+        """Raise TypeError when config does not fit the function signature"""
+        try:
+            parameters = list(inspect.signature(self.func).parameters.values())
+        except ValueError:  # builtins without a signature
+            return
+        # The first parameter receives the data, the rest the config
+        named = {
+            p.name: p
+            for p in parameters[1:]
+            if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)
+        }
+        if not any(p.kind == p.VAR_KEYWORD for p in parameters):
+            unknown = [key for key in config if key not in named]
+            if unknown:
+                raise TypeError(
+                    f"Worker '{self.name}' got unexpected config: {', '.join(unknown)}"
+                )
+        missing = [
+            name
+            for name, p in named.items()
+            if p.default is p.empty and name not in config
+        ]
+        if missing:
+            raise TypeError(
+                f"Worker '{self.name}' is missing config: {', '.join(missing)}"
+            )
+
     def execute(self, *args, **kwargs) -> TData:
         """Execute worker"""
         if not args or not isinstance(args[0], self.data_type):
@@ -30,6 +100,8 @@ class Worker(Generic[TData]):
                 f"Expected first argument of type {self.data_type.__name__}, "
                 f"got {type(args[0]).__name__ if args else 'None'}"
             )
+        if self.batch:
+            return self.func([args[0]], *args[1:], **kwargs)[0]
         return self.func(*args, **kwargs)
 
     def __repr__(self):
@@ -39,22 +111,49 @@ class Worker(Generic[TData]):
 class WorkerRegistry(BaseRegistry[Worker]):
     """Registry for managing Worker instances."""
 
+    entry_point_group = "sweetshop.workers"
+
     def __getattr__(self, name: str) -> Worker:
         """Allow accessing workers as attributes for createnode() calls."""
 
         if self.exists(name):
-            return self._registry[name]
+            return self.get(name)
         raise AttributeError(f"Worker '{name}' not found in registry")
 
+    def _coerce(self, obj: object) -> Worker:
+        if not isinstance(obj, Worker):
+            raise TypeError(f"Expected a Worker, got {type(obj).__name__}")
+        return obj
+
     def register_worker(
         self,
         data_type: Type[TData],
         name: str | None = None,
+        batch: bool = False,
+        executor: str | None = None,
+        cache: LRU | DiskCache | None = None,
+        inplace: bool = False,
+        version: str | int | None = None,
+        timeout: float | None = None,
+        hedge: float | None = None,
+        max_concurrency: int | None = None,
     ) -> Callable:
         """Register decorator supporting data type constraints"""
 
         def wrapper(func: Callable) -> Callable:
-            worker = Worker(func, name, data_type)
+            worker = Worker(
+                func,
+                name,
+                data_type,
+                batch,
+                executor,
+                cache,
+                inplace,
+                version,
+                timeout,
+                hedge,
+                max_concurrency,
+            )
             self.register(worker.name, worker)
             return func
 
@@ -0,0 +1,9 @@
+from sweetshop import SharedBuffer, SharedData
+
+
+class Blob(SharedData):
+    """Shared data class with one bulk payload."""
+
+    def __init__(self, payload: SharedBuffer, label: str = ""):
+        self.payload = payload
+        self.label = label
@@ -0,0 +1,20 @@
+from sweetshop import Pipe, Worker, pipe_registry
+from tests.common.digital_data import DigitalData, add_value, multiply_by_two
+
+
+def check_positive(data: DigitalData) -> DigitalData:
+    """Fail on negative values, to test remote failures."""
+    if data.value < 0:
+        raise ValueError(f"negative value {data.value}")
+    return data
+
+
+@pipe_registry.register_pipe()
+def remote_pipe() -> Pipe:
+    """Pipe run by the worker processes of a broker."""
+    return (
+        Pipe(data_type=DigitalData)
+        .start_with(Worker(check_positive, data_type=DigitalData).cfg())
+        .then(Worker(multiply_by_two, data_type=DigitalData).cfg())
+        .then(Worker(add_value, data_type=DigitalData).cfg(value=1))
+    )
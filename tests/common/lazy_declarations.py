@@ -0,0 +1,27 @@
+from sweetshop import Pipe, Worker, pipe_registry, worker_registry
+from tests.common.digital_data import DigitalData, add_value, multiply_by_two
+
+# Module state lets tests check when importing happened
+IMPORTED = True
+
+ADD_TEN = Worker(add_value, name="add_ten", data_type=DigitalData)
+
+
+@worker_registry.register_worker(data_type=DigitalData)
+def lazy_double(data: DigitalData) -> DigitalData:
+    """Double the value, registered when this module is imported."""
+    return multiply_by_two(data)
+
+
+@pipe_registry.register_pipe()
+def lazy_pipe() -> Pipe:
+    """Pipe registered when this module is imported."""
+    return Pipe(data_type=DigitalData).start_with(worker_registry.lazy_double.cfg())
+
+
+def build_pipe() -> Pipe:
+    """Pipe builder referenced directly by a manifest."""
+    return Pipe(data_type=DigitalData).start_with(ADD_TEN.cfg(value=10))
+
+
+BUILT_PIPE = build_pipe()
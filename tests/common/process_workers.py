@@ -0,0 +1,34 @@
+from sweetshop import SharedBuffer, worker_registry
+from tests.common.blob_data import Blob
+from tests.common.digital_data import DigitalData
+
+
+@worker_registry.register_worker(data_type=DigitalData, executor="process")
+def square_value(data: DigitalData) -> DigitalData:
+    """Square the value in a worker process."""
+    return DigitalData(data.value**2)
+
+
+@worker_registry.register_worker(data_type=DigitalData, executor="process", batch=True)
+def add_all(items: list[DigitalData], value: float) -> list[DigitalData]:
+    """Add a specific value to every item in a worker process."""
+    return [DigitalData(item.value + value) for item in items]
+
+
+@worker_registry.register_worker(data_type=DigitalData, executor="process")
+async def negate_value(data: DigitalData) -> DigitalData:
+    """Negate the value with an async worker in a worker process."""
+    return DigitalData(-data.value)
+
+
+@worker_registry.register_worker(data_type=Blob, executor="process")
+def invert_blob(data: Blob) -> Blob:
+    """Invert every byte into a new shared buffer in a worker process."""
+    return Blob(SharedBuffer(bytes(255 - byte for byte in data.payload.view)))
+
+
+@worker_registry.register_worker(data_type=Blob, executor="process")
+def fill_blob(data: Blob, value: int) -> Blob:
+    """Overwrite the shared buffer in place from a worker process."""
+    data.payload.view[:] = bytes([value]) * data.payload.size
+    return data
@@ -0,0 +1,34 @@
+import pytest
+
+from sweetshop import BaseData
+from tests.common.digital_data import DigitalData
+
+
+class TestBaseData:
+    """Test cases for BaseData class."""
+
+    def test_fingerprint_equal_data(self):
+        """Test equal data has equal fingerprints."""
+        assert DigitalData(1).fingerprint() == DigitalData(1).fingerprint()
+
+    def test_fingerprint_different_data(self):
+        """Test different data has different fingerprints."""
+        assert DigitalData(1).fingerprint() != DigitalData(2).fingerprint()
+
+    def test_fork_is_deep(self):
+        """Test a fork shares no nested objects with the original."""
+
+        class Nested(BaseData):
+            def __init__(self, items: list):
+                self.items = items
+
+        data = Nested([1, [2]])
+        forked = data.fork()
+        forked.items[1].append(3)
+
+        assert forked is not data
+        assert data.items == [1, [2]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
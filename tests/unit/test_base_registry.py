@@ -1,6 +1,11 @@
+import json
+import sys
+
 import pytest
 
-from sweetshop.registry import BaseRegistry
+from sweetshop import pipe_registry, worker_registry
+from sweetshop.registry import BaseRegistry, import_target
+from tests.common.digital_data import DigitalData, add_one
 
 
 class TestBaseRegistry:
@@ -111,5 +116,149 @@ class TestBaseRegistry:
         assert len(registry2) == 1
 
 
+class TestLazyRegistration:
+    """Test cases for lazily registered objects."""
+
+    def setup_method(self):
+        """Set up test registry for each test."""
+        self.registry = BaseRegistry[object]()
+        self.loads = []
+
+    def teardown_method(self):
+        """Drop what importing the declaring module registered."""
+        worker_registry.clear()
+        pipe_registry.clear()
+
+    def loader(self) -> tuple:
+        """Count loads and provide an item."""
+        self.loads.append(1)
+        return (1,)
+
+    def test_loaded_on_first_access(self):
+        """Test the loader runs once, on first get."""
+        self.registry.register_lazy("item", self.loader)
+        assert "item" in self.registry
+        assert len(self.registry) == 1
+        assert self.registry.list_names() == ["item"]
+        assert self.loads == []
+
+        assert self.registry.get("item") == (1,)
+        assert self.registry.get("item") == (1,)
+        assert self.loads == [1]
+
+    def test_loader_registers_itself(self):
+        """Test a loader may register the object instead of returning it."""
+        self.registry.register_lazy(
+            "item", lambda: self.registry.register("item", (2,))
+        )
+        assert self.registry.get("item") == (2,)
+
+    def test_loader_failure_is_retried(self):
+        """Test a failing loader stays declared for the next access."""
+        outcomes = [ImportError("flaky"), (3,)]
+
+        def flaky():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.registry.register_lazy("item", flaky)
+        with pytest.raises(ImportError, match="flaky"):
+            self.registry.get("item")
+        assert self.registry.get("item") == (3,)
+
+    def test_loader_providing_nothing(self):
+        """Test a loader that neither returns nor registers an object."""
+        self.registry.register_lazy("item", lambda: None)
+        with pytest.raises(KeyError, match="'item' not found in registry"):
+            self.registry.get("item")
+        assert "item" not in self.registry
+
+    def test_register_lazy_duplicate(self):
+        """Test declaring a registered name raises KeyError."""
+        self.registry.register("item", (1,))
+        with pytest.raises(KeyError, match="'item' already registered"):
+            self.registry.register_lazy("item", self.loader)
+
+    def test_register_lazy_twice(self):
+        """Test a pending loader is only replaced by a declared import target."""
+        self.registry.register_lazy("item", self.loader)
+        with pytest.raises(KeyError, match="'item' already registered"):
+            self.registry.register_lazy("item", self.loader)
+        with pytest.raises(KeyError, match="tuple 'item' already registered"):
+            self.registry.register("item", (2,))
+        with pytest.raises(KeyError, match="'item' already registered"):
+            self.registry.declare("item", "tests.common.digital_data:add_one")
+
+        target = "tests.common.lazy_declarations:ADD_TEN"
+        self.registry.declare("declared", target)
+        self.registry.declare("declared", target)
+        with pytest.raises(KeyError, match="'declared' already declared as"):
+            self.registry.declare("declared", "tests.common.digital_data:add_one")
+        # The module a manifest points to registers the name itself
+        self.registry.register("declared", (3,))
+        assert self.registry.get("declared") == (3,)
+
+    def test_register_lazy_replaces_declaration(self):
+        """Test a loader declaring a new loader for its name runs it too."""
+        self.registry.register_lazy(
+            "item", lambda: self.registry.register_lazy("item", self.loader)
+        )
+        assert self.registry.get("item") == (1,)
+        assert self.loads == [1]
+
+    def test_declare_attribute_target(self):
+        """Test a declared target is imported only on first access."""
+        sys.modules.pop("tests.common.lazy_declarations", None)
+        self.registry.declare("worker", "tests.common.lazy_declarations:ADD_TEN.name")
+        assert "tests.common.lazy_declarations" not in sys.modules
+
+        assert self.registry.get("worker") == "add_ten"
+        assert "tests.common.lazy_declarations" in sys.modules
+
+    def test_declare_module_not_registering(self):
+        """Test a module target must register the declared name."""
+        self.registry.declare("item", "tests.common.digital_data")
+        with pytest.raises(KeyError, match="not registered by importing"):
+            self.registry.get("item")
+
+    def test_load_manifest(self, tmp_path):
+        """Test declaring names from a mapping or a JSON file."""
+        path = tmp_path / "manifest.json"
+        path.write_text(json.dumps({"add_one": "tests.common.digital_data:add_one"}))
+        self.registry.load_manifest(path)
+        self.registry.load_manifest({"data": "tests.common.digital_data:DigitalData"})
+
+        assert self.registry.get("add_one") is add_one
+        assert self.registry.get("data") is DigitalData
+
+    def test_load_entry_points(self, tmp_path, monkeypatch):
+        """Test declaring names from installed package entry points."""
+        dist_info = tmp_path / "lazy_plugin-1.0.dist-info"
+        dist_info.mkdir()
+        (dist_info / "METADATA").write_text("Name: lazy-plugin\nVersion: 1.0\n")
+        (dist_info / "entry_points.txt").write_text(
+            "[sweetshop.test]\nadd_one = tests.common.digital_data:add_one\n"
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+
+        self.registry.load_entry_points("sweetshop.test")
+        assert self.registry.get("add_one") is add_one
+
+    def test_import_target(self):
+        """Test importing modules and nested attributes."""
+        assert import_target("tests.common.digital_data") is None
+        assert import_target("tests.common.digital_data:DigitalData.__name__") == (
+            "DigitalData"
+        )
+
+    def test_clear(self):
+        """Test clearing removes lazy declarations too."""
+        self.registry.register_lazy("item", self.loader)
+        self.registry.clear()
+        assert len(self.registry) == 0
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
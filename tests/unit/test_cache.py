@@ -0,0 +1,320 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sweetshop import LRU, DiskCache, Pipe, SharedBuffer, Worker
+from tests.common.blob_data import Blob
+from tests.common.digital_data import DigitalData, add_value
+
+
+class TestLRU:
+    """Test cases for LRU class."""
+
+    def test_hit_and_miss(self):
+        """Test hits and misses are counted."""
+        cache = LRU(maxsize=2)
+
+        assert cache.get("a") is None
+        cache.put("a", DigitalData(1))
+        assert cache.get("a") == DigitalData(1)
+        assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used entry is evicted when full."""
+        cache = LRU(maxsize=2)
+        cache.put("a", DigitalData(1))
+        cache.put("b", DigitalData(2))
+        cache.get("a")
+        cache.put("c", DigitalData(3))
+
+        assert cache.get("b") is None
+        assert cache.get("a") == DigitalData(1)
+        assert cache.evictions == 1
+        assert len(cache) == 2
+
+    def test_ttl_expiry(self):
+        """Test entries older than the ttl are evicted."""
+        cache = LRU(maxsize=2, ttl=0.01)
+        cache.put("a", DigitalData(1))
+        assert cache.get("a") == DigitalData(1)
+
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "size": 0}
+
+    def test_clear(self):
+        """Test clearing entries and counters."""
+        cache = LRU()
+        cache.put("a", DigitalData(1))
+        cache.get("a")
+        cache.clear()
+
+        assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0}
+
+    def test_invalid_maxsize(self):
+        """Test a non-positive maxsize raises error."""
+        with pytest.raises(ValueError, match="maxsize must be at least 1"):
+            LRU(maxsize=0)
+
+    def test_repr(self):
+        """Test cache string representation."""
+        assert repr(LRU(maxsize=8, ttl=1.5)) == "LRU(maxsize=8, ttl=1.5)"
+
+
+class TestCachedWorker:
+    """Test cases for memoized workers in pipes."""
+
+    def setup_method(self):
+        """Set up a counting, cached worker for each test."""
+        self.calls = []
+        self.cache = LRU(maxsize=16)
+
+        def count_add(data: DigitalData, value: float) -> DigitalData:
+            self.calls.append(data.value)
+            return add_value(data, value)
+
+        self.worker = Worker(count_add, data_type=DigitalData, cache=self.cache)
+
+    def test_execute_cached(self):
+        """Test duplicate inputs are served from the cache."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.worker.cfg(value=1))
+
+        assert pipe.execute(DigitalData(1)) == DigitalData(2)
+        assert pipe.execute(DigitalData(1)) == DigitalData(2)
+        assert self.calls == [1]
+        assert self.cache.stats()["hits"] == 1
+
+    def test_config_is_part_of_key(self):
+        """Test nodes with different configs do not share entries."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.worker.cfg(value=1))
+            .then(self.worker.cfg(value=2))
+        )
+
+        assert pipe.execute(DigitalData(1)) == DigitalData(4)
+        assert self.calls == [1, 2]
+
+    def test_execute_many_cached(self):
+        """Test only batch items missing from the cache are computed."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.worker.cfg(value=1))
+        pipe.execute(DigitalData(1))
+
+        results = pipe.execute_many([DigitalData(1), DigitalData(2), DigitalData(1)])
+        assert results == [DigitalData(2), DigitalData(3), DigitalData(2)]
+        assert self.calls == [1, 2]
+
+    def test_execute_many_all_cached(self):
+        """Test a fully cached batch does not call the worker."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.worker.cfg(value=1))
+        pipe.execute(DigitalData(1))
+
+        assert pipe.execute_many([DigitalData(1)]) == [DigitalData(2)]
+        assert self.calls == [1]
+
+    def test_aexecute_cached(self):
+        """Test async execution uses the cache."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.worker.cfg(value=1))
+
+        asyncio.run(pipe.aexecute(DigitalData(1)))
+        assert asyncio.run(pipe.aexecute(DigitalData(1))) == DigitalData(2)
+        assert self.calls == [1]
+
+    def test_concurrent_executes(self):
+        """Test the cache is safe under concurrent executes."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.worker.cfg(value=1))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            inputs = [DigitalData(v % 4) for v in range(200)]
+            results = list(executor.map(pipe.execute, inputs))
+
+        assert results == [DigitalData(v % 4 + 1) for v in range(200)]
+        stats = self.cache.stats()
+        assert stats["hits"] + stats["misses"] == 200
+        assert stats["size"] == 4
+
+
+class TestDiskCache:
+    """Test cases for DiskCache class."""
+
+    def test_hit_and_miss(self, tmp_path):
+        """Test values persist and hits and misses are counted."""
+        cache = DiskCache(tmp_path / "cache" / "results.db")
+
+        assert cache.get("a") is None
+        cache.put("a", DigitalData(1))
+        cache.put("a", DigitalData(2))
+        assert cache.get("a") == DigitalData(2)
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+        assert stats["bytes"] == cache.nbytes() > 0
+
+        reopened = DiskCache(tmp_path / "cache" / "results.db")
+        assert reopened.get("a") == DigitalData(2)
+
+    def test_shared_data_contents(self, tmp_path):
+        """Test shared data is stored by content, not by segment handle."""
+        cache = DiskCache(tmp_path / "results.db")
+        blob = Blob(SharedBuffer(b"abc"), label="x")
+        cache.put("blob", blob)
+        name = blob.payload.name
+        blob.release()
+
+        cached = cache.get("blob")
+        assert isinstance(cached, Blob)
+        assert (cached.payload.tobytes(), cached.label) == (b"abc", "x")
+        assert cached.payload.name != name
+        cached.release()
+
+    def test_shared_across_processes(self, tmp_path):
+        """Test entries stored by a forked process are visible to the parent."""
+        cache = DiskCache(tmp_path / "results.db")
+        cache.put("parent", DigitalData(1))
+
+        def copy_entry() -> None:
+            value = cache.get("parent")
+            assert value is not None
+            cache.put("child", value)
+
+        process = multiprocessing.get_context("fork").Process(target=copy_entry)
+        process.start()
+        process.join()
+
+        assert process.exitcode == 0
+        assert cache.get("child") == DigitalData(1)
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test the least recently used entries go once over the size bound."""
+        probe = DiskCache(tmp_path / "probe.db")
+        probe.put("a", DigitalData(1))
+        cache = DiskCache(tmp_path / "results.db", max_bytes=probe.nbytes() * 2)
+        cache.put("a", DigitalData(1))
+        cache.put("b", DigitalData(2))
+        time.sleep(0.01)
+        cache.get("a")
+        cache.put("c", DigitalData(3))
+
+        assert cache.get("b") is None
+        assert cache.get("a") == DigitalData(1)
+        assert cache.evictions == 1
+        assert len(cache) == 2
+        assert cache.nbytes() <= cache.max_bytes
+
+    def test_worker_versions(self, tmp_path):
+        """Test a new worker version drops the entries of other versions."""
+        path = tmp_path / "results.db"
+        DiskCache(path).put((("double", 1, "[]"), "x"), DigitalData(2))
+        DiskCache(path).put((("other", None, "[]"), "x"), DigitalData(3))
+        cache = DiskCache(path)
+        cache.put((("double", 2, "[]"), "y"), DigitalData(4))
+
+        assert cache.get((("double", 1, "[]"), "x")) is None
+        assert cache.get((("other", None, "[]"), "x")) == DigitalData(3)
+        assert cache.invalidate("double") == 1
+        assert cache.invalidate("double") == 0
+        assert len(cache) == 1
+
+    def test_clear(self, tmp_path):
+        """Test clear removes entries and resets counters."""
+        cache = DiskCache(tmp_path / "results.db")
+        cache.put("a", DigitalData(1))
+        cache.get("a")
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.nbytes() == 0
+        assert cache.hits == 0
+
+    def test_invalid_max_bytes(self, tmp_path):
+        """Test a non-positive size bound is rejected."""
+        with pytest.raises(ValueError, match="max_bytes must be at least 1"):
+            DiskCache(tmp_path / "results.db", max_bytes=0)
+
+    def test_repr(self, tmp_path):
+        """Test cache string representation."""
+        cache = DiskCache(tmp_path / "results.db", max_bytes=64)
+        assert (
+            repr(cache) == f"DiskCache(path='{tmp_path / 'results.db'}', max_bytes=64)"
+        )
+
+
+class TestResumableRuns:
+    """Test cases for pipes caching every node's results on disk."""
+
+    def setup_method(self):
+        """Set up counting workers, one failing until fixed, for each test."""
+        self.calls = []
+        self.broken = True
+
+        def count_add(data: DigitalData, value: float) -> DigitalData:
+            self.calls.append(value)
+            return add_value(data, value)
+
+        def flaky(data: DigitalData) -> DigitalData:
+            self.calls.append("flaky")
+            if self.broken:
+                raise ValueError("flaky failure")
+            return data
+
+        self.count_add = Worker(count_add, data_type=DigitalData)
+        self.flaky = Worker(flaky, data_type=DigitalData)
+
+    def build(self, cache: DiskCache) -> Pipe:
+        """Build a pipe failing at its last node while broken."""
+        return (
+            Pipe(data_type=DigitalData)
+            .start_with(self.count_add.cfg(value=1))
+            .then(self.count_add.cfg(value=2))
+            .then(self.flaky.cfg())
+            .cache_results(cache)
+        )
+
+    def test_resume_after_failure(self, tmp_path):
+        """Test a failed run resumes from its last successful node."""
+        with pytest.raises(RuntimeError, match="flaky failure"):
+            self.build(DiskCache(tmp_path / "results.db")).execute(DigitalData(0))
+        assert self.calls == [1, 2, "flaky"]
+
+        self.broken = False
+        self.calls.clear()
+        pipe = self.build(DiskCache(tmp_path / "results.db"))
+        assert pipe.execute(DigitalData(0)) == DigitalData(3)
+        assert self.calls == ["flaky"]
+
+        self.calls.clear()
+        assert pipe.execute_many([DigitalData(0), DigitalData(1)]) == [
+            DigitalData(3),
+            DigitalData(4),
+        ]
+        assert self.calls == [1, 2, "flaky"]
+
+    def test_worker_cache_takes_precedence(self, tmp_path):
+        """Test a worker's own cache is used instead of the pipe's."""
+        own = LRU()
+        worker = Worker(add_value, data_type=DigitalData, cache=own)
+        disk = DiskCache(tmp_path / "results.db")
+        pipe = Pipe(data_type=DigitalData).start_with(worker.cfg(value=1))
+        pipe.then(self.count_add.cfg(value=2)).cache_results(disk)
+
+        assert pipe.execute(DigitalData(0)) == DigitalData(3)
+        assert len(own) == 1
+        assert len(disk) == 1
+
+    def test_version_invalidates_results(self, tmp_path):
+        """Test bumping a worker version recomputes its results."""
+        disk = DiskCache(tmp_path / "results.db")
+        self.build(disk)
+        self.broken = False
+        self.build(disk).execute(DigitalData(0))
+        self.count_add.version = 2
+        self.calls.clear()
+
+        assert self.build(disk).execute(DigitalData(0)) == DigitalData(3)
+        assert self.calls == [1, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,238 @@
+import importlib
+import runpy
+import sys
+import threading
+
+import pytest
+
+from sweetshop import Broker, LocalCluster, RemoteExecutionError, pipe_registry
+from sweetshop.distributed import main, serve
+from tests.common.digital_data import DigitalData
+
+MODULE = "tests.common.distributed_pipes"
+
+
+class TestBroker:
+    """Test cases for Broker class."""
+
+    def setup_method(self):
+        """Set up test data for each test."""
+        self.data = [DigitalData(value) for value in range(5)]
+
+    def test_submit_and_collect(self, tmp_path):
+        """Test results come back in submission order and are removed."""
+        broker = Broker(tmp_path / "broker.db")
+        jobs = broker.submit_many("pipe", self.data)
+        assert len(broker) == 5
+
+        claimed = broker.claim("worker", limit=3)
+        assert [(job, pipe) for job, pipe, _ in claimed] == [
+            (job, "pipe") for job in jobs[:3]
+        ]
+        assert [data for _, _, data in claimed] == self.data[:3]
+        broker.complete(
+            "worker",
+            [(job, DigitalData(-data.value), None) for job, _, data in claimed],
+        )
+        assert broker.stats() == {
+            "queued": 2,
+            "running": 0,
+            "done": 3,
+            "failed": 0,
+            "workers": {"worker": 3},
+        }
+
+        assert broker.results(list(reversed(jobs[:3]))) == [
+            DigitalData(-2),
+            DigitalData(-1),
+            DigitalData(0),
+        ]
+        assert broker.stats()["done"] == 0
+        assert len(broker) == 2
+
+    def test_failed_job(self, tmp_path):
+        """Test failures raise with the worker's traceback once all finished."""
+        broker = Broker(tmp_path / "broker.db")
+        first, second = broker.submit_many("pipe", self.data[:2])
+        broker.claim("worker", limit=2)
+        broker.complete(
+            "worker",
+            [
+                (first, None, "Traceback:\nValueError: bad value\n"),
+                (second, DigitalData(1), None),
+            ],
+        )
+
+        with pytest.raises(RemoteExecutionError, match="bad value") as info:
+            broker.results([first, second])
+        error = info.value
+        assert isinstance(error, RemoteExecutionError)
+        assert error.pipe == "pipe" and error.job == first
+        assert str(error) == f"Pipe pipe job {first} failed: ValueError: bad value"
+        assert error.traceback.startswith("Traceback:")
+        assert len(broker) == 0
+
+    def test_timeout_keeps_jobs(self, tmp_path):
+        """Test waiting times out without losing finished results."""
+        broker = Broker(tmp_path / "broker.db")
+        first, second = broker.submit_many("pipe", self.data[:2])
+        ((job, _, _),) = broker.claim("worker")
+        broker.complete("worker", [(job, DigitalData(7), None)])
+
+        with pytest.raises(TimeoutError, match=r"timed out after 0.02s"):
+            broker.results([first, second], timeout=0.02)
+        assert broker.result(first, timeout=1) == DigitalData(7)
+
+    def test_expired_lease(self, tmp_path):
+        """Test jobs of a vanished worker are claimed again, and finish once."""
+        now = [0.0]
+        broker = Broker(tmp_path / "broker.db", lease=10, clock=lambda: now[0])
+        job = broker.submit("pipe", self.data[0])
+        assert len(broker.claim("lost")) == 1
+        assert broker.claim("other") == []
+
+        now[0] = 11
+        assert [claimed for claimed, _, _ in broker.claim("other")] == [job]
+        broker.complete("other", [(job, DigitalData(1), None)])
+        broker.complete("lost", [(job, DigitalData(2), None)])
+        assert broker.result(job) == DigitalData(1)
+
+    def test_completing_renews_leases(self, tmp_path):
+        """Test each stored outcome keeps the rest of a claimed batch leased."""
+        now = [0.0]
+        broker = Broker(tmp_path / "broker.db", lease=10, clock=lambda: now[0])
+        broker.submit_many("pipe", self.data[:3])
+        (first, _, _), *rest = broker.claim("worker", limit=3)
+
+        now[0] = 8
+        broker.complete("worker", [(first, DigitalData(0), None)])
+        now[0] = 15
+        assert broker.claim("other", limit=3) == []
+        now[0] = 19
+        assert [job for job, _, _ in broker.claim("other", limit=3)] == [
+            job for job, _, _ in rest
+        ]
+
+    def test_many_jobs(self, tmp_path):
+        """Test job id queries are split below the SQLite variable limit."""
+        broker = Broker(tmp_path / "broker.db")
+        items = [DigitalData(value) for value in range(1200)]
+        jobs = broker.submit_many("pipe", items)
+        claimed = broker.claim("worker", limit=len(jobs))
+        broker.complete("worker", [(job, data, None) for job, _, data in claimed])
+        assert broker.results(jobs) == items
+
+    def test_close_and_clear(self, tmp_path):
+        """Test closing is seen by every process and undone by clear."""
+        broker = Broker(tmp_path / "broker.db")
+        broker.submit("pipe", self.data[0])
+        assert not broker.closed
+
+        broker.close()
+        assert Broker(tmp_path / "broker.db").closed
+        broker.open()
+        assert not broker.closed
+        broker.close()
+        broker.clear()
+        assert not broker.closed
+        assert len(broker) == 0
+
+    def test_invalid_lease(self, tmp_path):
+        """Test the lease must be positive."""
+        with pytest.raises(ValueError, match="lease must be positive"):
+            Broker(tmp_path / "broker.db", lease=0)
+
+    def test_repr(self, tmp_path):
+        """Test broker string representation."""
+        broker = Broker(tmp_path / "broker.db", lease=5)
+        assert repr(broker) == f"Broker(path='{tmp_path / 'broker.db'}', lease=5)"
+
+
+class TestServe:
+    """Test cases for the worker loop."""
+
+    def setup_method(self):
+        """Forget the pipes of the test module for each test."""
+        sys.modules.pop(MODULE, None)
+
+    def teardown_method(self):
+        """Tear down after each test."""
+        pipe_registry.clear()
+
+    def test_serve_until_closed(self, tmp_path):
+        """Test a worker runs every queued job, then exits once closed."""
+        broker = Broker(tmp_path / "broker.db")
+        jobs = broker.submit_many("remote_pipe", [DigitalData(2), DigitalData(5)])
+        failing = broker.submit("remote_pipe", DigitalData(-1))
+        unknown = broker.submit("unknown_pipe", DigitalData(1))
+
+        # The worker waits for work until the broker is closed
+        timer = threading.Timer(0.05, broker.close)
+        timer.start()
+        assert serve(broker.path, imports=[MODULE], batch=3) == 4
+        timer.join()
+
+        assert broker.results(jobs) == [DigitalData(5), DigitalData(11)]
+        with pytest.raises(RemoteExecutionError, match="negative value -1"):
+            broker.result(failing)
+        with pytest.raises(RemoteExecutionError, match="'unknown_pipe' not found"):
+            broker.result(unknown)
+        assert sum(broker.stats()["workers"].values()) == 4
+
+    def test_main(self, tmp_path, monkeypatch):
+        """Test the command line serves the broker file it is given."""
+        broker = Broker(tmp_path / "broker.db")
+        job = broker.submit("remote_pipe", DigitalData(1))
+        broker.close()
+        main([str(broker.path), "--import", MODULE, "--batch", "1"])
+        assert broker.result(job) == DigitalData(3)
+
+        monkeypatch.setattr(sys, "argv", ["sweetshop", str(broker.path)])
+        runpy.run_module("sweetshop", run_name="__main__")
+        assert len(broker) == 0
+
+
+class TestLocalCluster:
+    """Test cases for LocalCluster class."""
+
+    def setup_method(self):
+        """Register the remote pipes for each test."""
+        sys.modules.pop(MODULE, None)
+        importlib.import_module(MODULE)
+
+    def teardown_method(self):
+        """Tear down after each test."""
+        pipe_registry.clear()
+
+    def test_cluster(self, tmp_path):
+        """Test worker processes run the submitted pipes until closed."""
+        items = [DigitalData(value) for value in range(40)]
+        with LocalCluster(
+            tmp_path / "broker.db", workers=2, imports=[MODULE]
+        ) as cluster:
+            assert cluster.execute("remote_pipe", DigitalData(3), timeout=30) == (
+                DigitalData(7)
+            )
+            cluster.add_workers(1)
+            results = cluster.execute_many("remote_pipe", items, timeout=30)
+            assert results == [pipe_registry.remote_pipe.execute(d) for d in items]
+            assert repr(cluster).endswith("workers=3)")
+            processes = list(cluster.processes)
+
+        assert cluster.processes == []
+        assert all(process.exitcode == 0 for process in processes)
+        assert sum(cluster.broker.stats()["workers"].values()) == 41
+
+    def test_clusters_reuse_path(self, tmp_path):
+        """Test a cluster opened after another closed on its file still serves."""
+        for value in range(2):
+            with LocalCluster(tmp_path / "broker.db", imports=[MODULE]) as cluster:
+                assert not cluster.broker.closed
+                assert cluster.execute(
+                    "remote_pipe", DigitalData(value), timeout=30
+                ) == (pipe_registry.remote_pipe.execute(DigitalData(value)))
+            assert cluster.broker.closed
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
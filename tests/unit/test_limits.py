@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sweetshop import Pipe, Worker
+from sweetshop.limits import PRIORITY, Limiter, alimited_call, limited_call
+from tests.common.digital_data import DigitalData
+
+
+def wait_for(predicate, timeout: float = 5) -> None:
+    """Poll until predicate holds, failing after timeout seconds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+async def double(data: DigitalData) -> DigitalData:
+    return DigitalData(data.value * 2)
+
+
+class TestLimiter:
+    """Test cases for Limiter class."""
+
+    def test_bounds_concurrent_calls(self):
+        """Test a limited worker never runs more calls than its limit."""
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def track(data: DigitalData) -> DigitalData:
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.005)
+            with lock:
+                running[0] -= 1
+            return data
+
+        worker = Worker(track, data_type=DigitalData, max_concurrency=2)
+        pipe = Pipe(data_type=DigitalData).start_with(worker.cfg())
+        with ThreadPoolExecutor(6) as pool:
+            results = list(pool.map(pipe.execute, map(DigitalData, range(12))))
+
+        assert results == list(map(DigitalData, range(12)))
+        assert peak[0] == 2
+        assert worker.limiter is not None
+        stats = worker.limiter.stats()
+        assert stats["calls"] == 12 and stats["active"] == 0
+        assert stats["wait_max_seconds"] > 0
+
+    def test_slots_go_by_priority(self):
+        """Test waiting calls get free slots by priority, then arrival."""
+        limiter = Limiter(1)
+        order = []
+        limiter.acquire()
+
+        def call(name: str, priority: int) -> None:
+            PRIORITY.set(priority)
+            limited_call(limiter, lambda data: order.append(name), DigitalData(0))
+
+        threads = []
+        for name, priority in [("low", -1), ("first", 0), ("high", 5), ("second", 0)]:
+            threads.append(threading.Thread(target=call, args=(name, priority)))
+            threads[-1].start()
+            wait_for(lambda: limiter.stats()["waiting"] == len(threads))
+        limiter.release()
+        for thread in threads:
+            thread.join()
+
+        assert order == ["high", "first", "second", "low"]
+        assert limiter.active == 0
+        assert repr(limiter) == "Limiter(limit=1, active=0)"
+
+    def test_invalid_limit(self):
+        """Test the limit must allow at least one call."""
+        with pytest.raises(ValueError, match="max_concurrency must be at least 1"):
+            Worker(abs, data_type=int, max_concurrency=0)
+
+    def test_async_calls(self):
+        """Test async calls wait for a slot and give it back when cancelled."""
+        limiter = Limiter(1)
+        worker = Worker(double, data_type=DigitalData, max_concurrency=1)
+        pipe = Pipe(data_type=DigitalData).start_with(worker.cfg())
+        assert asyncio.run(pipe.aexecute(DigitalData(2))) == DigitalData(4)
+
+        limiter.acquire()
+        timer = threading.Timer(0.1, limiter.release)
+        timer.start()
+        with pytest.raises(TimeoutError):
+            asyncio.run(
+                asyncio.wait_for(alimited_call(limiter, double, DigitalData(1)), 0.02)
+            )
+        timer.join()
+        wait_for(lambda: limiter.active == 0)
+
+    def test_sync_worker_in_async_run(self):
+        """Test sync limited workers are offloaded when run asynchronously."""
+        worker = Worker(abs, name="abs", data_type=int, max_concurrency=1)
+        pipe = Pipe(data_type=int).start_with(worker.cfg())
+        assert asyncio.run(pipe.aexecute(-3)) == 3
+        assert pipe.execute_many([-1, -2]) == [1, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
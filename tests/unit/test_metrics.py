@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+
+from sweetshop import Pipe, Worker
+from sweetshop.metrics import Histogram
+from tests.common.digital_data import DigitalData, add_one, add_value, multiply_by_two
+
+
+class TestHistogram:
+    """Test cases for Histogram class."""
+
+    def test_empty(self):
+        """Test an empty histogram reports zero."""
+        assert Histogram().percentile(0.5) == 0
+
+    def test_small_values_are_exact(self):
+        """Test values below the first power-of-two range are exact."""
+        histogram = Histogram()
+        for value in range(1, 11):
+            histogram.record(value)
+
+        assert histogram.percentile(0.5) == 5
+        assert histogram.percentile(1.0) == 10
+        assert histogram.count == 10
+        assert histogram.total == 55
+
+    def test_relative_error_is_bounded(self):
+        """Test large values are bucketed within the precision bound."""
+        histogram = Histogram()
+        for value in range(1_000, 1_000_000, 1_000):
+            histogram.record(value)
+
+        for quantile in (0.5, 0.9, 0.99):
+            expected = quantile * 1_000_000
+            assert abs(histogram.percentile(quantile) - expected) / expected < 0.07
+        assert histogram.percentile(1.0) == histogram.max == 999_000
+
+    def test_record_count(self):
+        """Test recording a value several times at once."""
+        histogram = Histogram()
+        histogram.record(100, count=3)
+
+        assert histogram.count == 3
+        assert histogram.total == 300
+
+
+class TestPipeMetrics:
+    """Test cases for per-node pipe metrics."""
+
+    def setup_method(self):
+        """Set up an instrumented branching pipe for each test."""
+        self.add_one = Worker(add_one, data_type=DigitalData)
+        self.pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(
+                lambda d: d.value > 0,
+                Worker(multiply_by_two, data_type=DigitalData).cfg(),
+            )
+            .on(
+                lambda d: d.value > 5,
+                Worker(add_value, data_type=DigitalData).cfg(value=1),
+            )
+            .end_branch()
+            .then(self.add_one.cfg())
+            .enable_metrics()
+        )
+
+    def test_disabled_by_default(self):
+        """Test plans are not instrumented unless metrics are enabled."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.add_one.cfg())
+
+        assert pipe.compile().metrics is None
+        assert pipe.compile().calls == (add_one,)
+        with pytest.raises(ValueError, match="Metrics are not enabled"):
+            pipe.stats()
+
+    def test_node_and_condition_stats(self):
+        """Test calls, latencies and condition hit rates are recorded."""
+        for value in (-5, 1, 10):
+            self.pipe.execute(DigitalData(value))
+
+        stats = self.pipe.stats()
+        nodes = {node["node"]: node for node in stats["nodes"]}
+        assert nodes["0:add_one"]["calls"] == 3
+        assert nodes["1:multiply_by_two"]["calls"] == 2
+        assert nodes["2:add_value"]["calls"] == 1
+        assert nodes["3:add_one"]["calls"] == 3
+        assert nodes["0:add_one"]["errors"] == 0
+        assert (
+            0 < nodes["0:add_one"]["p50_seconds"] <= nodes["0:add_one"]["max_seconds"]
+        )
+
+        conditions = {c["target"]: c for c in stats["conditions"]}
+        assert conditions["1:multiply_by_two"]["hit_rate"] == pytest.approx(2 / 3)
+        assert conditions["2:add_value"]["hits"] == 1
+        assert conditions["2:add_value"]["evaluations"] == 3
+
+    def test_errors_are_counted(self):
+        """Test failing calls are counted as errors."""
+
+        def fail(data: DigitalData) -> DigitalData:
+            raise ValueError("Intentional Failure")
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(Worker(fail, data_type=DigitalData).cfg())
+            .enable_metrics()
+        )
+
+        with pytest.raises(RuntimeError):
+            pipe.execute(DigitalData(1))
+        with pytest.raises(RuntimeError):
+            pipe.execute_many([DigitalData(1)])
+        with pytest.raises(RuntimeError):
+            asyncio.run(pipe.aexecute(DigitalData(1)))
+
+        node = pipe.stats()["nodes"][0]
+        assert node["calls"] == node["errors"] == 3
+
+    def test_batch_and_async_stats(self):
+        """Test batched and async runs are recorded."""
+        self.pipe.execute_many([DigitalData(1), DigitalData(2)])
+        asyncio.run(self.pipe.aexecute(DigitalData(1)))
+
+        node = self.pipe.stats()["nodes"][0]
+        assert node["calls"] == 3
+
+    def test_condition_never_evaluated(self):
+        """Test an unused condition reports a zero hit rate."""
+        stats = self.pipe.stats()
+
+        assert stats["conditions"][0]["hit_rate"] == 0.0
+
+    def test_to_prometheus(self):
+        """Test exporting metrics in the Prometheus text format."""
+        self.pipe.execute(DigitalData(1))
+        text = self.pipe.metrics().to_prometheus()
+
+        assert 'sweetshop_node_calls_total{node="0:add_one",worker="add_one"} 1' in text
+        assert (
+            'sweetshop_node_latency_seconds{node="0:add_one",worker="add_one",'
+            'quantile="0.99"}' in text
+        )
+        assert (
+            'sweetshop_condition_hits_total{source="0:add_one",'
+            'target="1:multiply_by_two"} 1' in text
+        )
+        assert text.endswith("\n")
+
+    def test_disable_metrics(self):
+        """Test metrics can be turned off again."""
+        self.pipe.enable_metrics(False)
+
+        assert self.pipe.compile().metrics is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,9 +1,13 @@
 import pytest
 
-from sweetshop import Node, Worker
+from sweetshop import Case, Node, Worker
 from tests.common.digital_data import DigitalData, add_one, add_value, initial_data
 
 
+def magnitude(data: DigitalData) -> float:
+    return abs(data.value)
+
+
 class TestNode:
     """Test cases for Node class."""
 
@@ -16,6 +20,9 @@ class TestNode:
         assert node.config == {}
         assert node.next_nodes == []
         assert node.condition is None
+        assert node.merge is None
+        assert node.fallback is None
+        assert node.routing is None
 
     def test_node_creation_with_config(self):
         """Test creating node with configuration."""
@@ -84,5 +91,16 @@ class TestNode:
         assert repr_str == expected_repr
 
 
+class TestCase:
+    """Test cases for Case class."""
+
+    def test_case_matches_key(self):
+        """Test a case matches data whose key equals its value."""
+        case = Case(magnitude, 2)
+        assert case(DigitalData(-2))
+        assert not case(DigitalData(3))
+        assert repr(case) == f"Case(key={magnitude!r}, value=2)"
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,376 @@
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sweetshop import (
+    LRU,
+    DiskCache,
+    NodeExecutionError,
+    Pipe,
+    Worker,
+    describe,
+    optimize,
+)
+from sweetshop.optimize import constant_condition
+from tests.common.digital_data import DigitalData, add_one, add_value, multiply_by_two
+
+
+def is_positive(data: DigitalData) -> bool:
+    return data.value > 0
+
+
+def always(data: DigitalData) -> bool:
+    """Constant condition with a docstring."""
+    return True
+
+
+class TestOptimize:
+    """Test cases for the pipe graph optimizer."""
+
+    def setup_method(self):
+        """Set up workers for each test."""
+        self.add_one = Worker(add_one, data_type=DigitalData)
+        self.add_value = Worker(add_value, data_type=DigitalData)
+        self.multiply_by_two = Worker(multiply_by_two, data_type=DigitalData)
+
+    def assert_same_results(self, pipe: Pipe, optimized: Pipe) -> None:
+        """Check both pipes return the same final results over some inputs."""
+        for value in (-20, -1, 0, 1, 7, 50):
+            data = DigitalData(value)
+            expected = [result for _, result in pipe.execute_all(data)]
+            assert [result for _, result in optimized.execute_all(data)] == expected
+
+    def test_fuse_linear_chain(self):
+        """Test an unbranched chain becomes a single node."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_value.cfg(value=5))
+            .then(self.multiply_by_two.cfg())
+            .then(self.add_one.cfg())
+        )
+        optimization = optimize(pipe)
+
+        assert optimization.fused == 3
+        assert optimize(pipe, dedupe=False).after == optimization.after
+        assert optimization.after == "0: add_value(value=5)+multiply_by_two+add_one"
+        assert len(optimization.pipe.compile()) == 1
+        assert len(pipe.compile()) == 3
+        self.assert_same_results(pipe, optimization.pipe)
+
+    def test_fuse_around_branches(self):
+        """Test chains inside and between branches are fused, joins are kept."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .then(self.add_one.cfg())
+            .branch()
+            .on(is_positive, self.multiply_by_two.cfg())
+            .then(self.add_one.cfg())
+            .on(lambda d: d.value < -5, self.add_value.cfg(value=3))
+            .end_branch()
+            .then(self.add_one.cfg())
+            .then(self.multiply_by_two.cfg())
+        )
+        optimization = optimize(pipe)
+
+        assert optimization.after.splitlines() == [
+            "0: add_one+add_one -> 1 if is_positive, 2 if <lambda> else 3",
+            "1: multiply_by_two+add_one -> 3",
+            "2: add_value(value=3) -> 3",
+            "3: add_one+multiply_by_two merge=first_result",
+        ]
+        self.assert_same_results(pipe, optimization.pipe)
+
+    def test_prune_constant_conditions(self):
+        """Test constant false branches go and constant true ones are unguarded."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: False, self.multiply_by_two.cfg())
+            .on(always, self.add_value.cfg(value=3))
+            .end_branch()
+            .then(self.add_one.cfg())
+        )
+        optimization = optimize(pipe, fuse=False)
+
+        assert optimization.pruned == 1
+        assert optimization.after.splitlines() == [
+            "0: add_one -> 1 else 2",
+            "1: add_value(value=3) -> 2",
+            "2: add_one merge=first_result",
+        ]
+        self.assert_same_results(pipe, optimization.pipe)
+        # The fallback keeps the join reachable from two nodes
+        assert optimize(pipe).fused == 0
+
+    def test_prune_every_branch(self):
+        """Test a join only reached as fallback stays once its branches go."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: False, self.multiply_by_two.cfg())
+            .end_branch()
+            .then(self.add_value.cfg(value=100))
+        )
+        optimization = optimize(pipe, fuse=False)
+
+        assert optimization.after.splitlines() == [
+            "0: add_one -> 1",
+            "1: add_value(value=100) merge=first_result",
+        ]
+        assert optimization.pipe.execute(DigitalData(1)) == DigitalData(102)
+        self.assert_same_results(pipe, optimization.pipe)
+        assert optimize(pipe).pipe.execute(DigitalData(1)) == DigitalData(102)
+
+    def test_prune_exclusive_branches(self):
+        """Test branches after an unconditional exclusive branch are dropped."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch(exclusive=True)
+            .on(is_positive, self.multiply_by_two.cfg())
+            .on(lambda d: 1, self.add_value.cfg(value=3))
+            .on(is_positive, self.add_value.cfg(value=4))
+            .end_branch()
+        )
+        optimization = optimize(pipe)
+
+        assert optimization.pruned == 1
+        assert "(first)" in optimization.after
+        self.assert_same_results(pipe, optimization.pipe)
+
+        single = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch(exclusive=True)
+            .on(always, self.add_value.cfg(value=3))
+            .on(is_positive, self.add_value.cfg(value=4))
+            .end_branch()
+        )
+        optimization = optimize(single)
+        assert optimization.pruned == 1
+        assert optimization.after == "0: add_one+add_value(value=3)"
+        self.assert_same_results(single, optimization.pipe)
+
+    def test_dedupe_siblings(self):
+        """Test siblings running the same worker and config run once."""
+        calls = []
+
+        def count(data: DigitalData) -> DigitalData:
+            calls.append(data.value)
+            return DigitalData(data.value * 10)
+
+        counted = Worker(count, data_type=DigitalData)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(always, counted.cfg())
+            .then(self.add_one.cfg())
+            .on(always, counted.cfg())
+            .then(self.multiply_by_two.cfg())
+            .end_branch()
+        )
+        optimization = optimize(pipe, prune=False, fuse=False)
+
+        assert optimization.deduplicated == 1
+        assert [r for _, r in optimization.pipe.execute_all(DigitalData(0))] == [
+            DigitalData(11),
+            DigitalData(20),
+        ]
+        assert calls == [1]
+        self.assert_same_results(pipe, optimization.pipe)
+
+    def test_dedupe_keeps_join_order(self):
+        """Test twins split by another branch stay apart for ordered merges."""
+        counted = Worker(lambda d: d, name="counted", data_type=DigitalData)
+
+        def digits(items: list[DigitalData]) -> DigitalData:
+            return DigitalData(sum(d.value * 10**i for i, d in enumerate(items)))
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(always, counted.cfg())
+            .then(self.add_value.cfg(value=4))
+            .on(always, self.add_value.cfg(value=6))
+            .on(always, counted.cfg())
+            .then(self.add_value.cfg(value=4))
+            .end_branch(merge=digits)
+            .then(self.add_one.cfg())
+        )
+        optimization = optimize(pipe, prune=False, fuse=False)
+
+        assert optimization.deduplicated == 0
+        assert optimization.pipe.execute(DigitalData(0)) == DigitalData(576)
+        self.assert_same_results(pipe, optimization.pipe)
+
+    def test_dedupe_skips_leaves_and_shared_targets(self):
+        """Test siblings whose merge would change the results are kept."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(always, self.add_one.cfg())
+            .on(always, self.add_one.cfg())
+            .end_branch()
+        )
+        assert optimize(pipe).deduplicated == 0
+
+        node = self.add_one.cfg()
+        first, second = self.multiply_by_two.cfg(), self.multiply_by_two.cfg()
+        pipe = Pipe(data_type=DigitalData).start_with(node)
+        node.add_next(first)
+        node.add_next(second)
+        join = self.add_one.cfg()
+        join.merge = lambda items: DigitalData(sum(d.value for d in items))
+        first.add_next(join)
+        second.add_next(join)
+        pipe.nodes += [first, second, join]
+        assert optimize(pipe).deduplicated == 0
+        self.assert_same_results(pipe, optimize(pipe).pipe)
+
+    def test_plain_nodes_only_are_fused(self):
+        """Test cached and timed nodes keep their own dispatch."""
+        cached = Worker(add_one, data_type=DigitalData, cache=LRU())
+        timed = Worker(add_one, data_type=DigitalData, timeout=5)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .then(cached.cfg())
+            .then(timed.cfg())
+            .then(self.add_one.cfg())
+        )
+        assert optimize(pipe).fused == 0
+
+    def test_fused_cache_follows_versions(self, tmp_path):
+        """Test cached fused results are dropped when a member's version changes."""
+
+        def build(step: Callable, version: int) -> Pipe:
+            worker = Worker(step, name="step", data_type=DigitalData, version=version)
+            return (
+                Pipe(data_type=DigitalData)
+                .start_with(self.add_one.cfg())
+                .then(worker.cfg())
+                .cache_results(DiskCache(tmp_path / "results.db"))
+            )
+
+        old = build(lambda data: add_value(data, 10), version=1)
+        new = build(lambda data: add_value(data, 100), version=2)
+        assert optimize(old).pipe.execute(DigitalData(0)) == DigitalData(11)
+        assert optimize(new).pipe.execute(DigitalData(0)) == DigitalData(101)
+        assert optimize(new).fused == 2
+
+    def test_limited_workers_are_not_fused(self):
+        """Test an optimized pipe still bounds the calls of a limited worker."""
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def track(data: DigitalData) -> DigitalData:
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.005)
+            with lock:
+                running[0] -= 1
+            return data
+
+        limited = Worker(track, data_type=DigitalData, max_concurrency=1)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .then(limited.cfg())
+            .then(self.add_one.cfg())
+        )
+        optimized = optimize(pipe)
+        assert optimized.fused == 0
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(optimized.pipe.execute, map(DigitalData, range(8))))
+
+        assert results == [DigitalData(value + 2) for value in range(8)]
+        assert peak[0] == 1
+
+    def test_fused_errors_name_original_node(self):
+        """Test failures and type errors inside a fused chain keep their node."""
+
+        def fail(data: DigitalData) -> DigitalData:
+            raise ValueError("boom")
+
+        failing = Worker(fail, data_type=DigitalData).cfg()
+        pipe = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).then(failing)
+        with pytest.raises(NodeExecutionError, match="boom") as info:
+            optimize(pipe).pipe.execute(DigitalData(0))
+        error = info.value
+        assert isinstance(error, NodeExecutionError)
+        assert error.node.worker is failing.worker
+        with pytest.raises(NodeExecutionError, match="boom") as info:
+            optimize(pipe).pipe.execute_many([DigitalData(0)])
+        error = info.value
+        assert isinstance(error, NodeExecutionError)
+        assert error.node.worker is failing.worker
+        assert type(error.cause) is ValueError
+
+        # Returns an int, which only the per-node type check catches
+        untyped = Worker(lambda d: 0, name="zero", data_type=DigitalData)
+        next_node = self.add_one.cfg()
+        pipe = Pipe(data_type=DigitalData).start_with(untyped.cfg()).then(next_node)
+        with pytest.raises(NodeExecutionError, match="Expected first argument") as info:
+            optimize(pipe).pipe.execute(DigitalData(0))
+        error = info.value
+        assert isinstance(error, NodeExecutionError)
+        assert error.node.worker is next_node.worker
+        with pytest.raises(NodeExecutionError, match="'int' object has no attribute"):
+            optimize(pipe.trust()).pipe.execute(DigitalData(0))
+
+    def test_optimized_pipe_extends(self):
+        """Test the optimized pipe keeps settings and can be extended."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .then(self.add_one.cfg())
+            .enable_metrics()
+            .trust()
+        )
+        optimized = optimize(pipe).pipe.then(self.multiply_by_two.cfg())
+
+        assert optimized.trusted and optimized.metrics_enabled
+        assert optimized.execute(DigitalData(0)) == DigitalData(4)
+        with pytest.raises(ValueError, match="Pipe has no start node"):
+            optimize(Pipe(data_type=DigitalData))
+
+    def test_describe(self):
+        """Test describe shows conditions, routing and fallbacks."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .switch(abs)
+            .case(1, self.add_value.cfg(value=1))
+            .end_branch()
+            .then(self.add_one.cfg())
+        )
+        assert describe(pipe).splitlines() == [
+            "0: add_one -> 1 if abs == 1 (switch) else 2",
+            "1: add_value(value=1) -> 2",
+            "2: add_one merge=first_result",
+        ]
+        optimization = optimize(pipe)
+        assert str(optimization).startswith(f"before:\n{describe(pipe)}\nafter:\n")
+        assert repr(optimization) == "Optimization(pruned=0, deduplicated=0, fused=0)"
+
+    def test_constant_condition(self):
+        """Test only conditions returning a constant are recognised."""
+        assert constant_condition(lambda d: True) is True
+        assert constant_condition(lambda d: None) is False
+        assert constant_condition(always) is True
+        assert constant_condition(is_positive) is None
+        assert constant_condition(abs) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,6 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from sweetshop import Pipe, Worker, worker_registry
+from sweetshop import Pipe, Worker, pipe_registry, worker_registry
 from tests.common.digital_data import DigitalData, add_one, add_value, multiply_by_two
 
 
@@ -29,6 +31,8 @@ class TestPipe:
         assert pipe.current_node is None
         assert pipe.branch_node is None
         assert pipe.branch_end_nodes == []
+        assert pipe.branch_join is None
+        assert pipe.nodes == []
 
     def test_pipe_start_with(self):
         """Test setting start node."""
@@ -71,6 +75,40 @@ class TestPipe:
         result = pipe.execute(DigitalData(5))
         assert result == DigitalData(11)  # (5 + 1) + 5 = 11
 
+    def test_pipe_execute_with_executor(self):
+        """Test executing pipe with branches on a thread pool."""
+        pipe = Pipe(data_type=DigitalData)
+        (
+            pipe.start_with(worker_registry.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value > 0, worker_registry.add_value.cfg(value=10))
+            .on(lambda d: d.value < 0, worker_registry.add_value.cfg(value=-10))
+            .end_branch()
+            .then(worker_registry.multiply_by_two.cfg())
+        )
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = pipe.execute(DigitalData(5), executor=executor)
+        assert result == DigitalData(32)
+
+    def test_pipe_execute_many(self):
+        """Test executing pipe over a batch of data."""
+        pipe = Pipe(data_type=DigitalData)
+        pipe.start_with(worker_registry.add_one.cfg()).then(
+            worker_registry.add_value.cfg(value=5)
+        )
+
+        results = pipe.execute_many([DigitalData(5), DigitalData(0)])
+        assert results == [DigitalData(11), DigitalData(6)]
+
+    def test_pipe_stream(self):
+        """Test streaming data through a pipe."""
+        pipe = Pipe(data_type=DigitalData)
+        pipe.start_with(worker_registry.add_one.cfg())
+
+        results = pipe.stream(DigitalData(v) for v in range(3))
+        assert list(results) == [DigitalData(1), DigitalData(2), DigitalData(3)]
+
     def test_pipe_execute_no_start_node(self):
         """Test executing pipe with no start node raises error."""
         pipe = Pipe(data_type=DigitalData)
@@ -107,20 +145,35 @@ class TestPipe:
         result = pipe.execute(DigitalData(5))
         assert result == DigitalData(17)  # (5 + 1) * 2 + 5 = 17
 
-    # TODO: fix this test
-    # def test_pipe_branch_condition_false(self):
-    #     """Test branching when condition is false."""
-    #     pipe = Pipe(data_type=DigitalData)
-    #     (
-    #         pipe.start_with(worker_registry.add_one.cfg())
-    #         .branch()
-    #         .on(lambda d: d.value < 0, worker_registry.multiply_by_two.cfg())
-    #         .end_branch()
-    #         .then(worker_registry.add_value.cfg(value=5))
-    #     )
-
-    #     result = pipe.execute(DigitalData(5))
-    #     assert result == DigitalData(11)  # (5 + 1) + 5 = 11
+    def test_pipe_branch_condition_false(self):
+        """Test branching when condition is false."""
+        pipe = Pipe(data_type=DigitalData)
+        (
+            pipe.start_with(worker_registry.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value < 0, worker_registry.multiply_by_two.cfg())
+            .end_branch()
+            .then(worker_registry.add_value.cfg(value=5))
+        )
+
+        result = pipe.execute(DigitalData(5))
+        assert result == DigitalData(11)  # (5 + 1) + 5 = 11
+
+    def test_pipe_branch_join_runs_once(self):
+        """Test the node after end_branch() runs once for all branches."""
+        pipe = Pipe(data_type=DigitalData)
+        (
+            pipe.start_with(worker_registry.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value > 0, worker_registry.add_value.cfg(value=10))
+            .on(lambda d: d.value > 0, worker_registry.multiply_by_two.cfg())
+            .end_branch(
+                merge=lambda results: DigitalData(sum(r.value for r in results))
+            )
+            .then(worker_registry.add_one.cfg())
+        )
+
+        assert pipe.compile().run(DigitalData(5)) == [DigitalData(29)]  # 16 + 12 + 1
 
     def test_pipe_end_branch_immediately(self):
         """Test ending branch immediately after starting it."""
@@ -167,6 +220,46 @@ class TestPipe:
         with pytest.raises(ValueError, match=r"Must call branch\(\) before on\(\)"):
             pipe.on(lambda d: d.value > 0, worker_registry.add_one.cfg())
 
+    def test_pipe_execute_all(self):
+        """Test every leaf result is returned, yielded one by one if asked."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.add_one.cfg())
+            .branch()
+            .on(lambda d: True, worker_registry.add_one.cfg())
+            .on(lambda d: d.value > 5, worker_registry.add_one.cfg())
+            .on(lambda d: True, worker_registry.multiply_by_two.cfg())
+            .end_branch()
+        )
+
+        assert [result for _, result in pipe.execute_all(DigitalData(1))] == [
+            DigitalData(3),
+            DigitalData(4),
+        ]
+        leaves = [node for node, _ in pipe.iter_results(DigitalData(10))]
+        assert leaves == pipe.nodes[1:]
+        assert pipe.execute(DigitalData(1)) == DigitalData(3)
+
+    def test_pipe_switch_misuse(self):
+        """Test switch() and case() validate the open branch."""
+        pipe = Pipe(data_type=DigitalData)
+        with pytest.raises(ValueError, match="No current node to connect to"):
+            pipe.switch(lambda d: d.value)
+        with pytest.raises(ValueError, match="No current node to connect to"):
+            pipe.branch(exclusive=True).on(
+                lambda d: True, worker_registry.add_one.cfg()
+            )
+
+        pipe.start_with(worker_registry.add_one.cfg()).branch()
+        with pytest.raises(ValueError, match=r"Must call switch\(\) before case\(\)"):
+            pipe.case(1, worker_registry.add_one.cfg())
+
+        pipe.switch(lambda d: d.value)
+        with pytest.raises(ValueError, match=r"Use case\(\) to add branches"):
+            pipe.on(lambda d: True, worker_registry.add_one.cfg())
+        with pytest.raises(ValueError, match=r"at least one case\(\)"):
+            pipe.end_branch()
+
     def test_pipe_end_branch_without_current_node(self):
         """Test end_branch() without current node raises error."""
         pipe = Pipe(data_type=DigitalData)
@@ -182,6 +275,131 @@ class TestPipe:
         with pytest.raises(ValueError, match="No active branch to end"):
             pipe.end_branch()
 
+    def test_pipe_compile_cached(self):
+        """Test compile() reuses the plan until the graph changes."""
+        pipe = Pipe(data_type=DigitalData).start_with(worker_registry.add_one.cfg())
+
+        plan = pipe.compile()
+        assert pipe.compile() is plan
+
+        pipe.then(worker_registry.multiply_by_two.cfg())
+        assert pipe.compile() is not plan
+        assert pipe.execute(DigitalData(5)) == DigitalData(12)
+
+    def test_pipe_compile_open_branch(self):
+        """Test compiling a pipe with an unclosed branch raises error."""
+        pipe = Pipe(data_type=DigitalData)
+        (
+            pipe.start_with(worker_registry.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value > 0, worker_registry.multiply_by_two.cfg())
+        )
+
+        with pytest.raises(ValueError, match=r"closed with end_branch\(\)"):
+            pipe.compile()
+
+    def test_pipe_compile_unreachable(self):
+        """Test compiling a pipe whose first chain was replaced raises error."""
+        pipe = Pipe(data_type=DigitalData)
+        (
+            pipe.start_with(worker_registry.add_one.cfg())
+            .then(worker_registry.multiply_by_two.cfg())
+            .start_with(worker_registry.add_one.cfg())
+        )
+
+        with pytest.raises(ValueError, match="Unreachable nodes in pipe"):
+            pipe.compile()
+
+    def test_pipe_compile_incompatible_worker(self):
+        """Test compiling fails when a worker cannot take the pipe's data."""
+
+        class OtherData(DigitalData):
+            pass
+
+        worker = Worker(add_one, data_type=OtherData)
+        pipe = Pipe(data_type=DigitalData).start_with(worker.cfg())
+
+        with pytest.raises(TypeError, match="expects OtherData"):
+            pipe.compile()
+        assert Pipe(data_type=OtherData).start_with(
+            worker_registry.add_one.cfg()
+        ).execute(OtherData(1)) == DigitalData(2)
+
+    def test_pipe_trusted(self):
+        """Test trusted pipes skip per-call type checks."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.add_one.cfg())
+            .then(worker_registry.multiply_by_two.cfg())
+        )
+        with pytest.raises(RuntimeError, match="got str"):
+            pipe.execute("1")
+
+        assert pipe.trust() is pipe
+        assert pipe.compile().trusted
+        assert pipe.execute(DigitalData(1)) == DigitalData(4)
+        with pytest.raises(RuntimeError, match="add_one.*unsupported"):
+            pipe.execute(DigitalData(None))  # ty: ignore[invalid-argument-type]
+
+        pipe.branch().on(lambda d: True, worker_registry.add_one.cfg()).end_branch()
+        assert pipe.execute(DigitalData(1)) == DigitalData(5)
+        assert not pipe.trust(False).compile().trusted
+
+    def test_pipe_sub_pipe(self):
+        """Test sub-pipes are inlined wherever a node is accepted."""
+        component = (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value > 5, worker_registry.multiply_by_two.cfg())
+            .end_branch()
+            .then(worker_registry.add_value.cfg(value=10))
+        )
+        pipe_registry.register("component", component)
+        try:
+            pipe = (
+                Pipe(data_type=DigitalData)
+                .start_with(component)
+                .then(pipe_registry.component)
+                .branch()
+                .on(lambda d: d.value > 100, component)
+                .on(lambda d: True, worker_registry.add_one.cfg())
+                .end_branch()
+                .then(worker_registry.add_one.cfg())
+            )
+        finally:
+            pipe_registry.clear()
+
+        assert len(pipe.nodes) == 3 * len(component.nodes) + 2
+        assert not set(pipe.nodes) & set(component.nodes)
+        # 1 -> 12 -> 36 -> 37 and 30 -> 72 -> 156 -> 324 on the first branch
+        assert pipe.execute(DigitalData(1)) == DigitalData(38)
+        assert pipe.execute(DigitalData(30)) == DigitalData(325)
+        assert [result for _, result in pipe.execute_all(DigitalData(-20))] == [
+            DigitalData(4)
+        ]
+        # The original pipe is unchanged and keeps working on its own
+        assert component.execute(DigitalData(1)) == DigitalData(12)
+        assert len(component.compile()) == 3
+
+    def test_pipe_sub_pipe_invalid(self):
+        """Test unfinished sub-pipes are rejected."""
+        pipe = Pipe(data_type=DigitalData)
+        with pytest.raises(ValueError, match="Sub-pipe has no start node"):
+            pipe.start_with(Pipe(data_type=DigitalData))
+
+        open_branch = (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.add_one.cfg())
+            .branch()
+            .on(lambda d: True, worker_registry.add_one.cfg())
+        )
+        with pytest.raises(ValueError, match="Sub-pipe branch must be joined"):
+            pipe.start_with(open_branch)
+        with pytest.raises(ValueError, match="Sub-pipe branch must be joined"):
+            pipe.start_with(open_branch.end_branch())
+        assert pipe.nodes == []
+
     def test_pipe_repr(self):
         """Test pipe string representation."""
         pipe = Pipe(data_type=DigitalData)
@@ -1,6 +1,8 @@
+import sys
+
 import pytest
 
-from sweetshop import Pipe, PipeRegistry, Worker, worker_registry
+from sweetshop import Pipe, PipeRegistry, Worker, pipe_registry, worker_registry
 from tests.common.digital_data import DigitalData, add_one, add_value, multiply_by_two
 
 
@@ -53,6 +55,94 @@ class TestPipeRegistry:
         pipe = self.registry.get("custom_pipe")
         assert isinstance(pipe, Pipe)
 
+    def test_register_pipe_compiled(self):
+        """Test registering a pipe compiles and holds its plan."""
+
+        @self.registry.register_pipe(compile=True)
+        def test_pipe():
+            pipe = Pipe(data_type=DigitalData)
+            pipe.start_with(worker_registry.add_one.cfg())
+            return pipe
+
+        plan = self.registry.get_plan("test_pipe")
+        assert plan is self.registry.test_pipe.compile()
+        assert plan.execute(DigitalData(1)) == DigitalData(2)
+
+    def test_register_pipe_compile_invalid(self):
+        """Test registering an invalid pipe with compile raises error."""
+        with pytest.raises(ValueError, match="Pipe has no start node"):
+
+            @self.registry.register_pipe(compile=True)
+            def test_pipe():
+                return Pipe(data_type=DigitalData)
+
+        assert not self.registry.exists("test_pipe")
+
+    def test_register_pipe_is_lazy(self):
+        """Test the builder runs on first access, not at registration."""
+        builds = []
+
+        @self.registry.register_pipe()
+        def test_pipe():
+            builds.append(1)
+            return Pipe(data_type=DigitalData)
+
+        assert builds == []
+        assert self.registry.test_pipe is self.registry.get("test_pipe")
+        assert builds == [1]
+
+    def test_register_pipe_duplicate(self):
+        """Test registering a pipe name twice raises KeyError."""
+
+        @self.registry.register_pipe(name="test_pipe")
+        def first():
+            return Pipe(data_type=DigitalData)
+
+        with pytest.raises(KeyError, match="'test_pipe' already registered"):
+
+            @self.registry.register_pipe(name="test_pipe")
+            def second():
+                return Pipe(data_type=DigitalData)
+
+        with pytest.raises(KeyError, match="'test_pipe' already registered"):
+
+            @self.registry.register_pipe(name="test_pipe", compile=True)
+            def third():
+                return Pipe(data_type=DigitalData).start_with(
+                    worker_registry.add_one.cfg()
+                )
+
+        assert isinstance(self.registry.test_pipe, Pipe)
+
+    def test_declared_pipes(self):
+        """Test pipes declared by module, builder or instance."""
+        sys.modules.pop("tests.common.lazy_declarations", None)
+        pipe_registry.load_manifest(
+            {
+                "lazy_pipe": "tests.common.lazy_declarations",
+                "built_pipe": "tests.common.lazy_declarations:build_pipe",
+            }
+        )
+        try:
+            assert pipe_registry.lazy_pipe.execute(DigitalData(2)) == DigitalData(4)
+            assert pipe_registry.built_pipe.execute(DigitalData(2)) == DigitalData(12)
+
+            self.registry.declare(
+                "instance", "tests.common.lazy_declarations:BUILT_PIPE"
+            )
+            instance = self.registry.get("instance")
+            from tests.common.lazy_declarations import BUILT_PIPE
+
+            assert instance is BUILT_PIPE
+        finally:
+            pipe_registry.clear()
+
+    def test_declared_pipe_not_a_pipe(self):
+        """Test a builder not returning a Pipe raises TypeError."""
+        self.registry.declare("bad", "tests.common.digital_data:initial_data")
+        with pytest.raises(TypeError, match="Expected a Pipe, got DigitalData"):
+            self.registry.get("bad")
+
     def test_getattr_access(self):
         """Test accessing pipes via attribute access."""
 
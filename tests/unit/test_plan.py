@@ -0,0 +1,1123 @@
+import asyncio
+import gc
+import threading
+import weakref
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+import pytest
+
+from sweetshop import (
+    LRU,
+    BaseData,
+    DeadlineExceededError,
+    ExecutionPlan,
+    Node,
+    NodeExecutionError,
+    NodeTimeoutError,
+    Pipe,
+    Worker,
+)
+from sweetshop.plan import _SelectivityOrder, topological_order
+from sweetshop.timeouts import AsyncHedge, Hedge
+from tests.common.digital_data import DigitalData, add_one, add_value, multiply_by_two
+
+
+class InlineExecutor(Executor):
+    """Executor running each submitted call right away in the caller."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class TestExecutionPlan:
+    """Test cases for ExecutionPlan class."""
+
+    def setup_method(self):
+        """Set up workers for each test."""
+        self.add_one = Worker(add_one, data_type=DigitalData)
+        self.add_value = Worker(add_value, data_type=DigitalData)
+        self.multiply_by_two = Worker(multiply_by_two, data_type=DigitalData)
+
+    def test_linear_plan(self):
+        """Test compiling a linear chain."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .then(self.add_value.cfg(value=5))
+            .then(self.multiply_by_two.cfg())
+        )
+        plan = pipe.compile()
+
+        assert isinstance(plan, ExecutionPlan)
+        assert plan.linear
+        assert len(plan) == 3
+        assert plan.successors == (((1, None),), ((2, None),), ())
+        assert plan.execute(DigitalData(1)) == DigitalData(14)
+
+    def test_branch_plan(self):
+        """Test compiling a branching graph."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value > 0, self.multiply_by_two.cfg())
+            .on(lambda d: d.value > 0, self.add_value.cfg(value=10))
+            .end_branch()
+            .then(self.add_one.cfg())
+        )
+        plan = pipe.compile()
+
+        assert not plan.linear
+        assert plan.run(DigitalData(1)) == [DigitalData(5)]
+        assert plan.run(DigitalData(-5)) == [DigitalData(-3)]
+
+    def test_join_merges_branches(self):
+        """Test a join runs once on the merged outputs of all branches."""
+        calls = []
+
+        def record(data: DigitalData) -> DigitalData:
+            calls.append(data.value)
+            return data
+
+        def combine(results: list[DigitalData]) -> DigitalData:
+            return DigitalData(sum(r.value * 10**i for i, r in enumerate(results)))
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value > 0, self.add_one.cfg())
+            .then(self.add_one.cfg())
+            .on(lambda d: d.value > 1, self.multiply_by_two.cfg())
+            .end_branch(merge=combine)
+            .then(Worker(record, data_type=DigitalData).cfg())
+        )
+        plan = pipe.compile()
+
+        assert plan.run(DigitalData(1)) == [DigitalData(4 + 4 * 10)]
+        assert plan.run(DigitalData(0)) == [DigitalData(3)]
+        assert plan.run(DigitalData(-5)) == [DigitalData(-4)]
+        assert calls == [44, 3, -4]
+        items = [DigitalData(1), DigitalData(0), DigitalData(-5), DigitalData(-6)]
+        assert plan.run_many(items) == [
+            [DigitalData(44)],
+            [DigitalData(3)],
+            [DigitalData(-4)],
+            [DigitalData(-5)],
+        ]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert plan.run_concurrent(DigitalData(1), executor) == [DigitalData(44)]
+            assert plan.run_concurrent(DigitalData(-5), executor) == [DigitalData(-4)]
+        assert asyncio.run(plan.arun(DigitalData(1))) == [DigitalData(44)]
+        assert asyncio.run(plan.arun(DigitalData(-5))) == [DigitalData(-4)]
+
+    def test_join_merge_failure(self):
+        """Test a failing merge function is wrapped."""
+
+        def fail(results: list[DigitalData]) -> DigitalData:
+            raise ValueError("Intentional Failure")
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: True, self.add_one.cfg())
+            .end_branch(merge=fail)
+            .then(self.add_one.cfg())
+        )
+
+        with pytest.raises(RuntimeError, match=r"Node .* merge failed"):
+            pipe.execute(DigitalData(1))
+
+    def test_run_many(self):
+        """Test batches are routed per item and regrouped per node."""
+        calls = []
+
+        def double_all(items: list[DigitalData]) -> list[DigitalData]:
+            calls.append(len(items))
+            return [DigitalData(item.value * 2) for item in items]
+
+        double_all_worker = Worker(double_all, data_type=DigitalData, batch=True)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value > 0, double_all_worker.cfg())
+            .on(lambda d: d.value > 2, self.add_value.cfg(value=10))
+            .on(lambda d: d.value > 100, self.multiply_by_two.cfg())
+            .end_branch()
+        )
+        plan = pipe.compile()
+
+        results = plan.run_many([DigitalData(-5), DigitalData(1), DigitalData(2)])
+        assert results == [
+            [DigitalData(-4)],
+            [DigitalData(4)],
+            [DigitalData(6), DigitalData(13)],
+        ]
+        assert calls == [2]
+
+    def test_run_many_empty(self):
+        """Test running an empty batch."""
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+
+        assert plan.run_many([]) == []
+
+    def test_run_many_type_check(self):
+        """Test the batch path checks input types."""
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+
+        with pytest.raises(RuntimeError, match="got int"):
+            plan.run_many([DigitalData(1), 2])
+
+    def test_run_many_wrong_batch_size(self):
+        """Test a batch worker returning the wrong number of results."""
+
+        def drop_all(items: list[DigitalData]) -> list[DigitalData]:
+            return []
+
+        worker = Worker(drop_all, data_type=DigitalData, batch=True)
+        plan = Pipe(data_type=DigitalData).start_with(worker.cfg()).compile()
+
+        with pytest.raises(RuntimeError, match="Expected 1 batch results, got 0"):
+            plan.execute_many([DigitalData(1)])
+
+    def test_batch_worker_single_execute(self):
+        """Test a batch worker used by single execution."""
+
+        def add_all(items: list[DigitalData], value: int) -> list[DigitalData]:
+            return [DigitalData(item.value + value) for item in items]
+
+        worker = Worker(add_all, data_type=DigitalData, batch=True)
+        plan = Pipe(data_type=DigitalData).start_with(worker.cfg(value=3)).compile()
+
+        assert plan.execute(DigitalData(1)) == DigitalData(4)
+        assert plan.execute_many(iter([DigitalData(1)])) == [DigitalData(4)]
+
+    def test_stream_is_lazy(self):
+        """Test streaming pulls inputs only as results are consumed."""
+        pulled = []
+
+        def source():
+            for value in range(10):
+                pulled.append(value)
+                yield DigitalData(value)
+
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+        results = plan.stream(source())
+
+        assert pulled == []
+        assert next(results) == DigitalData(1)
+        assert next(results) == DigitalData(2)
+        assert pulled == [0, 1]
+
+    def test_stream_closes_source(self):
+        """Test the source is closed when the consumer stops iterating."""
+        closed = []
+
+        def source():
+            try:
+                for value in range(10):
+                    yield DigitalData(value)
+            finally:
+                closed.append(True)
+
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+        results = plan.stream(source(), batch_size=3)
+
+        assert [next(results) for _ in range(4)] == [
+            DigitalData(v) for v in (1, 2, 3, 4)
+        ]
+        results.close()
+        assert closed == [True]
+
+    def test_stream_batches(self):
+        """Test streaming in batches yields every result in order."""
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+        items = [DigitalData(v) for v in range(5)]
+
+        assert list(plan.stream(items, batch_size=2)) == [
+            DigitalData(v) for v in range(1, 6)
+        ]
+
+    def test_stream_invalid_batch_size(self):
+        """Test streaming with a non-positive batch size raises error."""
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+
+        with pytest.raises(ValueError, match="batch_size must be at least 1"):
+            plan.stream([], batch_size=0)
+
+    def test_run_concurrent_branches(self):
+        """Test matching branches run concurrently and are joined."""
+        barrier = threading.Barrier(2, timeout=1)
+
+        def meet(data: DigitalData, value: float) -> DigitalData:
+            barrier.wait()
+            return DigitalData(data.value + value)
+
+        meet_worker = Worker(meet, data_type=DigitalData)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: True, meet_worker.cfg(value=1))
+            .then(self.multiply_by_two.cfg())
+            .on(lambda d: True, meet_worker.cfg(value=2))
+            .on(lambda d: False, self.multiply_by_two.cfg())
+            .end_branch()
+            .then(self.add_value.cfg(value=10))
+        )
+        plan = pipe.compile()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = plan.run_concurrent(DigitalData(0), executor)
+            assert results == [DigitalData(14)]
+
+    def leaves(self, *branches: Node) -> Pipe:
+        """Build a pipe whose branches each end in their own leaf."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).branch()
+        for node in branches:
+            pipe.on(lambda d: True, node)
+        return pipe.end_branch()
+
+    def test_execute_all(self):
+        """Test every leaf result is returned with its node in plan order."""
+        first, second = self.add_value.cfg(value=10), self.multiply_by_two.cfg()
+        plan = self.leaves(first, second).compile()
+        expected = [(first, DigitalData(11)), (second, DigitalData(2))]
+
+        assert plan.execute_all(DigitalData(0)) == expected
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert plan.execute_all(DigitalData(0), executor) == expected
+
+        linear = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+        assert linear.execute_all(DigitalData(0)) == [(linear.nodes[0], DigitalData(1))]
+
+    def test_iter_results_is_lazy(self):
+        """Test later branches only run once earlier results were consumed."""
+        calls = []
+
+        def record(data: DigitalData, value: float) -> DigitalData:
+            calls.append(value)
+            return DigitalData(data.value + value)
+
+        record_worker = Worker(record, data_type=DigitalData)
+        plan = self.leaves(
+            record_worker.cfg(value=1), record_worker.cfg(value=2)
+        ).compile()
+
+        results = plan.iter_results(DigitalData(0))
+        assert next(results)[1] == DigitalData(2)
+        assert calls == [1]
+        assert next(results)[1] == DigitalData(3)
+        assert calls == [1, 2]
+
+    def test_iter_results_concurrent(self):
+        """Test the first finished branch is yielded while others still run."""
+        released = threading.Event()
+
+        def slow(data: DigitalData) -> DigitalData:
+            assert released.wait(timeout=5)
+            return DigitalData(-1)
+
+        slow_node = Worker(slow, data_type=DigitalData).cfg()
+        fast_node = self.add_value.cfg(value=10)
+        plan = self.leaves(slow_node, fast_node).compile()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = plan.iter_results(DigitalData(0), executor)
+            assert next(results) == (fast_node, DigitalData(11))
+            released.set()
+            assert list(results) == [(slow_node, DigitalData(-1))]
+
+    def test_iter_results_concurrent_chain(self):
+        """Test results of several leaves finishing together are all yielded."""
+        plan = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: True, self.add_one.cfg())
+            .on(lambda d: True, self.add_value.cfg(value=5))
+            .then(self.multiply_by_two.cfg())
+            .end_branch()
+            .compile()
+        )
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = plan.execute_all(DigitalData(0), executor)
+        assert [result for _, result in results] == [DigitalData(2), DigitalData(12)]
+
+    def test_run_concurrent_failure(self):
+        """Test a failing branch surfaces from concurrent execution."""
+
+        def fail(data: DigitalData) -> DigitalData:
+            raise ValueError("Intentional Failure")
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: True, Worker(fail, data_type=DigitalData).cfg())
+            .on(lambda d: True, self.multiply_by_two.cfg())
+            .end_branch()
+        )
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with pytest.raises(RuntimeError, match="Intentional Failure"):
+                pipe.execute(DigitalData(0), executor)
+            with pytest.raises(RuntimeError, match="got int"):
+                pipe.execute(1, executor)
+
+    def test_aexecute_async_workers(self):
+        """Test async workers are awaited and sync workers offloaded."""
+        threads = []
+
+        async def add_later(data: DigitalData, value: float) -> DigitalData:
+            await asyncio.sleep(0)
+            return DigitalData(data.value + value)
+
+        def record_thread(data: DigitalData) -> DigitalData:
+            threads.append(threading.get_ident())
+            return data
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(Worker(add_later, data_type=DigitalData).cfg(value=2))
+            .then(Worker(record_thread, data_type=DigitalData).cfg())
+            .then(self.multiply_by_two.cfg())
+        )
+
+        assert asyncio.run(pipe.aexecute(DigitalData(1))) == DigitalData(6)
+        assert threads and threads[0] != threading.get_ident()
+
+    def test_aexecute_concurrent_branches(self):
+        """Test matching branches are awaited concurrently."""
+        left_started, right_started = asyncio.Event(), asyncio.Event()
+
+        async def left(data: DigitalData) -> DigitalData:
+            left_started.set()
+            await asyncio.wait_for(right_started.wait(), timeout=1)
+            return DigitalData(data.value + 1)
+
+        async def right(data: DigitalData) -> DigitalData:
+            right_started.set()
+            await asyncio.wait_for(left_started.wait(), timeout=1)
+            return DigitalData(data.value + 2)
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: True, Worker(left, data_type=DigitalData).cfg())
+            .on(lambda d: True, Worker(right, data_type=DigitalData).cfg())
+            .on(lambda d: False, self.multiply_by_two.cfg())
+            .end_branch()
+            .then(self.add_value.cfg(value=10))
+        )
+        plan = pipe.compile()
+
+        results = asyncio.run(plan.arun(DigitalData(0)))
+        assert results == [DigitalData(12)]
+
+    def test_aexecute_leaf_order(self):
+        """Test async final results follow plan order."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: True, self.multiply_by_two.cfg())
+            .on(lambda d: True, self.add_value.cfg(value=10))
+            .end_branch()
+        )
+
+        results = asyncio.run(pipe.compile().arun(DigitalData(1)))
+        assert results == [DigitalData(4), DigitalData(12)]
+
+    def test_aexecute_failure(self):
+        """Test async execution wraps worker failures."""
+
+        async def fail(data: DigitalData) -> DigitalData:
+            raise ValueError("Intentional Failure")
+
+        plan = (
+            Pipe(data_type=DigitalData)
+            .start_with(Worker(fail, data_type=DigitalData).cfg())
+            .compile()
+        )
+
+        with pytest.raises(RuntimeError, match="Intentional Failure"):
+            asyncio.run(plan.aexecute(DigitalData(1)))
+        with pytest.raises(RuntimeError, match="got int"):
+            asyncio.run(plan.aexecute(1))
+
+    def test_async_workers_in_sync_execution(self):
+        """Test async and async batch workers run from synchronous execution."""
+
+        async def add_later(data: DigitalData) -> DigitalData:
+            return DigitalData(data.value + 1)
+
+        async def double_all(items: list[DigitalData]) -> list[DigitalData]:
+            return [DigitalData(item.value * 2) for item in items]
+
+        plan = (
+            Pipe(data_type=DigitalData)
+            .start_with(Worker(add_later, data_type=DigitalData).cfg())
+            .then(Worker(double_all, data_type=DigitalData, batch=True).cfg())
+            .compile()
+        )
+
+        assert plan.execute(DigitalData(1)) == DigitalData(4)
+        assert plan.execute_many([DigitalData(1), DigitalData(2)]) == [
+            DigitalData(4),
+            DigitalData(6),
+        ]
+        assert asyncio.run(plan.aexecute(DigitalData(2))) == DigitalData(6)
+
+    def test_topological_order(self):
+        """Test nodes are ordered after all their predecessors."""
+        first, left, right, join = (Node(self.add_one) for _ in range(4))
+        first.add_next(left)
+        first.add_next(right)
+        left.add_next(join)
+        right.add_next(join)
+
+        order = topological_order(first, [first, left, right, join])
+        assert order == [first, left, right, join]
+
+    def test_cycle_detected(self):
+        """Test a cycle in the graph is rejected."""
+        first, second, third = (Node(self.add_one) for _ in range(3))
+        first.add_next(second)
+        second.add_next(third)
+        third.add_next(second)
+
+        with pytest.raises(ValueError, match="Cycle detected"):
+            topological_order(first, [first, second, third])
+
+    def test_cycle_through_start_detected(self):
+        """Test a cycle back to the start node is rejected."""
+        first, second = Node(self.add_one), Node(self.add_one)
+        first.add_next(second)
+        second.add_next(first)
+
+        with pytest.raises(ValueError, match="Cycle detected"):
+            topological_order(first, [first, second])
+
+    def test_unreachable_nodes(self):
+        """Test nodes not reachable from the start are rejected."""
+        first, orphan = Node(self.add_one), Node(self.add_one)
+
+        with pytest.raises(ValueError, match="Unreachable nodes in pipe"):
+            topological_order(first, [first, orphan])
+
+    def test_plan_is_immutable(self):
+        """Test a compiled plan cannot be modified."""
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+
+        with pytest.raises(AttributeError, match="ExecutionPlan is immutable"):
+            plan.linear = False
+
+    def test_plan_type_check(self):
+        """Test the plan checks input types before calling workers."""
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+
+        with pytest.raises(
+            RuntimeError, match="Expected first argument of type DigitalData, got int"
+        ):
+            plan.execute(1)
+
+    def test_branch_plan_type_check(self):
+        """Test the branching path checks input types too."""
+
+        def to_int(data: DigitalData) -> int:
+            return int(data.value)
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(Worker(to_int, data_type=DigitalData).cfg())
+            .branch()
+            .on(lambda d: True, self.add_one.cfg())
+            .end_branch()
+        )
+
+        with pytest.raises(RuntimeError, match="got int"):
+            pipe.execute(DigitalData(1))
+
+    def test_plan_repr(self):
+        """Test plan string representation."""
+        plan = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).compile()
+
+        assert repr(plan) == "ExecutionPlan(nodes=1, linear=True)"
+
+    def test_consumed_inputs_are_released(self):
+        """Test intermediate data is freed once the nodes using it ran."""
+        made = []
+
+        def wrap(data: DigitalData) -> DigitalData:
+            made.append(weakref.ref(data))
+            return DigitalData(data.value + 1)
+
+        def check(data: DigitalData) -> DigitalData:
+            gc.collect()
+            # The output of the first node was only consumed by the second
+            return DigitalData(made[-1]() is None)
+
+        wrapper = Worker(wrap, data_type=DigitalData)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(wrapper.cfg())
+            .then(wrapper.cfg())
+            .then(Worker(check, data_type=DigitalData).cfg())
+            .branch()
+            .on(lambda d: False, self.add_one.cfg())
+            .end_branch()
+        )
+        plan = pipe.compile()
+        assert not plan.linear
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for run in (
+                lambda data: plan.run(data),
+                lambda data: plan.run(data, timeout=5),
+                lambda data: plan.run_concurrent(data, executor),
+                lambda data: asyncio.run(plan.arun(data)),
+            ):
+                made.clear()
+                assert run(DigitalData(0)) == [DigitalData(True)]
+
+
+class TestInplaceWorkers:
+    """Test cases for in-place workers and copy-on-branch."""
+
+    def setup_method(self):
+        """Set up in-place workers for each test."""
+
+        def increment(data: DigitalData, value: float = 1) -> DigitalData:
+            data.value += value
+            return data
+
+        self.increment = Worker(increment, data_type=DigitalData, inplace=True)
+        self.add_value = Worker(add_value, data_type=DigitalData)
+
+    def fork(self, *branches: Node, skipped: Node | None = None) -> Pipe:
+        """Build a pipe sending one item to every given branch."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.add_value.cfg(value=0))
+        pipe.branch()
+        for node in branches:
+            pipe.on(lambda d: True, node)
+        if skipped is not None:
+            pipe.on(lambda d: False, skipped)
+        return pipe.end_branch(merge=list)
+
+    def test_linear_chain_mutates_in_place(self):
+        """Test a linear in-place chain passes one object through."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.increment.cfg())
+        pipe.then(self.increment.cfg(value=2))
+        data = DigitalData(0)
+
+        assert pipe.execute(data) is data
+        assert data == DigitalData(3)
+
+    def test_fan_out_isolates_branches(self):
+        """Test in-place branches each get their own copy of shared data."""
+        plan = self.fork(
+            self.increment.cfg(value=1), self.increment.cfg(value=2)
+        ).compile()
+
+        assert plan.forks[0] == (1, 2)
+        assert plan.run(DigitalData(0)) == [DigitalData(1), DigitalData(2)]
+
+    def test_fan_out_isolates_nested_fields(self):
+        """Test branches mutating nested containers never see each other's."""
+
+        class Tagged(BaseData):
+            def __init__(self, tags: list[str]):
+                self.tags = tags
+
+        def tag(data: Tagged, name: str) -> Tagged:
+            data.tags.append(name)
+            return data
+
+        tagger = Worker(tag, data_type=Tagged, inplace=True)
+        plan = (
+            Pipe(data_type=Tagged)
+            .start_with(Worker(lambda d: d, name="start", data_type=Tagged).cfg())
+            .branch()
+            .on(lambda d: True, tagger.cfg(name="left"))
+            .on(lambda d: True, tagger.cfg(name="right"))
+            .end_branch(merge=list)
+            .compile()
+        )
+
+        left, right = plan.run(Tagged([]))
+        assert (left.tags, right.tags) == (["left"], ["right"])
+
+    def test_fan_out_with_reader(self):
+        """Test a branch reading the data never sees in-place mutations."""
+        plan = self.fork(
+            self.increment.cfg(value=1),
+            self.add_value.cfg(value=10),
+            skipped=self.increment.cfg(value=100),
+        ).compile()
+
+        assert plan.run(DigitalData(0)) == [DigitalData(1), DigitalData(10)]
+        results = plan.run_many([DigitalData(0), DigitalData(5)])
+        assert results == [
+            [DigitalData(1), DigitalData(10)],
+            [DigitalData(6), DigitalData(15)],
+        ]
+
+    def test_single_match_not_copied(self):
+        """Test data taking a single branch is not copied."""
+        copies = []
+
+        class Tracked(DigitalData):
+            def fork(self):
+                copies.append(self.value)
+                return Tracked(self.value)
+
+        plan = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.increment.cfg())
+            .branch()
+            .on(lambda d: d.value > 0, self.increment.cfg(value=1))
+            .on(lambda d: d.value <= 0, self.increment.cfg(value=2))
+            .end_branch()
+            .compile()
+        )
+        data = Tracked(0)
+
+        assert plan.run(data) == [DigitalData(2)]
+        assert plan.run(Tracked(-5)) == [DigitalData(-2)]
+        assert copies == []
+
+    def test_fan_out_concurrent(self):
+        """Test branches are isolated by the concurrent and async runners."""
+        plan = self.fork(
+            self.increment.cfg(value=1), self.increment.cfg(value=2)
+        ).compile()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert plan.run_concurrent(DigitalData(0), executor) == [
+                DigitalData(1),
+                DigitalData(2),
+            ]
+        assert asyncio.run(plan.arun(DigitalData(0))) == [
+            DigitalData(1),
+            DigitalData(2),
+        ]
+
+    def test_fan_out_into_join(self):
+        """Test a join fed directly by a fan-out gets its own tagged copy."""
+        start = self.add_value.cfg(value=0)
+        branch = self.increment.cfg(value=1)
+        join = self.increment.cfg(value=100)
+        start.add_next(branch)
+        start.add_next(join)
+        branch.add_next(join)
+        join.merge = lambda results: DigitalData(sum(r.value for r in results))
+        plan = ExecutionPlan(topological_order(start, [start, branch, join]))
+
+        assert plan.forks[0] == (1, 2)
+        assert plan.run(DigitalData(1)) == [DigitalData(103)]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert plan.run_concurrent(DigitalData(1), executor) == [DigitalData(103)]
+
+    def test_cached_results_isolated(self):
+        """Test in-place nodes cannot mutate values held by a cache."""
+        cache = LRU()
+        cached = Worker(add_value, data_type=DigitalData, cache=cache)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(cached.cfg(value=1))
+            .then(self.increment.cfg())
+        )
+
+        assert pipe.execute(DigitalData(0)) == DigitalData(2)
+        assert pipe.execute(DigitalData(0)) == DigitalData(2)
+        assert pipe.execute_many([DigitalData(0), DigitalData(1)]) == [
+            DigitalData(2),
+            DigitalData(3),
+        ]
+        assert asyncio.run(pipe.aexecute(DigitalData(0))) == DigitalData(2)
+        assert cache.stats()["hits"] == 3
+
+    def test_cached_inplace_worker(self):
+        """Test a cached in-place worker keeps a private copy of its result."""
+        cache = LRU()
+        worker = Worker(
+            self.increment.func, data_type=DigitalData, cache=cache, inplace=True
+        )
+        pipe = Pipe(data_type=DigitalData).start_with(worker.cfg())
+        data = DigitalData(0)
+
+        assert pipe.execute(data) is data
+        data.value = 50
+        assert pipe.execute(DigitalData(0)) == DigitalData(1)
+
+
+class TestExclusiveBranches:
+    """Test cases for first-match, adaptive and switch branches."""
+
+    def setup_method(self):
+        """Set up workers and a condition call log for each test."""
+        self.add_value = Worker(add_value, data_type=DigitalData)
+        self.evaluated = []
+
+    def condition(self, name: str, func) -> Callable:
+        """Wrap a condition to record its evaluations."""
+
+        def condition(data: DigitalData) -> bool:
+            self.evaluated.append(name)
+            return func(data)
+
+        return condition
+
+    def runners(self, plan: ExecutionPlan, data: DigitalData) -> list[list]:
+        """Run data through every runner of a plan."""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            concurrent = plan.run_concurrent(data, executor)
+        return [
+            plan.run(data),
+            plan.run_many([data])[0],
+            concurrent,
+            asyncio.run(plan.arun(data)),
+        ]
+
+    def test_first_match(self):
+        """Test an exclusive branch runs only the first matching branch."""
+        plan = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_value.cfg(value=0))
+            .branch(exclusive=True)
+            .on(
+                self.condition("positive", lambda d: d.value > 0),
+                self.add_value.cfg(value=1),
+            )
+            .on(
+                self.condition("large", lambda d: d.value > 10),
+                self.add_value.cfg(value=2),
+            )
+            .end_branch()
+            .then(self.add_value.cfg(value=100))
+            .compile()
+        )
+
+        assert plan.run(DigitalData(20)) == [DigitalData(121)]
+        assert self.evaluated == ["positive"]
+        assert self.runners(plan, DigitalData(20)) == [[DigitalData(121)]] * 4
+        assert self.runners(plan, DigitalData(-5)) == [[DigitalData(95)]] * 4
+
+    def test_switch(self):
+        """Test a switch computes its key once and runs the matching case."""
+        keys = []
+
+        def parity(data: DigitalData) -> float:
+            keys.append(data.value)
+            return data.value % 2
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_value.cfg(value=0))
+            .switch(parity)
+            .case(0, self.add_value.cfg(value=10))
+            .case(1, self.add_value.cfg(value=20))
+            .case(1, self.add_value.cfg(value=30))
+            .end_branch()
+        )
+        plan = pipe.compile()
+
+        assert plan.run(DigitalData(3)) == [DigitalData(23)]
+        assert keys == [3]
+        assert self.runners(plan, DigitalData(4)) == [[DigitalData(14)]] * 4
+        # Unmatched keys, including unknown ones, skip every case
+        assert pipe.then(self.add_value.cfg(value=0)).execute(DigitalData(0.5)) == (
+            DigitalData(0.5)
+        )
+        assert self.runners(pipe.compile(), DigitalData(1.5)) == (
+            [[DigitalData(1.5)]] * 4
+        )
+
+    def test_switch_leaves(self):
+        """Test an unmatched switch key ends the run at the switch node."""
+        plan = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_value.cfg(value=0))
+            .switch(lambda d: d.value)
+            .case(1, self.add_value.cfg(value=10))
+            .end_branch()
+            .compile()
+        )
+
+        assert self.runners(plan, DigitalData(1)) == [[DigitalData(11)]] * 4
+        assert self.runners(plan, DigitalData(2)) == [[DigitalData(2)]] * 4
+
+    def test_switch_with_metrics(self):
+        """Test switches dispatch on the key in instrumented plans."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_value.cfg(value=0))
+            .switch(lambda d: d.value)
+            .case(1, self.add_value.cfg(value=10))
+            .case(2, self.add_value.cfg(value=20))
+            .end_branch()
+            .enable_metrics()
+        )
+
+        assert pipe.execute(DigitalData(2)) == DigitalData(22)
+        assert [node["calls"] for node in pipe.stats()["nodes"]] == [1, 0, 1]
+
+    def test_adaptive_reorders_conditions(self):
+        """Test an adaptive branch evaluates the most selected condition first."""
+        pipe = Pipe(data_type=DigitalData).start_with(self.add_value.cfg(value=0))
+        pipe.branch(adaptive=True)
+        for key in range(4):
+            check = self.condition(key, lambda d, key=key: d.value == key)
+            pipe.on(check, self.add_value.cfg(value=10 * key))
+        plan = pipe.end_branch().compile()
+
+        router = plan.routers[0]
+        assert isinstance(router, _SelectivityOrder)
+        for _ in range(router.interval):
+            assert plan.run(DigitalData(3)) == [DigitalData(33)]
+        self.evaluated.clear()
+
+        assert plan.run(DigitalData(3)) == [DigitalData(33)]
+        assert self.evaluated == [3]
+        assert plan.run(DigitalData(0)) == [DigitalData(0)]
+        assert self.evaluated == [3, 3, 0]
+        assert plan.run(DigitalData(9)) == [DigitalData(9)]
+
+    def test_selectivity_order_decays(self):
+        """Test reordering halves the hit counts to follow drifting traffic."""
+        router = _SelectivityOrder(
+            ((1, lambda d: d.value == 1), (2, lambda d: d.value == 2)), 4
+        )
+        for value in (2, 2, 1):
+            router(DigitalData(value))
+        router.reorder()
+
+        assert [target for target, _ in router.edges] == [2, 1]
+        assert router.hits == [1, 0]
+        assert router(DigitalData(5)) is None
+
+    def test_plain_branch_has_no_router(self):
+        """Test non-exclusive branches keep evaluating every condition."""
+        plan = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_value.cfg(value=0))
+            .branch(exclusive=True)
+            .branch()
+            .on(lambda d: True, self.add_value.cfg(value=1))
+            .end_branch()
+            .compile()
+        )
+        assert plan.routers == (None, None)
+
+
+class TestTimeouts:
+    """Test cases for node timeouts, run deadlines and hedging."""
+
+    def setup_method(self):
+        """Set up sleeping workers and a call log for each test."""
+        self.calls = []
+        self.released = threading.Event()
+
+        def nap(data: DigitalData, seconds: float = 0.0) -> DigitalData:
+            self.calls.append(seconds)
+            self.released.wait(seconds)
+            return DigitalData(data.value + 1)
+
+        async def anap(data: DigitalData, seconds: float = 0.0) -> DigitalData:
+            self.calls.append(seconds)
+            await asyncio.sleep(seconds)
+            return DigitalData(data.value + 1)
+
+        self.nap = Worker(nap, data_type=DigitalData)
+        self.anap = Worker(anap, data_type=DigitalData)
+
+    def teardown_method(self):
+        """Wake up the calls abandoned after a timeout."""
+        self.released.set()
+
+    def chain(self, worker: Worker, *seconds: float) -> Pipe:
+        """Build a chain of sleeping nodes."""
+        pipe = Pipe(data_type=DigitalData).start_with(worker.cfg(seconds=seconds[0]))
+        for value in seconds[1:]:
+            pipe.then(worker.cfg(seconds=value))
+        return pipe
+
+    def run_all(self, pipe: Pipe, timeout: float) -> list:
+        """Run a pipe through every runner, collecting results or errors."""
+        outcomes = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for run in (
+                lambda: pipe.execute(DigitalData(0), timeout=timeout),
+                lambda: pipe.execute(DigitalData(0), executor, timeout),
+                lambda: asyncio.run(pipe.aexecute(DigitalData(0), timeout)),
+            ):
+                try:
+                    outcomes.append(run())
+                except NodeExecutionError as e:
+                    outcomes.append(e)
+        return outcomes
+
+    def test_node_timeout(self):
+        """Test a node running past its worker's timeout fails the run."""
+        slow = Worker(self.nap.func, data_type=DigitalData, timeout=0.05)
+        pipe = self.chain(self.nap, 0).then(slow.cfg(seconds=1))
+
+        for error in self.run_all(pipe, timeout=5):
+            assert type(error) is NodeTimeoutError
+            assert error.node is pipe.current_node
+            assert "timed out after 0.05s" in str(error)
+        with pytest.raises(NodeTimeoutError):
+            pipe.execute(DigitalData(0))
+        with pytest.raises(NodeTimeoutError):
+            pipe.execute_many([DigitalData(0)])
+
+    def test_node_timeout_override(self):
+        """Test a node timeout overrides its worker's."""
+        slow = Worker(self.nap.func, data_type=DigitalData, timeout=0.01)
+        node = slow.cfg(seconds=0.05).with_timeout(1)
+        assert Pipe(data_type=DigitalData).start_with(node).execute(
+            DigitalData(0)
+        ) == DigitalData(1)
+
+    def test_async_node_timeout(self):
+        """Test async workers are cancelled after their timeout."""
+        slow = Worker(self.anap.func, data_type=DigitalData, timeout=0.05)
+        pipe = Pipe(data_type=DigitalData).start_with(slow.cfg(seconds=1))
+        with pytest.raises(NodeTimeoutError, match="timed out after 0.05s"):
+            asyncio.run(pipe.aexecute(DigitalData(0)))
+
+    def test_deadline_skips_remaining_nodes(self):
+        """Test the run deadline cuts off the current node and skips the rest."""
+        pipe = self.chain(self.nap, 0, 0.2, 0)
+
+        for error in self.run_all(pipe, timeout=0.1):
+            assert type(error) is DeadlineExceededError
+            assert error.node is pipe.nodes[1]
+        assert 0.0 not in self.calls[1::2]
+
+    def test_deadline_async(self):
+        """Test the run deadline cancels async workers."""
+        pipe = self.chain(self.anap, 0, 1)
+        with pytest.raises(DeadlineExceededError) as info:
+            asyncio.run(pipe.aexecute(DigitalData(0), timeout=0.05))
+        error = info.value
+        assert isinstance(error, DeadlineExceededError)
+        assert error.node is pipe.nodes[1]
+
+    def test_deadline_already_passed(self):
+        """Test nodes are skipped once the deadline has passed."""
+        plan = self.chain(self.nap, 0).compile()
+        with pytest.raises(DeadlineExceededError):
+            plan.run(DigitalData(0), timeout=1e-9)
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(plan.arun(DigitalData(0), timeout=1e-9))
+        # Submitted nodes check the deadline too before each call
+        with pytest.raises(DeadlineExceededError):
+            plan.run_concurrent(DigitalData(0), InlineExecutor(), timeout=1e-9)
+        assert self.calls == []
+
+    def test_run_within_deadline(self):
+        """Test runs finishing in time return their results."""
+        pipe = self.chain(self.nap, 0, 0)
+        assert self.run_all(pipe, timeout=5) == [DigitalData(2)] * 3
+        assert pipe.execute_all(DigitalData(0), timeout=5) == [
+            (pipe.current_node, DigitalData(2))
+        ]
+
+    def test_deadline_walk_uses_one_thread(self):
+        """Test a run with a deadline calls all its nodes in a single thread."""
+        threads = []
+
+        def record(data: DigitalData) -> DigitalData:
+            threads.append(threading.get_ident())
+            return data
+
+        worker = Worker(record, data_type=DigitalData)
+        pipe = Pipe(data_type=DigitalData).start_with(worker.cfg())
+        for _ in range(4):
+            pipe.then(worker.cfg())
+        assert pipe.execute(DigitalData(0), timeout=5) == DigitalData(0)
+        assert len(threads) == 5 and len(set(threads)) == 1
+        assert threads[0] != threading.get_ident()
+
+    def test_invalid_timeouts(self):
+        """Test non-positive timeouts and invalid hedge quantiles fail."""
+        with pytest.raises(ValueError, match="timeout must be positive"):
+            self.chain(self.nap, 0).execute(DigitalData(0), timeout=0)
+        with pytest.raises(ValueError, match="timeout must be positive"):
+            Worker(add_one, data_type=DigitalData, timeout=-1)
+        with pytest.raises(ValueError, match="timeout must be positive"):
+            Worker(add_one, data_type=DigitalData).cfg().with_timeout(0)
+        with pytest.raises(ValueError, match="hedge must be a latency quantile"):
+            Worker(add_one, data_type=DigitalData, hedge=1)
+
+    def test_hedged_worker(self):
+        """Test hedged workers are bound for sync and async execution."""
+        hedged = Worker(self.nap.func, data_type=DigitalData, hedge=0.95)
+        ahedged = Worker(self.anap.func, data_type=DigitalData, hedge=0.95)
+        pipe = self.chain(hedged, 0).then(ahedged.cfg())
+        plan = pipe.compile()
+
+        assert isinstance(plan.calls[0], Hedge)
+        assert isinstance(plan.batch_calls[0], Hedge)
+        assert isinstance(plan.async_calls[1], AsyncHedge)
+        assert pipe.execute(DigitalData(0)) == DigitalData(2)
+        assert asyncio.run(pipe.aexecute(DigitalData(0))) == DigitalData(2)
+
+    def test_hedges_stragglers(self):
+        """Test a straggling call is hedged in sync and async plans."""
+        attempts = []
+
+        def straggle(data: DigitalData) -> DigitalData:
+            attempts.append(data.value)
+            # The first call after warming up straggles
+            if len(attempts) == 21:
+                self.released.wait(5)
+            return data
+
+        async def astraggle(data: DigitalData) -> DigitalData:
+            attempts.append(data.value)
+            if len(attempts) == 21:
+                await asyncio.sleep(5)
+            return data
+
+        for func in (straggle, astraggle):
+            attempts.clear()
+            worker = Worker(func, data_type=DigitalData, hedge=0.5)
+            plan = Pipe(data_type=DigitalData).start_with(worker.cfg()).compile()
+            for value in range(21):
+                assert asyncio.run(plan.arun(DigitalData(value))) == [
+                    DigitalData(value)
+                ]
+            assert attempts[-2:] == [20, 20]
+            hedge = plan.async_calls[0] if worker.is_async else plan.calls[0]
+            assert isinstance(hedge, Hedge)
+            assert hedge.hedges == 1
+
+    def test_structured_errors(self):
+        """Test node failures keep the failing node and original exception."""
+        plan = (
+            Pipe(data_type=DigitalData)
+            .start_with(Worker(add_one, data_type=DigitalData).cfg())
+            .compile()
+        )
+        with pytest.raises(NodeExecutionError) as info:
+            plan.run("not data")
+        error = info.value
+        assert isinstance(error, NodeExecutionError)
+        assert error.node is plan.nodes[0]
+        assert isinstance(error.cause, TypeError)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
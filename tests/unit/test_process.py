@@ -0,0 +1,107 @@
+import gc
+import importlib
+import sys
+
+import pytest
+
+from sweetshop import (
+    Pipe,
+    SharedBuffer,
+    Worker,
+    configure_process_pool,
+    shutdown_process_pool,
+    worker_registry,
+)
+from sweetshop.process import _run_worker, get_process_pool
+from tests.common.blob_data import Blob
+from tests.common.digital_data import DigitalData, add_one
+from tests.unit.test_shared_data import segment_exists
+
+MODULE = "tests.common.process_workers"
+
+
+class TestProcessPool:
+    """Test cases for process pool execution."""
+
+    def setup_method(self):
+        """Register the process workers for each test."""
+        sys.modules.pop(MODULE, None)
+        importlib.import_module(MODULE)
+        configure_process_pool(2)
+
+    def teardown_method(self):
+        """Tear down after each test."""
+        shutdown_process_pool()
+        configure_process_pool(None)
+        worker_registry.clear()
+
+    def test_pool_is_persistent(self):
+        """Test the shared pool is reused until shut down."""
+        pool = get_process_pool()
+        assert get_process_pool() is pool
+
+        shutdown_process_pool()
+        assert get_process_pool() is not pool
+
+    def test_execute_in_process(self):
+        """Test executing process workers through a pipe."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.square_value.cfg())
+            .then(worker_registry.add_all.cfg(value=1))
+            .then(worker_registry.negate_value.cfg())
+        )
+
+        assert pipe.execute(DigitalData(3)) == DigitalData(-10)
+
+    def test_execute_many_in_process(self):
+        """Test executing a batch across the process pool."""
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.square_value.cfg())
+            .then(worker_registry.add_all.cfg(value=1))
+        )
+
+        results = pipe.execute_many([DigitalData(v) for v in range(5)])
+        assert results == [DigitalData(v**2 + 1) for v in range(5)]
+
+    def test_shared_data_in_process(self):
+        """Test shared buffers cross the pool as handles and are released."""
+        pipe = (
+            Pipe(data_type=Blob)
+            .start_with(worker_registry.invert_blob.cfg())
+            .then(worker_registry.fill_blob.cfg(value=9))
+        )
+        blob = Blob(SharedBuffer(b"\x00\x01"))
+
+        result = pipe.execute(blob)
+        assert result.payload.tobytes() == b"\t\t"
+        assert blob.payload.tobytes() == b"\x00\x01"
+
+        name = result.payload.name
+        del result
+        gc.collect()
+        assert not segment_exists(name)
+
+    def test_run_worker_imports_module(self):
+        """Test the child resolves unknown workers by importing their module."""
+        worker_registry.clear()
+        sys.modules.pop(MODULE, None)
+
+        result = _run_worker(MODULE, "square_value", {}, DigitalData(4))
+        assert result == DigitalData(16)
+
+    def test_run_worker_main_module(self):
+        """Test workers from __main__ are resolved from the registry."""
+        assert _run_worker("__main__", "negate_value", {}, DigitalData(4)) == (
+            DigitalData(-4)
+        )
+
+    def test_unsupported_executor(self):
+        """Test registering a worker with an unknown executor raises error."""
+        with pytest.raises(ValueError, match="Unsupported worker executor: 'gpu'"):
+            Worker(add_one, data_type=DigitalData, executor="gpu")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+
+from sweetshop import NodeExecutionError, Pipe, PipeRegistry, Scheduler, Worker
+from tests.common.digital_data import DigitalData, add_one
+from tests.unit.test_limits import wait_for
+
+
+class TestScheduler:
+    """Test cases for Scheduler class."""
+
+    def setup_method(self):
+        """Register pipes recording the order runs start in."""
+        self.started = []
+        self.released = threading.Event()
+
+        def record(data: DigitalData) -> DigitalData:
+            self.started.append(data.value)
+            return data
+
+        def block(data: DigitalData) -> DigitalData:
+            self.released.wait(5)
+            return data
+
+        self.registry = PipeRegistry()
+        for name in ("a", "b"):
+            worker = Worker(record, name=f"record_{name}", data_type=DigitalData)
+            self.registry.register(
+                name, Pipe(data_type=DigitalData).start_with(worker.cfg())
+            )
+        self.limited = Worker(block, data_type=DigitalData, max_concurrency=1)
+        self.registry.register(
+            "block", Pipe(data_type=DigitalData).start_with(self.limited.cfg())
+        )
+        self.registry.register(
+            "add_one",
+            Pipe(data_type=DigitalData).start_with(
+                Worker(add_one, data_type=DigitalData).cfg()
+            ),
+        )
+
+    def teardown_method(self):
+        """Release blocked runs after each test."""
+        self.released.set()
+
+    def test_submit(self):
+        """Test runs return their result or failure through a future."""
+        with Scheduler(max_workers=2, registry=self.registry) as scheduler:
+            assert scheduler.submit("add_one", DigitalData(1)).result() == DigitalData(
+                2
+            )
+            failed = scheduler.submit("add_one", 1)  # ty: ignore[invalid-argument-type]
+            with pytest.raises(NodeExecutionError, match="Expected first argument"):
+                failed.result()
+            with pytest.raises(KeyError, match="'missing' not found"):
+                scheduler.submit("missing", DigitalData(1))
+        assert repr(scheduler) == "Scheduler(max_workers=2)"
+
+    def test_priority_and_fairness(self):
+        """Test higher priorities start first, then pipes take turns."""
+        scheduler = Scheduler(max_workers=1, registry=self.registry)
+        blocked = scheduler.submit("block", DigitalData(0))
+        wait_for(lambda: scheduler.stats()["running"] == 1)
+
+        futures = [scheduler.submit("a", DigitalData(value)) for value in range(1, 5)]
+        futures += [scheduler.submit("b", DigitalData(value)) for value in (11, 12)]
+        futures.append(scheduler.submit("b", DigitalData(99), priority=1))
+        stats = scheduler.stats()
+        assert stats["queued"] == 7
+        assert stats["pipes"] == {"a": 4, "b": 3}
+
+        self.released.set()
+        scheduler.shutdown()
+        assert blocked.result() == DigitalData(0)
+        assert all(future.done() for future in futures)
+        assert self.started == [99, 1, 11, 2, 12, 3, 4]
+
+    def test_worker_stats(self):
+        """Test limited workers report their waiting calls and wait time."""
+        scheduler = Scheduler(max_workers=3, registry=self.registry)
+        futures = [scheduler.submit("block", DigitalData(value)) for value in range(3)]
+        wait_for(lambda: scheduler.stats()["workers"]["block"]["active"] == 1)
+        # Calls from outside the scheduler wait for the slot of its run
+        outside = threading.Thread(
+            target=self.registry.get("block").execute, args=(DigitalData(3),)
+        )
+        outside.start()
+        wait_for(lambda: scheduler.stats()["workers"]["block"]["waiting"] == 1)
+        stats = scheduler.stats()
+        assert stats["running"] == 1 and stats["queued"] == 2
+
+        self.released.set()
+        assert [future.result() for future in futures] == list(
+            map(DigitalData, range(3))
+        )
+        outside.join()
+        stats = scheduler.stats()["workers"]["block"]
+        assert stats["calls"] == 4 and stats["wait_max_seconds"] > 0
+        scheduler.shutdown()
+
+    def test_limited_runs_leave_threads(self):
+        """Test runs held back by a busy worker do not block other pipes."""
+        scheduler = Scheduler(max_workers=2, registry=self.registry)
+        blocked = [scheduler.submit("block", DigitalData(value)) for value in range(3)]
+        wait_for(lambda: scheduler.stats()["workers"]["block"]["active"] == 1)
+        assert scheduler.submit("add_one", DigitalData(1)).result(5) == DigitalData(2)
+        assert scheduler.stats()["pipes"] == {"block": 2}
+
+        self.released.set()
+        scheduler.shutdown()
+        assert [future.result() for future in blocked] == list(
+            map(DigitalData, range(3))
+        )
+        assert scheduler.stats()["workers"]["block"]["wait_max_seconds"] == 0
+
+    def test_shutdown(self):
+        """Test shutdown can cancel queued runs and refuses new ones."""
+        scheduler = Scheduler(max_workers=1, registry=self.registry)
+        blocked = scheduler.submit("block", DigitalData(0))
+        wait_for(lambda: scheduler.stats()["running"] == 1)
+        queued = scheduler.submit("a", DigitalData(1))
+
+        scheduler.shutdown(wait=False, cancel_futures=True)
+        with pytest.raises(RuntimeError, match="after shutdown"):
+            scheduler.submit("a", DigitalData(2))
+        self.released.set()
+        scheduler.shutdown()
+        assert blocked.result() == DigitalData(0)
+        assert queued.cancelled()
+        assert self.started == []
+
+    def test_invalid_max_workers(self):
+        """Test a scheduler needs at least one thread."""
+        with pytest.raises(ValueError, match="max_workers must be at least 1"):
+            Scheduler(max_workers=0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
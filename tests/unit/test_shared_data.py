@@ -0,0 +1,167 @@
+import gc
+import pickle
+
+import pytest
+
+from sweetshop import Pipe, SharedBuffer, SharedData, SlotData, Worker
+from sweetshop.shared_data import _owners, handover
+from tests.common.blob_data import Blob
+
+
+def segment_exists(name: str) -> bool:
+    """Check whether a shared memory segment can still be attached."""
+    try:
+        SharedBuffer._attach(name, 0).release()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class SlotBlob(SlotData, SharedData):
+    payload: SharedBuffer
+    label: str = ""
+
+
+class TestSharedBuffer:
+    """Test cases for SharedBuffer class."""
+
+    def test_create_from_bytes(self):
+        """Test the buffer holds a copy of the given bytes."""
+        buffer = SharedBuffer(b"abc")
+        assert buffer.tobytes() == b"abc"
+        assert len(buffer) == 3
+        assert repr(buffer) == f"SharedBuffer(name={buffer.name!r}, size=3)"
+        buffer.release()
+
+    def test_create_zeroed(self):
+        """Test an integer size allocates a zeroed buffer, including zero."""
+        assert SharedBuffer(4).tobytes() == b"\0\0\0\0"
+        assert SharedBuffer(0).tobytes() == b""
+
+    def test_pickle_is_a_handle(self):
+        """Test pickling transfers the name only and maps the same memory."""
+        buffer = SharedBuffer(bytes(1 << 16))
+        payload = pickle.dumps(buffer)
+        assert len(payload) < 200
+
+        attached = pickle.loads(payload)
+        attached.view[0] = 7
+        assert buffer.view[0] == 7
+
+        del attached
+        gc.collect()
+        assert segment_exists(buffer.name)
+
+    def test_released_with_last_owner(self):
+        """Test the segment is unlinked once the owning buffer is gone."""
+        buffer = SharedBuffer(b"abc")
+        name = buffer.name
+        del buffer
+        gc.collect()
+        assert not segment_exists(name)
+        assert name not in _owners
+
+    def test_release(self):
+        """Test release unlinks the segment and tolerates exported views."""
+        buffer = SharedBuffer(b"abc")
+        view = buffer.view
+        buffer.release()
+        buffer.release()
+        assert not segment_exists(buffer.name)
+        assert bytes(view) == b"abc"
+
+    def test_handover(self):
+        """Test a handed over buffer makes its unpickler the owner."""
+        buffer = SharedBuffer(b"abc")
+        buffer.handover()
+        received = pickle.loads(pickle.dumps(buffer))
+
+        buffer.release()
+        assert segment_exists(received.name)
+        received.release()
+        assert not segment_exists(received.name)
+
+    def test_handover_shared_owners(self):
+        """Test the segment lives until every owner in the process is gone."""
+        buffer = SharedBuffer(b"abc")
+        attached = pickle.loads(pickle.dumps(Blob(buffer)))
+        received = pickle.loads(pickle.dumps(handover(attached))).payload
+        assert _owners[buffer.name] == 2
+
+        received.release()
+        assert segment_exists(buffer.name)
+        buffer.release()
+        assert not segment_exists(buffer.name)
+
+    def test_handover_unlinked(self):
+        """Test closing an owner whose segment is already gone."""
+        buffer = SharedBuffer(b"abc")
+        buffer._segment.memory.unlink()
+        buffer.release()
+        assert buffer.name not in _owners
+
+
+class TestSharedData:
+    """Test cases for SharedData class."""
+
+    def test_buffers(self):
+        """Test buffers finds SharedBuffer fields, slotted or not."""
+        blob = Blob(SharedBuffer(b"abc"), "x")
+        assert blob.buffers() == [blob.payload]
+        slotted = SlotBlob(SharedBuffer(b"abc"))
+        assert slotted.buffers() == [slotted.payload]
+
+    def test_release(self):
+        """Test release frees every buffer."""
+        blob = Blob(SharedBuffer(b"abc"))
+        blob.release()
+        assert not segment_exists(blob.payload.name)
+
+    def test_fingerprint_by_content(self):
+        """Test fingerprints compare buffer contents, not segment names."""
+        assert Blob(SharedBuffer(b"abc")).fingerprint() == (
+            Blob(SharedBuffer(b"abc")).fingerprint()
+        )
+        assert Blob(SharedBuffer(b"abc")).fingerprint() != (
+            Blob(SharedBuffer(b"abd")).fingerprint()
+        )
+        assert Blob(SharedBuffer(b"abc"), "x").fingerprint() != (
+            Blob(SharedBuffer(b"abc"), "y").fingerprint()
+        )
+
+    def test_inplace_branches_isolated(self):
+        """Test in-place branches of shared data write to their own segments."""
+
+        def write(data: Blob, value: int) -> Blob:
+            data.payload.view[0] = value
+            return data
+
+        writer = Worker(write, data_type=Blob, inplace=True)
+        pipe = (
+            Pipe(data_type=Blob)
+            .start_with(Worker(lambda d: d, name="keep", data_type=Blob).cfg())
+            .branch()
+            .on(lambda d: True, writer.cfg(value=1))
+            .on(lambda d: True, writer.cfg(value=2))
+            .end_branch()
+        )
+        first, second = [
+            result for _, result in pipe.execute_all(Blob(SharedBuffer(b"abc")))
+        ]
+
+        assert (first.payload.tobytes(), second.payload.tobytes()) == (
+            b"\x01bc",
+            b"\x02bc",
+        )
+        assert first.payload.name != second.payload.name
+
+    def test_handover_batch(self):
+        """Test handover accepts batch results and ignores other data."""
+        blob = Blob(SharedBuffer(b"a"))
+        blobs = [blob, None]
+        assert handover(blobs) is blobs
+        assert blob.payload._handover
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,139 @@
+import copy
+import pickle
+from typing import ClassVar
+
+import pytest
+
+from sweetshop import Pipe, SlotData, Worker
+
+
+class Point(SlotData):
+    x: int
+    y: int = 0
+    dims: ClassVar[int] = 2
+
+
+class Point3D(Point):
+    z: int = 0
+
+
+class Box(SlotData):
+    items: list[int]
+    size: int = 0
+
+
+class TestSlotData:
+    """Test cases for SlotData class."""
+
+    def test_init_and_fields(self):
+        """Test fields are set positionally, by keyword and from defaults."""
+        assert (Point(1, 2).x, Point(1, 2).y) == (1, 2)
+        assert Point(x=3).y == 0
+        assert Point.__fields__ == ("x", "y")
+        assert Point.dims == 2
+
+    def test_forward_references(self):
+        """Test fields may be annotated with names defined after the class."""
+
+        class Edge(SlotData):
+            head: "Vertex"
+            weight: ClassVar["Vertex"]
+
+        class Vertex:
+            pass
+
+        assert Edge.__fields__ == ("head",)
+        assert Edge(head=Vertex()).head.__class__ is Vertex
+
+    def test_missing_field(self):
+        """Test a required field must be given."""
+        with pytest.raises(TypeError):
+            Point()  # ty: ignore[missing-argument]
+
+    def test_slots_no_dict(self):
+        """Test instances store fields in slots without a __dict__."""
+        point = Point(1)
+        assert Point.__slots__ == ("x", "y")
+        assert not hasattr(point, "__dict__")
+        with pytest.raises(AttributeError):
+            point.w = 1
+
+    def test_inheritance(self):
+        """Test subclasses extend the inherited fields."""
+        point = Point3D(1, 2, 3)
+        assert Point3D.__fields__ == ("x", "y", "z")
+        assert Point3D.__slots__ == ("z",)
+        assert not hasattr(point, "__dict__")
+        assert repr(point) == "Point3D(x=1, y=2, z=3)"
+
+    def test_non_default_after_default(self):
+        """Test a required field may not follow a defaulted one."""
+        with pytest.raises(TypeError, match="Non-default field 'z'"):
+
+            class Bad(Point):
+                z: int
+
+    def test_eq(self):
+        """Test equality compares type and fields."""
+        assert Point(1, 2) == Point(1, 2)
+        assert Point(1, 2) != Point(1, 3)
+        assert Point(1, 0) != Point3D(1, 0, 0)
+        assert Point(1) != (1, 0)
+
+    def test_hash(self):
+        """Test equal-by-value instances are unhashable unless the class hashes."""
+        with pytest.raises(TypeError, match="unhashable"):
+            hash(Point(1, 2))
+        with pytest.raises(TypeError, match="unhashable"):
+            {Point3D(1, 2, 3)}
+
+        class Label(SlotData):
+            text: str
+
+            def __hash__(self):
+                return hash(self.text)
+
+        assert Label("a") == Label("a")
+        assert len({Label("a"), Label("a")}) == 1
+
+    def test_repr(self):
+        """Test repr shows every field."""
+        assert repr(Point(1, 2)) == "Point(x=1, y=2)"
+
+    def test_copy(self):
+        """Test __copy__ makes a shallow copy."""
+        box = Box([1], 1)
+        clone = copy.copy(box)
+        assert clone == box and clone is not box
+        assert clone.items is box.items
+
+    def test_replace(self):
+        """Test replace returns a new instance with updated fields."""
+        point = Point(1, 2)
+        assert point.replace(y=5) == Point(1, 5)
+        assert point == Point(1, 2)
+        with pytest.raises(TypeError):
+            point.replace(w=1)
+
+    def test_pickle_and_fingerprint(self):
+        """Test slotted data pickles and fingerprints by content."""
+        point = Point3D(1, 2, 3)
+        assert pickle.loads(pickle.dumps(point)) == point
+        assert point.fingerprint() == Point3D(1, 2, 3).fingerprint()
+        assert point.fingerprint() != Point3D(1, 2, 4).fingerprint()
+
+    def test_match_args(self):
+        """Test positional class patterns match the fields."""
+        match Point(1, 2):
+            case Point(x, y):
+                assert (x, y) == (1, 2)
+
+    def test_in_pipe(self):
+        """Test SlotData flows through a pipe."""
+        worker = Worker(lambda data: data.replace(x=data.x + 1), data_type=Point)
+        pipe = Pipe(data_type=Point).start_with(worker.cfg()).then(worker.cfg())
+        assert pipe.execute(Point(1)) == Point(3)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,233 @@
+import json
+
+import pytest
+
+from sweetshop import (
+    FunctionRegistry,
+    Pipe,
+    PlanCache,
+    Worker,
+    condition_registry,
+    dump_spec,
+    from_spec,
+    load_spec,
+    merge_registry,
+    pipe_registry,
+    register_specs,
+    to_spec,
+    worker_registry,
+)
+from sweetshop.spec import spec_hash
+from tests.common.digital_data import DigitalData, add_one, add_value, multiply_by_two
+
+
+def is_positive(data: DigitalData) -> bool:
+    return data.value > 0
+
+
+def is_large(data: DigitalData) -> bool:
+    return data.value > 100
+
+
+def parity(data: DigitalData) -> float:
+    return data.value % 2
+
+
+@merge_registry.register_function()
+def total(results: list[DigitalData]) -> DigitalData:
+    return DigitalData(sum(result.value for result in results))
+
+
+class TestFunctionRegistry:
+    """Test cases for FunctionRegistry class."""
+
+    def test_register_function(self):
+        """Test registering and looking up functions by name."""
+        registry = FunctionRegistry()
+        registry.register_function()(is_positive)
+        registry.register_function(name="large")(is_large)
+
+        assert registry.is_positive is is_positive
+        assert registry.name_of(is_large) == "large"
+        with pytest.raises(ValueError, match="is not registered"):
+            registry.name_of(add_one)
+        with pytest.raises(AttributeError, match="Function 'other' not found"):
+            registry.other
+
+    def test_first_result_registered(self):
+        """Test the default merge is available to specs."""
+        assert merge_registry.name_of(merge_registry.first_result) == "first_result"
+
+
+class TestPipeSpec:
+    """Test cases for pipe specs."""
+
+    def setup_method(self):
+        """Register workers, conditions and a merge for each test."""
+        worker_registry.register("add_one", Worker(add_one, data_type=DigitalData))
+        worker_registry.register("add_value", Worker(add_value, data_type=DigitalData))
+        worker_registry.register(
+            "multiply_by_two", Worker(multiply_by_two, data_type=DigitalData)
+        )
+        condition_registry.register("is_positive", is_positive)
+        condition_registry.register("is_large", is_large)
+
+    def teardown_method(self):
+        """Tear down after each test."""
+        worker_registry.clear()
+        pipe_registry.clear()
+        condition_registry.clear()
+
+    def build(self) -> Pipe:
+        """Build a pipe with branches, a custom merge and a fallback."""
+        return (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.add_value.cfg(value=2))
+            .branch()
+            .on(is_positive, worker_registry.multiply_by_two.cfg())
+            .then(worker_registry.add_one.cfg())
+            .on(is_large, worker_registry.add_value.cfg(value=1000))
+            .end_branch(merge=total)
+            .then(worker_registry.add_one.cfg())
+        )
+
+    def test_round_trip(self):
+        """Test a pipe rebuilt from its spec behaves the same."""
+        pipe = self.build().trust().enable_metrics()
+        spec = to_spec(pipe)
+
+        assert spec["data_type"] == "tests.common.digital_data:DigitalData"
+        assert spec["nodes"][0] == {
+            "worker": "add_value",
+            "config": {"value": 2},
+            "fallback": 4,
+        }
+        assert spec["edges"][0] == [0, 1, "is_positive"]
+        assert json.loads(json.dumps(spec)) == spec
+
+        loaded = from_spec(spec)
+        assert loaded.trusted and loaded.metrics_enabled
+        for value in (-5, 1, 200):
+            data = DigitalData(value)
+            assert loaded.execute(data) == pipe.execute(data)
+        assert to_spec(loaded) == spec
+
+    def test_switch_round_trip(self):
+        """Test switch cases and exclusive branches survive the round trip."""
+        condition_registry.register("parity", parity)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.add_one.cfg())
+            .switch(parity)
+            .case(0, worker_registry.add_value.cfg(value=10))
+            .case(1, worker_registry.multiply_by_two.cfg())
+            .end_branch()
+            .then(worker_registry.add_one.cfg())
+            .branch(exclusive=True)
+            .on(is_positive, worker_registry.add_one.cfg())
+            .on(is_large, worker_registry.add_one.cfg())
+            .end_branch()
+        )
+        assert pipe.current_node is not None
+        pipe.current_node.with_timeout(5)
+        spec = to_spec(pipe)
+
+        assert spec["nodes"][0]["routing"] == "switch"
+        assert spec["nodes"][-1]["timeout"] == 5
+        assert spec["edges"][0] == [0, 1, {"key": "parity", "value": 0}]
+        assert json.loads(json.dumps(spec)) == spec
+        loaded = from_spec(spec)
+        for value in (-5, 1, 2):
+            data = DigitalData(value)
+            assert loaded.execute(data) == pipe.execute(data)
+        assert to_spec(loaded) == spec
+
+    def test_loaded_pipe_extends(self):
+        """Test a loaded pipe can be extended with the builder."""
+        pipe = Pipe(data_type=DigitalData).start_with(worker_registry.add_one.cfg())
+        loaded = from_spec(to_spec(pipe)).then(worker_registry.multiply_by_two.cfg())
+        assert loaded.execute(DigitalData(1)) == DigitalData(4)
+
+    def test_unregistered_parts(self):
+        """Test exporting fails for unregistered workers and conditions."""
+        worker = Worker(add_one, data_type=DigitalData)
+        with pytest.raises(ValueError, match="is not registered"):
+            to_spec(Pipe(data_type=DigitalData).start_with(worker.cfg()))
+        worker = Worker(add_one, name="unknown", data_type=DigitalData)
+        with pytest.raises(ValueError, match="is not registered"):
+            to_spec(Pipe(data_type=DigitalData).start_with(worker.cfg()))
+
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(worker_registry.add_one.cfg())
+            .branch()
+            .on(lambda d: True, worker_registry.add_one.cfg())
+            .end_branch()
+        )
+        with pytest.raises(ValueError, match="is not registered"):
+            to_spec(pipe)
+
+    def test_invalid_spec(self):
+        """Test loading validates the version and worker configs."""
+        spec = to_spec(self.build())
+        with pytest.raises(ValueError, match="Unsupported pipe spec version: 2"):
+            from_spec({**spec, "version": 2})
+
+        spec["nodes"][0]["config"] = {"values": 2}
+        with pytest.raises(TypeError, match="unexpected config: values"):
+            from_spec(spec)
+
+    def test_plan_cache(self, tmp_path):
+        """Test a cached spec loads its plan without validating again."""
+        cache = PlanCache(tmp_path / "plans")
+        spec = to_spec(self.build())
+
+        first = from_spec(spec, cache)
+        assert len(cache) == 1
+        assert cache.get(spec_hash(spec)) == list(range(len(spec["nodes"])))
+
+        second = from_spec(spec, cache)
+        assert second._plan is not None
+        assert second.execute(DigitalData(1)) == first.execute(DigitalData(1))
+
+        # Configs are only checked when the spec is validated
+        bad = json.loads(json.dumps(spec))
+        bad["nodes"][2]["config"] = {"unused": 1}
+        with pytest.raises(TypeError, match="unexpected config: unused"):
+            from_spec(bad, cache)
+        order = cache.get(spec_hash(spec))
+        assert order is not None
+        cache.put(spec_hash(bad), order)
+        assert from_spec(bad, cache)._plan is not None
+
+        cache.clear()
+        assert len(cache) == 0
+        assert repr(cache) == f"PlanCache(directory='{tmp_path / 'plans'}')"
+
+    def test_plan_cache_corrupt_entry(self, tmp_path):
+        """Test a corrupt cache entry is treated as a miss."""
+        cache = PlanCache(tmp_path)
+        spec = to_spec(self.build())
+        (tmp_path / f"{spec_hash(spec)}.json").write_text("{")
+
+        assert from_spec(spec, cache).execute(DigitalData(1)) == DigitalData(8)
+
+    def test_dump_and_register_specs(self, tmp_path):
+        """Test spec files are registered lazily under their file name."""
+        dump_spec(self.build(), tmp_path / "branchy.json")
+        pipe = Pipe(data_type=DigitalData).start_with(worker_registry.add_one.cfg())
+        dump_spec(pipe, tmp_path / "simple.json")
+
+        assert load_spec(tmp_path / "simple.json").execute(DigitalData(1)) == (
+            DigitalData(2)
+        )
+        cache = PlanCache(tmp_path / "plans")
+        assert register_specs(tmp_path, cache) == ["branchy", "simple"]
+        assert len(cache) == 0
+
+        assert pipe_registry.branchy.execute(DigitalData(1)) == DigitalData(8)
+        assert len(cache) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from sweetshop import (
+    DeadlineExceededError,
+    Node,
+    NodeExecutionError,
+    NodeTimeoutError,
+    Worker,
+)
+from sweetshop.errors import node_error
+from sweetshop.timeouts import (
+    AsyncHedge,
+    Hedge,
+    acall_with_timeout,
+    call_with_timeout,
+    start_call,
+)
+from tests.common.digital_data import DigitalData, add_one
+
+
+def fail(data: DigitalData) -> DigitalData:
+    raise ValueError("failed")
+
+
+class TestCallWithTimeout:
+    """Test cases for timed calls."""
+
+    def test_call_within_timeout(self):
+        """Test a call finishing in time returns its result."""
+        assert call_with_timeout(1, add_one, DigitalData(3)) == DigitalData(4)
+        assert start_call(add_one, DigitalData(4)).result() == DigitalData(5)
+
+    def test_call_timed_out(self):
+        """Test a slow call raises TimeoutError without waiting for it."""
+        released = threading.Event()
+
+        def wait(data: DigitalData) -> DigitalData:
+            released.wait(data.value)
+            return data
+
+        start = time.monotonic()
+        with pytest.raises(TimeoutError, match=r"timed out after 0.05s"):
+            call_with_timeout(0.05, wait, DigitalData(5))
+        assert time.monotonic() - start < 1
+        released.set()
+
+    def test_call_failure(self):
+        """Test exceptions of the call propagate."""
+        with pytest.raises(ValueError, match="failed"):
+            call_with_timeout(1, fail, DigitalData(0))
+
+    def test_async_call(self):
+        """Test async calls are awaited and cancelled after the timeout."""
+
+        async def double(data: DigitalData) -> DigitalData:
+            return DigitalData(data.value * 2)
+
+        async def hang(data: DigitalData) -> DigitalData:
+            await asyncio.sleep(5)
+            return data
+
+        assert asyncio.run(acall_with_timeout(1, double, DigitalData(2))) == (
+            DigitalData(4)
+        )
+        with pytest.raises(TimeoutError, match=r"timed out after 0.05s"):
+            asyncio.run(acall_with_timeout(0.05, hang, DigitalData(0)))
+
+
+class TestHedge:
+    """Test cases for Hedge class."""
+
+    def test_hedges_slow_call(self):
+        """Test a straggling call is raced by a second attempt."""
+        released = threading.Event()
+        attempts = []
+
+        def flaky(data: DigitalData) -> DigitalData:
+            attempts.append(data.value)
+            # The first call after warming up straggles
+            if len(attempts) == 3:
+                released.wait(5)
+                return DigitalData(-1)
+            return data
+
+        hedge = Hedge(flaky, quantile=0.95, min_samples=2)
+        assert [hedge(DigitalData(1)), hedge(DigitalData(2))] == [
+            DigitalData(1),
+            DigitalData(2),
+        ]
+        assert hedge.hedges == 0
+
+        assert hedge(DigitalData(3)) == DigitalData(3)
+        assert attempts == [1, 2, 3, 3]
+        assert hedge.hedges == 1
+        released.set()
+
+        assert hedge(DigitalData(4)) == DigitalData(4)
+        assert repr(hedge).startswith("Hedge(func=<function")
+
+    def test_hedges_slow_async_call(self):
+        """Test a straggling async call is raced and the loser cancelled."""
+        attempts, cancelled = [], []
+
+        async def flaky(data: DigitalData) -> DigitalData:
+            attempts.append(data.value)
+            if len(attempts) == 3:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(data.value)
+                    raise
+            return data
+
+        async def run(hedge: AsyncHedge) -> list[DigitalData]:
+            return [await hedge(DigitalData(value)) for value in range(1, 5)]
+
+        hedge = AsyncHedge(flaky, quantile=0.95, min_samples=2)
+        assert asyncio.run(run(hedge)) == [DigitalData(v) for v in range(1, 5)]
+        assert attempts == [1, 2, 3, 3, 4]
+        assert cancelled == [3]
+        assert hedge.hedges == 1
+        assert repr(hedge).startswith("AsyncHedge(func=<function")
+
+
+class TestErrors:
+    """Test cases for structured node errors."""
+
+    def test_node_error(self):
+        """Test errors are classified and keep the node and cause."""
+        node = Node(Worker(add_one, data_type=DigitalData))
+        cause = ValueError("bad value")
+        error = node_error(node, cause)
+        assert type(error) is NodeExecutionError
+        assert error.node is node and error.cause is cause
+        assert str(error) == f"Node {node} execution failed: bad value"
+
+        timeout = node_error(node, TimeoutError("timed out after 1s"))
+        assert isinstance(timeout, NodeTimeoutError)
+        assert isinstance(timeout, TimeoutError)
+
+    def test_deadline_error(self):
+        """Test deadline errors are node timeouts and runtime errors."""
+        node = Node(Worker(add_one, data_type=DigitalData))
+        error = DeadlineExceededError(node)
+        assert isinstance(error, NodeTimeoutError)
+        assert isinstance(error, RuntimeError)
+        assert str(error) == f"Node {node} execution failed: run deadline exceeded"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,264 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sweetshop import NodeExecutionError, Pipe, Tracer, Worker, optimize
+from sweetshop.tracing import pickled_size
+from tests.common.digital_data import DigitalData, add_one, add_value
+
+
+async def double(data: DigitalData) -> DigitalData:
+    return DigitalData(data.value * 2)
+
+
+def fail(data: DigitalData) -> DigitalData:
+    raise ValueError("bad value")
+
+
+def load(path) -> list[dict]:
+    with open(path) as file:
+        return json.load(file)
+
+
+class TestTracer:
+    """Test cases for Tracer class."""
+
+    def setup_method(self):
+        """Set up workers for each test."""
+        self.add_one = Worker(add_one, data_type=DigitalData)
+        self.add_value = Worker(add_value, data_type=DigitalData)
+
+    def test_node_spans(self, tmp_path):
+        """Test a traced run records a span per node and the whole run."""
+        tracer = Tracer(tmp_path / "trace.json", sample_rate=1)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .then(self.add_value.cfg(value=10))
+            .trace(tracer)
+        )
+        assert pipe.execute(DigitalData(1)) == DigitalData(12)
+        assert pipe.execute_all(DigitalData(2))[0][1] == DigitalData(13)
+        tracer.close()
+
+        events = load(tracer.path)
+        assert tracer.runs == 2
+        assert [(e["name"], e["args"]["run"]) for e in events] == [
+            ("0:add_one", 1),
+            ("1:add_value", 1),
+            ("run 1", 1),
+            ("0:add_one", 2),
+            ("1:add_value", 2),
+            ("run 2", 2),
+        ]
+        first, second, run = events[:3]
+        assert first["ph"] == "X" and first["cat"] == "node"
+        assert first["args"]["worker"] == "add_one"
+        assert second["args"]["config"] == {"value": 10}
+        assert second["args"]["output_size"] == pickled_size(DigitalData(12))
+        assert run["args"]["input_size"] == pickled_size(DigitalData(1))
+        assert run["ts"] <= first["ts"] <= second["ts"]
+        assert run["dur"] >= first["dur"] + second["dur"]
+
+    def test_sampling(self, tmp_path):
+        """Test runs outside the sample are not traced."""
+        tracer = Tracer(tmp_path / "trace.json", sample_rate=0)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(Worker(double, data_type=DigitalData).cfg())
+            .branch()
+            .on(lambda d: d.value > 2, self.add_one.cfg())
+            .end_branch()
+            .switch(lambda d: d.value)
+            .case(5, self.add_value.cfg(value=10))
+            .end_branch()
+            .trace(tracer)
+        )
+        assert pipe.execute(DigitalData(2)) == DigitalData(15)
+        assert asyncio.run(pipe.aexecute(DigitalData(1))) == DigitalData(2)
+        tracer.close()
+        assert tracer.runs == 0
+        assert not tracer.path.exists()
+
+        pipe.trace(None)
+        assert pipe.compile().tracer is None
+
+    def test_branch_decisions(self, tmp_path):
+        """Test conditions and switches record the branch they take."""
+        tracer = Tracer(tmp_path / "trace.json", sample_rate=1)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: d.value > 5, self.add_value.cfg(value=10))
+            .on(lambda d: d.value < 5, self.add_value.cfg(value=20))
+            .end_branch()
+            .then(self.add_one.cfg())
+            .switch(lambda d: d.value % 2)
+            .case(0, self.add_value.cfg(value=100))
+            .end_branch()
+            .trace(tracer)
+        )
+        assert pipe.execute(DigitalData(1)) == DigitalData(23)
+        assert pipe.execute(DigitalData(2)) == DigitalData(124)
+        tracer.close()
+
+        branches = [
+            (e["name"], e["args"]["run"], e["args"]["matched"])
+            for e in load(tracer.path)
+            if e["cat"] == "branch" and "target" not in e["args"]
+        ]
+        assert branches == [
+            ("0:add_one -> 1:add_value", 1, False),
+            ("0:add_one -> 2:add_value", 1, True),
+            ("0:add_one -> 1:add_value", 2, False),
+            ("0:add_one -> 2:add_value", 2, True),
+        ]
+        routes = [e for e in load(tracer.path) if e["name"] == "3:add_one route"]
+        assert [e["args"]["target"] for e in routes] == [None, "4:add_value"]
+        assert routes[0]["ph"] == "i"
+
+    def test_failed_run(self, tmp_path):
+        """Test a failing node and its run record the error."""
+        tracer = Tracer(tmp_path / "trace.json", sample_rate=1)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .then(Worker(fail, data_type=DigitalData).cfg())
+            .trace(tracer)
+        )
+        with pytest.raises(NodeExecutionError, match="bad value"):
+            pipe.execute(DigitalData(1))
+        tracer.close()
+
+        *_, node, run = load(tracer.path)
+        assert node["name"] == "1:fail"
+        assert node["args"]["error"] == "ValueError('bad value')"
+        assert "NodeExecutionError" in run["args"]["error"]
+
+    def test_async_run(self, tmp_path):
+        """Test async runs and async workers are traced."""
+        with Tracer(tmp_path / "trace.json", sample_rate=1) as tracer:
+            pipe = (
+                Pipe(data_type=DigitalData)
+                .start_with(Worker(double, data_type=DigitalData).cfg())
+                .then(Worker(fail, data_type=DigitalData).cfg())
+                .trace(tracer)
+            )
+            with pytest.raises(NodeExecutionError):
+                asyncio.run(pipe.aexecute(DigitalData(2)))
+            pipe = (
+                Pipe(data_type=DigitalData)
+                .start_with(Worker(double, data_type=DigitalData).cfg())
+                .trace(tracer)
+            )
+            assert asyncio.run(pipe.aexecute(DigitalData(2))) == DigitalData(4)
+
+        events = load(tracer.path)
+        assert [e["name"] for e in events] == [
+            "0:double",
+            "1:fail",
+            "run 1",
+            "0:double",
+            "run 2",
+        ]
+        assert "error" in events[1]["args"]
+        assert events[3]["args"]["output_size"] == pickled_size(DigitalData(4))
+
+        async def broken(data: DigitalData) -> DigitalData:
+            raise ValueError("bad value")
+
+        with Tracer(tmp_path / "broken.json", sample_rate=1) as tracer:
+            pipe = (
+                Pipe(data_type=DigitalData)
+                .start_with(Worker(broken, data_type=DigitalData).cfg())
+                .trace(tracer)
+            )
+            with pytest.raises(NodeExecutionError):
+                asyncio.run(pipe.aexecute(DigitalData(2)))
+        node, run = load(tracer.path)
+        assert node["args"]["error"] == "ValueError('bad value')"
+        assert "error" in run["args"]
+
+    def test_concurrent_branches(self, tmp_path):
+        """Test branches run on an executor belong to the traced run."""
+        tracer = Tracer(tmp_path / "trace.json", sample_rate=1)
+        pipe = (
+            Pipe(data_type=DigitalData)
+            .start_with(self.add_one.cfg())
+            .branch()
+            .on(lambda d: True, self.add_value.cfg(value=10))
+            .on(lambda d: True, self.add_value.cfg(value=20))
+            .end_branch()
+            .trace(tracer)
+        )
+        with ThreadPoolExecutor(2) as executor:
+            assert pipe.execute(DigitalData(1), executor=executor) == DigitalData(12)
+        tracer.close()
+
+        spans = [e for e in load(tracer.path) if e["cat"] == "node"]
+        assert sorted(e["name"] for e in spans) == [
+            "0:add_one",
+            "1:add_value",
+            "2:add_value",
+        ]
+        assert {e["args"]["run"] for e in spans} == {1}
+
+    def test_nested_runs(self, tmp_path):
+        """Test a run started by a traced run is part of its trace."""
+        tracer = Tracer(tmp_path / "trace.json", sample_rate=1)
+        inner = Pipe(data_type=DigitalData).start_with(self.add_one.cfg()).trace(tracer)
+        outer = (
+            Pipe(data_type=DigitalData)
+            .start_with(
+                Worker(inner.execute, name="inner", data_type=DigitalData).cfg()
+            )
+            .trace(tracer)
+        )
+        assert outer.execute(DigitalData(1)) == DigitalData(2)
+        tracer.close()
+
+        assert tracer.runs == 1
+        assert [e["name"] for e in load(tracer.path)] == [
+            "0:add_one",
+            "0:inner",
+            "run 1",
+        ]
+
+    def test_reopen_and_sizes(self, tmp_path):
+        """Test runs after close start a new file and sizes are pluggable."""
+        tracer = Tracer(
+            tmp_path / "traces" / "trace.json", sample_rate=1, size=int.bit_length
+        )
+        pipe = Pipe(data_type=int).start_with(
+            Worker(lambda n: n + 1, name="inc", data_type=int).cfg()
+        )
+        assert optimize(pipe.trace(tracer)).pipe.execute(1) == 2
+        tracer.close()
+        tracer.close()
+        assert pipe.execute(7) == 8
+        tracer.close()
+
+        node, run = load(tracer.path)
+        assert tracer.runs == 2
+        assert node["args"]["output_size"] == 4
+        assert run["args"] == {"run": 2, "input_size": 3}
+        assert pickled_size(lambda: None) is None
+
+    def test_invalid_sample_rate(self, tmp_path):
+        """Test the sample rate must be a share of runs."""
+        with pytest.raises(ValueError, match="sample_rate must be between 0 and 1"):
+            Tracer(tmp_path / "trace.json", sample_rate=1.5)
+
+    def test_repr(self, tmp_path):
+        """Test tracer string representation."""
+        tracer = Tracer(tmp_path / "trace.json", sample_rate=0.5)
+        assert (
+            repr(tracer) == f"Tracer(path='{tmp_path / 'trace.json'}', sample_rate=0.5)"
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from sweetshop import Node, Worker
@@ -13,6 +15,11 @@ class TestWorker:
         assert worker.name == "initial_data"
         assert worker.func == initial_data
         assert worker.data_type == DigitalData
+        assert not worker.batch
+        assert worker.executor is None
+        assert worker.cache is None
+        assert not worker.inplace
+        assert worker.version is None
 
     def test_worker_creation_with_custom_name(self):
         """Test creating worker with custom name."""
@@ -73,6 +80,27 @@ class TestWorker:
         result = worker.execute(data, value=4)
         assert result.value == 9
 
+    def test_batch_worker_execute(self):
+        """Test executing a batch worker on a single item."""
+
+        def add_all(items: list[DigitalData], value: float) -> list[DigitalData]:
+            return [DigitalData(item.value + value) for item in items]
+
+        worker = Worker(add_all, data_type=DigitalData, batch=True)
+        assert worker.batch
+        assert worker.execute(DigitalData(5), value=4) == DigitalData(9)
+
+    def test_async_worker(self):
+        """Test an async function creates an async worker."""
+
+        async def add_later(data: DigitalData) -> DigitalData:
+            return DigitalData(data.value + 1)
+
+        worker = Worker(add_later, data_type=DigitalData)
+        assert worker.is_async
+        assert not Worker(add_one, data_type=DigitalData).is_async
+        assert asyncio.run(worker.execute(DigitalData(1))) == DigitalData(2)
+
     def test_worker_cfg_creates_node(self):
         """Test that cfg method creates a Node."""
         worker = Worker(add_value, data_type=DigitalData)
@@ -84,13 +112,38 @@ class TestWorker:
 
     def test_worker_cfg_creates_node_without_args(self):
         """Test that cfg method creates a Node with no config."""
-        worker = Worker(add_value, data_type=DigitalData)
+        worker = Worker(add_one, data_type=DigitalData)
         node = worker.cfg()
 
         assert isinstance(node, Node)
         assert node.worker == worker
         assert node.config == {}
 
+    def test_worker_cfg_unexpected_config(self):
+        """Test cfg rejects config the function does not accept."""
+        worker = Worker(add_value, data_type=DigitalData)
+        with pytest.raises(TypeError, match="unexpected config: valu, scale"):
+            worker.cfg(valu=1, scale=2)
+
+    def test_worker_cfg_missing_config(self):
+        """Test cfg rejects config missing a required argument."""
+        worker = Worker(add_value, data_type=DigitalData)
+        with pytest.raises(TypeError, match="'add_value' is missing config: value"):
+            worker.cfg()
+
+    def test_worker_cfg_flexible_signatures(self):
+        """Test cfg accepts defaults, **kwargs and unintrospectable functions."""
+
+        def scale(data: DigitalData, factor: float = 2, **options) -> DigitalData:
+            return DigitalData(data.value * factor)
+
+        worker = Worker(scale, data_type=DigitalData)
+        assert worker.cfg().config == {}
+        assert worker.cfg(factor=3, extra=True).config == {"factor": 3, "extra": True}
+        assert Worker(min, data_type=DigitalData).cfg(anything=1).config == {
+            "anything": 1
+        }
+
     def test_worker_repr(self):
         """Test worker string representation."""
         worker = Worker(initial_data, name="test_worker", data_type=DigitalData)
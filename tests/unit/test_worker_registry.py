@@ -1,6 +1,8 @@
+import sys
+
 import pytest
 
-from sweetshop import Worker, WorkerRegistry
+from sweetshop import LRU, Worker, WorkerRegistry, pipe_registry, worker_registry
 from tests.common.digital_data import DigitalData
 
 
@@ -43,6 +45,25 @@ class TestWorkerRegistry:
         assert worker.name == "custom_worker"
         assert worker.data_type == DigitalData
 
+    def test_register_batch_worker(self):
+        """Test registering a batch worker."""
+
+        @self.registry.register_worker(data_type=DigitalData, batch=True)
+        def batch_function(items):
+            return items
+
+        assert self.registry.batch_function.batch
+
+    def test_register_cached_worker(self):
+        """Test registering a memoized worker."""
+        cache = LRU(maxsize=4)
+
+        @self.registry.register_worker(data_type=DigitalData, cache=cache)
+        def cached_function(data):
+            return data
+
+        assert self.registry.cached_function.cache is cache
+
     def test_getattr_access(self):
         """Test accessing workers via attribute access."""
 
@@ -96,5 +117,38 @@ class TestWorkerRegistry:
         assert w2.execute(data).value == 9
 
 
+class TestLazyWorkers:
+    """Test cases for workers declared in a manifest."""
+
+    def setup_method(self):
+        """Forget the declaring module for each test."""
+        sys.modules.pop("tests.common.lazy_declarations", None)
+
+    def teardown_method(self):
+        """Tear down after each test."""
+        worker_registry.clear()
+        pipe_registry.clear()
+
+    def test_module_imported_on_access(self):
+        """Test declaring a worker imports its module on first access."""
+        worker_registry.load_manifest({"lazy_double": "tests.common.lazy_declarations"})
+        assert "tests.common.lazy_declarations" not in sys.modules
+
+        worker = worker_registry.lazy_double
+        assert worker.name == "lazy_double"
+        assert worker.execute(DigitalData(2)) == DigitalData(4)
+
+    def test_worker_attribute_target(self):
+        """Test a manifest may point straight at a Worker instance."""
+        worker_registry.declare("add_ten", "tests.common.lazy_declarations:ADD_TEN")
+        assert worker_registry.get("add_ten").name == "add_ten"
+
+    def test_target_not_a_worker(self):
+        """Test a target that is not a Worker raises TypeError."""
+        worker_registry.declare("lazy", "tests.common.lazy_declarations:IMPORTED")
+        with pytest.raises(TypeError, match="Expected a Worker, got bool"):
+            worker_registry.get("lazy")
+
+
 if __name__ == "__main__":
     pytest.main([__file__])